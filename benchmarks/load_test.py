@@ -0,0 +1,376 @@
+"""Load-test concurrent search-graph runs in a single process.
+
+Drives many `graph.ainvoke` calls at once against local stand-ins for the
+chat model, Tavily search and page fetching, each with a configurable
+latency distribution, and samples the process while they run:
+
+- event-loop lag: how late a periodic timer fires, i.e. how long callbacks
+  wait behind work blocking the loop;
+- thread-pool queue depth: calls waiting for a worker of the default
+  executor that `asyncio.to_thread` uses (Tavily search runs there);
+- RSS over time;
+- throughput and run latency at each concurrency level.
+
+    python benchmarks/load_test.py --concurrency 1 8 32 128 --runs 256
+    python benchmarks/load_test.py --llm-latency lognormal:0.8,0.5 --search-latency fixed:0.3 \\
+        --threads 8 --timeseries load.csv
+
+Latencies are given as "fixed:SECONDS", "uniform:LOW,HIGH" or
+"lognormal:MEDIAN,SIGMA". Nothing leaves the process: no API keys or network
+access are needed.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Type
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import tavily  # noqa: E402
+
+from enrichment_agent import utils  # noqa: E402
+from enrichment_agent.crawler import CrawlResult  # noqa: E402
+from enrichment_agent.extraction import ExtractedPage  # noqa: E402
+from enrichment_agent.state import ContactDetails, Queries, Supplier  # noqa: E402
+from enrichment_agent.worker import load_search_graph  # noqa: E402
+
+INPUT = {
+    "company_name": "InnoMed Devices",
+    "company_info": "Medical device manufacturing, Pune, India",
+    "procurement_requirement": (
+        "Medical-grade polymers and electronic components for portable diagnostic "
+        "devices, from suppliers meeting ISO 13485 and FDA compliance standards."
+    ),
+}
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Return a sampler of latencies, in seconds, for a "kind:params" spec."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise argparse.ArgumentTypeError(f"Invalid latency {spec!r}")
+
+
+# Stand-ins
+
+
+class StubStructuredModel:
+    """Answers `with_structured_output` calls with a canned instance of the schema."""
+
+    def __init__(self, schema: Type[BaseModel], latency: Callable[[], float], queries: int) -> None:
+        self.schema = schema
+        self.latency = latency
+        self.queries = queries
+
+    def _parsed(self, prompt: Any) -> BaseModel:
+        n = random.randrange(1_000_000)
+        if self.schema is Queries:
+            # Validated rather than constructed, as the output parser does (Queries is also a dataclass)
+            return Queries.model_validate({"queries": [f"medical polymer supplier {n} {i}" for i in range(self.queries)]})
+        if self.schema is ContactDetails:
+            return ContactDetails(email=f"sales@supplier{n}.example")
+        if self.schema is Supplier:
+            return Supplier(
+                name=f"Supplier {n}",
+                description="Medical-grade polymer compounds for diagnostic devices",
+                standards_compliance="ISO 13485, FDA registered",
+                certifications="ISO 13485:2016",
+                contact_details=ContactDetails(website=f"https://supplier{n}.example"),
+            )
+        return self.schema.model_construct()
+
+    async def ainvoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency())
+        raw = AIMessage(content="", usage_metadata={"input_tokens": 900, "output_tokens": 100, "total_tokens": 1000})
+        return {"raw": raw, "parsed": self._parsed(prompt)}
+
+
+class StubChatModel:
+    """Stands in for a chat model in the calls the search graph makes."""
+
+    def __init__(self, latency: Callable[[], float], queries: int) -> None:
+        self.latency = latency
+        self.queries = queries
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs: Any) -> StubStructuredModel:
+        return StubStructuredModel(schema, self.latency, self.queries)
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "StubChatModel":
+        return self
+
+    async def astream(self, messages: Any, *args: Any, **kwargs: Any):
+        # Stream the Queries tool call one query per chunk, as pipelined mode expects
+        queries = StubStructuredModel(Queries, self.latency, self.queries)._parsed(messages).queries
+        per_chunk = self.latency() / (len(queries) + 1)
+        args_text = json.dumps({"queries": queries})
+        cut = [args_text.index(q) + len(q) + 1 for q in queries]
+        start = 0
+        for i, end in enumerate(cut + [len(args_text)]):
+            await asyncio.sleep(per_chunk)
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": "Queries" if i == 0 else None, "args": args_text[start:end], "id": "q", "index": 0}
+                ],
+                usage_metadata=(
+                    {"input_tokens": 900, "output_tokens": 100, "total_tokens": 1000} if i == len(cut) else None
+                ),
+            )
+            start = end
+
+
+@dataclass
+class StandIns:
+    """Latency samplers and sizes for the stand-in services."""
+
+    llm_latency: Callable[[], float]
+    search_latency: Callable[[], float]
+    fetch_latency: Callable[[], float]
+    queries: int
+    page_kb: int
+
+    def install(self, module: Any) -> None:
+        """Point the search graph at the stand-ins."""
+        stand_ins = self
+        page = ("Medical-grade polymer compounds. ISO 13485 certified. Call +91 20 1234 5678. " * 64)[
+            : self.page_kb * 1024
+        ]
+
+        class StubTavily:
+            def __init__(self, *args: Any, **kwargs: Any) -> None:
+                pass
+
+            def search(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+                # Blocking, like the real client: runs in the default thread pool
+                time.sleep(stand_ins.search_latency())
+                n = random.randrange(1_000_000)
+                return {
+                    "results": [
+                        {"url": f"https://supplier{n}-{i}.example", "title": f"Supplier {n}", "content": page[:500], "score": 0.9 - i / 10}
+                        for i in range(3)
+                    ]
+                }
+
+        async def fetch_page(url: str, configuration: Any, extract_depth: str = "basic") -> ExtractedPage:
+            await asyncio.sleep(stand_ins.fetch_latency())
+            return ExtractedPage(url=url, content=page, depth="local", credits_used=0)
+
+        async def find_contact_details(start_url: str, fetcher: Any, **kwargs: Any) -> CrawlResult:
+            await asyncio.sleep(stand_ins.fetch_latency())
+            return CrawlResult(email=f"info@{start_url.split('//')[-1].split('/')[0]}", source_url=start_url)
+
+        tavily.TavilyClient = StubTavily
+        utils.load_chat_model = lambda name: StubChatModel(self.llm_latency, self.queries)
+        module.fetch_page = fetch_page
+        module.find_contact_details = find_contact_details
+        module.get_configured_fetcher = lambda configuration: None
+
+
+# Sampling
+
+
+def rss_bytes() -> int:
+    """Return the resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs (e.g. macOS): fall back to the peak, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@dataclass
+class Sample:
+    """One reading of the process during a load level."""
+
+    elapsed: float
+    concurrency: int
+    lag_ms: float
+    thread_queue: int
+    rss_mb: float
+    completed: int
+
+
+@dataclass
+class Monitor:
+    """Samples event-loop lag, thread-pool queue depth and RSS at a fixed interval."""
+
+    executor: ThreadPoolExecutor
+    interval: float = 0.05
+    samples: List[Sample] = field(default_factory=list)
+    concurrency: int = 0
+    completed: int = 0
+
+    async def run(self, started: float) -> None:
+        """Sample until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(
+                Sample(
+                    elapsed=time.monotonic() - started,
+                    concurrency=self.concurrency,
+                    lag_ms=max(0.0, loop.time() - expected) * 1000,
+                    thread_queue=self.executor._work_queue.qsize(),
+                    rss_mb=rss_bytes() / 2**20,
+                    completed=self.completed,
+                )
+            )
+
+
+def _quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+
+async def run_level(
+    graph: Any, config: Dict[str, Any], monitor: Monitor, concurrency: int, runs: int
+) -> Dict[str, Any]:
+    """Complete `runs` graph invocations with `concurrency` in flight; return their statistics."""
+    monitor.concurrency = concurrency
+    first_sample = len(monitor.samples)
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one() -> None:
+        nonlocal errors
+        async with slots:
+            start = time.monotonic()
+            try:
+                await graph.ainvoke(INPUT, config)
+            except Exception as e:
+                errors += 1
+                print(f"Error in run: {e}", file=sys.stderr)
+                return
+            latencies.append(time.monotonic() - start)
+            monitor.completed += 1
+
+    rss_before = rss_bytes()
+    start = time.monotonic()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    wall = time.monotonic() - start
+    samples = monitor.samples[first_sample:] or [Sample(0, concurrency, 0.0, 0, rss_bytes() / 2**20, 0)]
+    lags = [s.lag_ms for s in samples]
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": errors,
+        "throughput_per_s": len(latencies) / wall,
+        "run_p50_s": _quantile(latencies, 0.5),
+        "run_p95_s": _quantile(latencies, 0.95),
+        "lag_p50_ms": statistics.median(lags),
+        "lag_p99_ms": _quantile(lags, 0.99),
+        "lag_max_ms": max(lags),
+        "thread_queue_max": max(s.thread_queue for s in samples),
+        "rss_start_mb": rss_before / 2**20,
+        "rss_peak_mb": max(s.rss_mb for s in samples),
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Run every concurrency level in turn and return one report row per level."""
+    module = load_search_graph()
+    StandIns(
+        llm_latency=args.llm_latency,
+        search_latency=args.search_latency,
+        fetch_latency=args.fetch_latency,
+        queries=args.queries,
+        page_kb=args.page_kb,
+    ).install(module)
+    graph = module.get_graph()
+
+    executor = ThreadPoolExecutor(max_workers=args.threads)
+    asyncio.get_running_loop().set_default_executor(executor)
+    config = {
+        "configurable": {
+            "cache_dir": args.cache_dir,
+            "field_cache_ttl_hours": 0,
+            "pipelined": args.pipelined,
+            "scrape_concurrency": args.scrape_concurrency,
+            "cpu_workers": 0,
+        },
+        "recursion_limit": 100,
+    }
+
+    monitor = Monitor(executor, interval=args.sample_interval)
+    monitor_task = asyncio.create_task(monitor.run(time.monotonic()))
+    report = []
+    try:
+        for concurrency in args.concurrency:
+            runs = args.runs or concurrency * 4
+            report.append(await run_level(graph, config, monitor, concurrency, runs))
+    finally:
+        monitor_task.cancel()
+        executor.shutdown(wait=False)
+
+    if args.timeseries:
+        with open(args.timeseries, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(Sample.__dataclass_fields__))
+            writer.writeheader()
+            writer.writerows(s.__dict__ for s in monitor.samples)
+    return report
+
+
+def main() -> None:
+    """Run the load test and print one row per concurrency level."""
+    parser = argparse.ArgumentParser(description="Load test for concurrent search-graph runs")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--runs", type=int, default=0, help="Runs per level (default: 4 x concurrency)")
+    parser.add_argument("--llm-latency", type=parse_latency, default=parse_latency("lognormal:0.5,0.4"))
+    parser.add_argument("--search-latency", type=parse_latency, default=parse_latency("lognormal:0.4,0.5"))
+    parser.add_argument("--fetch-latency", type=parse_latency, default=parse_latency("lognormal:0.3,0.6"))
+    parser.add_argument("--queries", type=int, default=3, help="Queries generated per run")
+    parser.add_argument("--page-kb", type=int, default=4, help="Size of each fetched page")
+    parser.add_argument("--threads", type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                        help="Workers of the default thread pool used by asyncio.to_thread")
+    parser.add_argument("--scrape-concurrency", type=int, default=8)
+    parser.add_argument("--pipelined", action="store_true", help="Run the graph in pipelined mode")
+    parser.add_argument("--sample-interval", type=float, default=0.05)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "enrichment-load-test"))
+    parser.add_argument("--timeseries", help="Write every sample to this CSV file")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{'conc':>5} {'runs/s':>8} {'p50 s':>7} {'p95 s':>7} {'lag p99 ms':>11} "
+        f"{'lag max ms':>11} {'queue max':>10} {'rss peak MB':>12} {'errors':>7}"
+    )
+    for r in report:
+        print(
+            f"{r['concurrency']:>5} {r['throughput_per_s']:>8.2f} {r['run_p50_s']:>7.2f} {r['run_p95_s']:>7.2f} "
+            f"{r['lag_p99_ms']:>11.1f} {r['lag_max_ms']:>11.1f} {r['thread_queue_max']:>10} "
+            f"{r['rss_peak_mb']:>12.1f} {r['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
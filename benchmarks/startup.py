@@ -0,0 +1,89 @@
+"""Measure cold-start time of the package and its entry points.
+
+Each measurement runs in a fresh interpreter, so nothing is cached in
+`sys.modules` between runs:
+
+    python benchmarks/startup.py --runs 10
+
+Stages:
+
+- import: `import enrichment_agent`
+- worker: import the queue worker, which is what a new worker node pays
+  before it can take jobs
+- graph: load `search-graph.py` and compile its graph, as the LangGraph
+  server does for the `agent` entry point
+- first-model: additionally build the configured chat model
+
+Use `python -X importtime -c "import enrichment_agent"` to see which
+imports dominate a stage.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+STAGES = {
+    "import": "import enrichment_agent",
+    "worker": "import enrichment_agent.worker",
+    "graph": (
+        "from enrichment_agent.worker import load_search_graph\n"
+        "load_search_graph().get_graph()"
+    ),
+    "first-model": (
+        "from enrichment_agent.worker import load_search_graph\n"
+        "from enrichment_agent.utils import init_model\n"
+        "load_search_graph().get_graph()\n"
+        "init_model()"
+    ),
+}
+
+_TIMER = """
+import time
+_start = time.perf_counter()
+{code}
+print(time.perf_counter() - _start)
+"""
+
+
+def time_stage(code: str) -> float:
+    """Run `code` in a fresh interpreter and return how long it took, in seconds."""
+    out = subprocess.run(
+        [sys.executable, "-c", _TIMER.format(code=code)],
+        check=True,
+        capture_output=True,
+        text=True,
+        # A placeholder key lets the model client be built without network access
+        env={"OPENAI_API_KEY": "sk-benchmark", **os.environ, "PYTHONPATH": str(SRC)},
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    """Run the benchmark and print the median and worst time per stage."""
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for stage in args.stages:
+        times = [time_stage(STAGES[stage]) for _ in range(args.runs)]
+        results[stage] = {"median_ms": statistics.median(times) * 1000, "max_ms": max(times) * 1000}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'stage':<12} {'median ms':>10} {'max ms':>10}")
+    for stage, r in results.items():
+        print(f"{stage:<12} {r['median_ms']:>10.1f} {r['max_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Measure the per-call overhead of injecting graph state into tools.
+
+Runs a `ToolNode` over a state with a large message history and many search
+results, calling a no-op tool with two signatures:
+
+- before: injected with the whole `State`, as `scrape_websites` used to be
+- after: injected with only the usage counters it reads, as it is now
+
+    python benchmarks/tool_overhead.py --messages 10 1000 5000 --calls 20
+
+Each run issues `--calls` tool calls from one AIMessage, so the time per call
+is dominated by argument injection and validation rather than graph setup.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import InjectedToolArg
+from langgraph.graph import StateGraph
+from langgraph.prebuilt import InjectedState, ToolNode
+from typing_extensions import Annotated
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from enrichment_agent.budget import UsageSnapshot  # noqa: E402
+from enrichment_agent.configuration import Configuration  # noqa: E402
+from enrichment_agent.state import SearchResultRecord, State  # noqa: E402
+
+
+async def before(
+    urls: list[str],
+    *,
+    state: Annotated[State, InjectedState],
+    config: Annotated[RunnableConfig, InjectedToolArg],
+) -> list[dict[str, Any]]:
+    """Look up the extract depth from the whole injected state."""
+    Configuration.from_runnable_config(config).budget.extract_depth(state)
+    return []
+
+
+async def after(
+    urls: list[str],
+    *,
+    tokens_used: Annotated[int, InjectedState("tokens_used")],
+    tavily_credits_used: Annotated[int, InjectedState("tavily_credits_used")],
+    started_at: Annotated[Optional[float], InjectedState("started_at")],
+    config: Annotated[RunnableConfig, InjectedToolArg],
+) -> list[dict[str, Any]]:
+    """Look up the extract depth from the injected usage counters."""
+    usage = UsageSnapshot(tokens_used, tavily_credits_used, started_at)
+    Configuration.from_runnable_config(config).budget.extract_depth(usage)
+    return []
+
+
+def make_state(messages: int, results: int, calls: int, tool: str) -> Dict[str, Any]:
+    """Return graph input with `messages` prior messages ending in `calls` calls to `tool`."""
+    history: List[BaseMessage] = []
+    for i in range(messages // 2):
+        history.append(HumanMessage(content=f"Find suppliers, step {i}. " + "x" * 500, id=f"h{i}"))
+        history.append(ToolMessage(content="y" * 2000, tool_call_id=f"old{i}", id=f"t{i}"))
+    history.append(
+        AIMessage(
+            content="",
+            tool_calls=[
+                {"name": tool, "args": {"urls": [f"https://supplier{j}.example"]}, "id": f"call{j}"}
+                for j in range(calls)
+            ],
+            id="ai",
+        )
+    )
+    return {
+        "company_name": "InnoMed Devices",
+        "company_info": "Medical device manufacturing",
+        "procurement_requirement": "Medical-grade polymers meeting ISO 13485",
+        "messages": history,
+        "search_results": [
+            SearchResultRecord(url=f"https://result{i}.example", title=f"Result {i}", score=0.5)
+            for i in range(results)
+        ],
+    }
+
+
+async def time_tool(tool: Any, state: Dict[str, Any], runs: int) -> List[float]:
+    """Run the tool node `runs` times over `state` and return the time of each run."""
+    workflow = StateGraph(State)
+    workflow.add_node("tools", ToolNode([tool]))
+    workflow.add_edge("__start__", "tools")
+    graph = workflow.compile()
+    await graph.ainvoke(state)  # warm up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await graph.ainvoke(state)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+async def run(messages: List[int], results: int, calls: int, runs: int) -> Dict[str, Any]:
+    """Return the median time per tool call, in ms, before and after, for each history size."""
+    report = {}
+    for n in messages:
+        row = {}
+        for tool in (before, after):
+            times = await time_tool(tool, make_state(n, results, calls, tool.__name__), runs)
+            row[f"{tool.__name__}_ms_per_call"] = statistics.median(times) * 1000 / calls
+        row["speedup"] = row["before_ms_per_call"] / row["after_ms_per_call"]
+        report[n] = row
+    return report
+
+
+def main() -> None:
+    """Run the benchmark and print the time per tool call for each history size."""
+    parser = argparse.ArgumentParser(description="Tool state-injection overhead benchmark")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 1000, 5000])
+    parser.add_argument("--results", type=int, default=500, help="Search results in the state")
+    parser.add_argument("--calls", type=int, default=20, help="Tool calls per run")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.messages, args.results, args.calls, args.runs))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'messages':>8} {'before ms/call':>15} {'after ms/call':>14} {'speedup':>8}")
+    for n, r in report.items():
+        print(f"{n:>8} {r['before_ms_per_call']:>15.3f} {r['after_ms_per_call']:>14.3f} {r['speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
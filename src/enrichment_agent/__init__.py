@@ -1,5 +1,16 @@
 """Enrichment for a pre-defined schema."""
 
-from enrichment_agent.graph import graph
+from typing import Any
 
 __all__ = ["graph"]
+
+
+def __getattr__(name: str) -> Any:
+    # Import and compile the graph on first access, so importing the package
+    # (e.g. in a queue worker) does not load the model and tool stack
+    if name == "graph":
+        from enrichment_agent.agent import get_graph
+
+        graph = globals()["graph"] = get_graph()
+        return graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
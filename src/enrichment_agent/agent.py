@@ -3,20 +3,26 @@
 Works with a chat model with tool calling support.
 """
 
+import functools
 import json
+import time
+from dataclasses import asdict
 from typing import Any, Dict, List, Literal, Optional, cast
 
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel, Field
 
 from enrichment_agent import prompts
+from enrichment_agent.budget import usage_tokens
 from enrichment_agent.configuration import Configuration
+from enrichment_agent.quality import score_completeness
 from enrichment_agent.state import InputState, OutputState, State
-from enrichment_agent.tools import scrape_website, search
-from enrichment_agent.utils import init_model
+from enrichment_agent.tools import scrape_websites, search
+from enrichment_agent.utils import init_model, prepare_context
 
 
 async def call_agent_model(
@@ -46,12 +52,13 @@ async def call_agent_model(
         info=json.dumps(state.extraction_schema, indent=2), topic=state.topic
     )
 
-    # Create the messages list with the formatted prompt and the previous messages
-    messages = [HumanMessage(content=p)] + state.messages
+    # Create the messages list with the formatted prompt and the previous messages,
+    # digesting tool results the model has already seen when context_mode is "compact"
+    messages = [HumanMessage(content=p)] + prepare_context(state.messages, config)
 
     # Initialize the raw model with the provided configuration and bind the tools
-    raw_model = init_model(config)
-    model = raw_model.bind_tools([scrape_website, search, info_tool], tool_choice="any")
+    raw_model = init_model(config, role="planner")
+    model = raw_model.bind_tools([scrape_websites, search, info_tool], tool_choice="any")
     response = cast(AIMessage, await model.ainvoke(messages))
 
     # Initialize info to None
@@ -79,6 +86,8 @@ async def call_agent_model(
         "info": info,
         # Add 1 to the step count
         "loop_step": 1,
+        "tokens_used": usage_tokens(response),
+        "started_at": state.started_at or time.time(),
     }
 
 
@@ -105,11 +114,13 @@ async def reflect(
 
     This asynchronous function performs the following steps:
     1. Prepares the initial prompt using the main prompt template.
-    2. Constructs a message history for the model.
-    3. Prepares a checker prompt to evaluate the presumed info.
-    4. Initializes and configures a language model with structured output.
-    5. Invokes the model to assess the quality of the gathered information.
-    6. Processes the model's response and determines if the info is satisfactory.
+    2. Scores the presumed info deterministically, accepting or rejecting clear-cut
+       cases without an LLM call.
+    3. Constructs a message history for the model.
+    4. Prepares a checker prompt to evaluate the presumed info.
+    5. Initializes and configures a language model with structured output.
+    6. Invokes the model to assess the quality of borderline information.
+    7. Processes the model's response and determines if the info is satisfactory.
     """
     p = prompts.MAIN_PROMPT.format(
         info=json.dumps(state.extraction_schema, indent=2), topic=state.topic
@@ -120,8 +131,46 @@ async def reflect(
             f"{reflect.__name__} expects the last message in the state to be an AI message with tool calls."
             f" Got: {type(last_message)}"
         )
-    messages = [HumanMessage(content=p)] + state.messages[:-1]
     presumed_info = state.info
+    tool_call_id = last_message.tool_calls[0]["id"]
+
+    # Settle clear-cut cases with the deterministic scorer before paying for an LLM call
+    configuration = Configuration.from_runnable_config(config)
+    report = score_completeness(
+        presumed_info or {}, state.extraction_schema, configuration.min_suppliers
+    )
+    verdict = report.verdict(
+        configuration.completeness_accept_threshold,
+        configuration.completeness_reject_threshold,
+    )
+    if verdict == "accept":
+        return {
+            "info": presumed_info,
+            "messages": [
+                ToolMessage(
+                    tool_call_id=tool_call_id,
+                    content=f"Completeness score {report.score:.2f} meets the acceptance threshold.",
+                    name="Info",
+                    additional_kwargs={"artifact": asdict(report)},
+                    status="success",
+                )
+            ],
+        }
+    if verdict == "reject":
+        issues = "\n".join(f"- {issue}" for issue in report.issues[:20])
+        return {
+            "messages": [
+                ToolMessage(
+                    tool_call_id=tool_call_id,
+                    content=f"Unsatisfactory response (completeness score {report.score:.2f}):\n{issues}",
+                    name="Info",
+                    additional_kwargs={"artifact": asdict(report)},
+                    status="error",
+                )
+            ]
+        }
+
+    messages = [HumanMessage(content=p)] + prepare_context(state.messages[:-1], config)
     checker_prompt = """I am thinking of calling the info tool with the info below. \
 Is this good? Give your reasoning as well. \
 You can encourage the Assistant to look at specific URLs if that seems relevant, or do more searches.
@@ -130,15 +179,18 @@ If you don't think it is good, you should be very specific about what could be i
 {presumed_info}"""
     p1 = checker_prompt.format(presumed_info=json.dumps(presumed_info or {}, indent=2))
     messages.append(HumanMessage(content=p1))
-    raw_model = init_model(config)
-    bound_model = raw_model.with_structured_output(InfoIsSatisfactory)
-    response = cast(InfoIsSatisfactory, await bound_model.ainvoke(messages))
+    raw_model = init_model(config, role="reflector")
+    bound_model = raw_model.with_structured_output(InfoIsSatisfactory, include_raw=True)
+    result = await bound_model.ainvoke(messages)
+    response = cast(InfoIsSatisfactory, result["parsed"])
+    tokens_used = usage_tokens(result["raw"])
     if response.is_satisfactory and presumed_info:
         return {
             "info": presumed_info,
+            "tokens_used": tokens_used,
             "messages": [
                 ToolMessage(
-                    tool_call_id=last_message.tool_calls[0]["id"],
+                    tool_call_id=tool_call_id,
                     content="\n".join(response.reason),
                     name="Info",
                     additional_kwargs={"artifact": response.model_dump()},
@@ -148,9 +200,10 @@ If you don't think it is good, you should be very specific about what could be i
         }
     else:
         return {
+            "tokens_used": tokens_used,
             "messages": [
                 ToolMessage(
-                    tool_call_id=last_message.tool_calls[0]["id"],
+                    tool_call_id=tool_call_id,
                     content=f"Unsatisfactory response:\n{response.improvement_instructions}",
                     name="Info",
                     additional_kwargs={"artifact": response.model_dump()},
@@ -161,19 +214,23 @@ If you don't think it is good, you should be very specific about what could be i
 
 
 def route_after_agent(
-    state: State,
+    state: State, config: RunnableConfig
 ) -> Literal["reflect", "tools", "call_agent_model", "__end__"]:
     """Schedule the next node after the agent's action.
 
     This function determines the next step in the research process based on the
-    last message in the state. It handles three main scenarios:
+    last message in the state. It handles four main scenarios:
 
-    1. Error recovery: If the last message is unexpectedly not an AIMessage.
-    2. Info submission: If the agent has called the "Info" tool to submit findings.
-    3. Continued research: If the agent has called any other tool.
+    1. Budget exhaustion: If the run has used up its budget, it ends.
+    2. Error recovery: If the last message is unexpectedly not an AIMessage.
+    3. Info submission: If the agent has called the "Info" tool to submit findings.
+    4. Continued research: If the agent has called any other tool.
     """
     last_message = state.messages[-1]
 
+    if Configuration.from_runnable_config(config).budget.exhausted(state):
+        return "__end__"
+
     # "If for some reason the last message is not an AIMessage (due to a bug or unexpected behavior elsewhere in the code),
     # it ensures the system doesn't crash but instead tries to recover by calling the agent model again.
     if not isinstance(last_message, AIMessage):
@@ -219,11 +276,23 @@ workflow = StateGraph(
 )
 workflow.add_node(call_agent_model)
 workflow.add_node(reflect)
-workflow.add_node("tools", ToolNode([search, scrape_website]))
+workflow.add_node("tools", ToolNode([search, scrape_websites]))
 workflow.add_edge("__start__", "call_agent_model")
 workflow.add_conditional_edges("call_agent_model", route_after_agent)
 workflow.add_edge("tools", "call_agent_model")
 workflow.add_conditional_edges("reflect", route_after_checker)
 
-graph = workflow.compile()
-graph.name = "ResearchTopic"
+
+
+@functools.cache
+def get_graph() -> CompiledStateGraph:
+    """Compile the graph on first use and return the shared instance."""
+    compiled = workflow.compile()
+    compiled.name = "ResearchTopic"
+    return compiled
+
+
+def __getattr__(name: str) -> Any:
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
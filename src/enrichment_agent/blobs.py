@@ -0,0 +1,190 @@
+"""Content-addressed blob store for fetched page and snippet text.
+
+State holds only a content key (the SHA-256 of the text) and the text itself
+lives here, compressed on local disk under `Configuration.cache_dir`, so the
+same content is stored once however many records, branches, checkpoints or
+runs refer to it. A URL index maps fetched pages to their content so a page
+is fetched once and then served from disk until it goes stale.
+
+Blobs are read through `mmap` and decompressed straight from the mapping.
+When the store grows past its size bound, the least recently used blobs are
+evicted.
+
+Several processes (CPU pool workers, queue workers) may share a store
+directory. The disk is the source of truth: each process keeps only an
+estimate of the store's contents and size, checks the disk on a miss, and
+re-reads the directory before evicting and every `_RESCAN_INTERVAL` seconds,
+so blobs written or evicted by other processes are accounted for.
+"""
+
+import functools
+import hashlib
+import mmap
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+def content_key(text: str) -> str:
+    """Return the content address of `text`."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class DiskBlobStore:
+    """Size-bounded, content-addressed store of zlib-compressed text on disk."""
+
+    _RESCAN_INTERVAL = 60.0
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Open (or create) a store under `root` holding at most `max_bytes` of blobs."""
+        self.root = root
+        self.max_bytes = max_bytes
+        self._blob_dir = root / "blobs"
+        self._url_dir = root / "urls"
+        self._blob_dir.mkdir(parents=True, exist_ok=True)
+        self._url_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, int] = {}
+        self._total = 0
+        self._next_rescan = 0.0
+        with self._lock:
+            self._rescan()
+
+    def _rescan(self) -> None:
+        """Re-read the blobs on disk, including other processes' writes. Caller holds the lock."""
+        sizes = {}
+        for path in self._blob_dir.glob("*/*"):
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                sizes[path.name] = path.stat().st_size
+            except OSError:
+                pass  # evicted by another process meanwhile
+        self._sizes = sizes
+        self._total = sum(sizes.values())
+        self._next_rescan = time.monotonic() + self._RESCAN_INTERVAL
+
+    def _known(self, key: str) -> bool:
+        """Return whether `key` is stored, checking the disk when this process has not seen it."""
+        with self._lock:
+            if key in self._sizes:
+                return True
+        try:
+            size = self._blob_path(key).stat().st_size
+        except OSError:
+            return False
+        with self._lock:
+            if key not in self._sizes:
+                self._sizes[key] = size
+                self._total += size
+        return True
+
+    def _blob_path(self, key: str) -> Path:
+        return self._blob_dir / key[:2] / key
+
+    def _url_path(self, url: str) -> Path:
+        return self._url_dir / hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def put(self, text: str) -> str:
+        """Store `text` and return its key; storing the same text again is a no-op."""
+        key = content_key(text)
+        path = self._blob_path(key)
+        if path.exists():
+            self._known(key)
+            return key
+        data = zlib.compress(text.encode("utf-8"), 6)
+        self._write_atomic(path, data)
+        with self._lock:
+            if key not in self._sizes:
+                self._sizes[key] = len(data)
+                self._total += len(data)
+            if time.monotonic() >= self._next_rescan:
+                self._rescan()
+            self._evict()
+        return key
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the text stored under `key`, or None if it is not present."""
+        path = self._blob_path(key)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = zlib.decompress(mm).decode("utf-8")
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError, zlib.error):
+            with self._lock:
+                # Possibly evicted by another process
+                self._total -= self._sizes.pop(key, 0)
+            return None
+        return text
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether `key` is stored."""
+        return self._blob_path(key).exists()
+
+    def put_url(self, url: str, text: str) -> str:
+        """Store the fetched content of `url` and index it by URL; return its key."""
+        key = self.put(text)
+        self._write_atomic(self._url_path(url), f"{time.time()}\n{key}".encode())
+        return key
+
+    def lookup_url(self, url: str, max_age: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Return (key, fetched_at) for `url` if it was stored within `max_age` seconds."""
+        try:
+            fetched_at, key = self._url_path(url).read_text().split("\n", 1)
+        except (OSError, ValueError):
+            return None
+        if max_age is not None and time.time() - float(fetched_at) > max_age:
+            return None
+        return (key, float(fetched_at)) if self._known(key) else None
+
+    def get_url(self, url: str, max_age: Optional[float] = None) -> Optional[str]:
+        """Return the stored content of `url` if it is present and fresh."""
+        found = self.lookup_url(url, max_age)
+        return self.get(found[0]) if found else None
+
+    def _evict(self) -> None:
+        """Remove least recently used blobs until the store fits its bound. Caller holds the lock."""
+        if self._total <= self.max_bytes:
+            return
+        # Other processes may have written or evicted blobs since the last scan
+        self._rescan()
+        if self._total <= self.max_bytes:
+            return
+        by_age = []
+        for key in self._sizes:
+            try:
+                by_age.append((self._blob_path(key).stat().st_mtime, key))
+            except OSError:
+                by_age.append((0.0, key))
+        by_age.sort()
+        for _, key in by_age:
+            if self._total <= self.max_bytes:
+                break
+            try:
+                self._blob_path(key).unlink()
+            except OSError:
+                pass
+            self._total -= self._sizes.pop(key)
+
+
+@functools.cache
+def get_blob_store(cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES) -> DiskBlobStore:
+    """Return the process-wide blob store for a cache directory.
+
+    Pass the configured bound (`Configuration.blob_store_max_mb`) from every
+    process sharing the directory, so they all evict against the same limit.
+    """
+    return DiskBlobStore(Path(cache_dir), max_bytes)
@@ -0,0 +1,109 @@
+"""Run-level budget for LLM tokens, Tavily credits and wall time.
+
+Usage is accumulated in the graph state (`tokens_used`, `tavily_credits_used`,
+`started_at`) so every node, including parallel `Send` branches, contributes to
+the same totals. Routing functions consult the budget to degrade the run as it
+is consumed: fewer queries, basic instead of advanced extraction, and no email
+crawl, until the run stops fanning out altogether.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Literal, Optional, Protocol
+
+# Approximate Tavily credit cost of each call type.
+TAVILY_CREDIT_COSTS = {
+    "search": 1,
+    "extract_basic": 1,
+    "extract_advanced": 2,
+    "crawl": 2,
+}
+
+
+class Usage(Protocol):
+    """The usage counters the budget reads from the graph state."""
+
+    tokens_used: int
+    tavily_credits_used: int
+    started_at: Optional[float]
+
+
+@dataclass
+class UsageSnapshot:
+    """Usage counters copied out of the graph state, e.g. by a tool injected with only these fields."""
+
+    tokens_used: int = 0
+    tavily_credits_used: int = 0
+    started_at: Optional[float] = None
+
+
+def usage_tokens(message: Any) -> int:
+    """Return the total token count reported on a chat model response, or 0."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return int(usage.get("total_tokens", 0))
+
+
+def extract_cost(extract_depth: str) -> int:
+    """Return the credit cost of a single-URL extract at the given depth."""
+    return TAVILY_CREDIT_COSTS[f"extract_{extract_depth}"]
+
+
+@dataclass(kw_only=True)
+class Budget:
+    """Limits for a single run. A limit of None is unbounded."""
+
+    max_llm_tokens: Optional[int] = None
+    max_tavily_credits: Optional[int] = None
+    max_wall_seconds: Optional[float] = None
+
+    degrade_at: float = 0.5
+    """Fraction of the budget consumed after which queries are trimmed and extraction drops to basic."""
+
+    skip_email_crawl_at: float = 0.7
+    """Fraction of the budget consumed after which the email crawl fallback is skipped."""
+
+    def consumed(self, usage: Usage, now: Optional[float] = None) -> float:
+        """Return the largest fraction consumed across all limits."""
+        fractions = [0.0]
+        if self.max_llm_tokens:
+            fractions.append(usage.tokens_used / self.max_llm_tokens)
+        if self.max_tavily_credits:
+            fractions.append(usage.tavily_credits_used / self.max_tavily_credits)
+        if self.max_wall_seconds and usage.started_at is not None:
+            elapsed = (now or time.time()) - usage.started_at
+            fractions.append(elapsed / self.max_wall_seconds)
+        return max(fractions)
+
+    def exhausted(self, usage: Usage) -> bool:
+        """Return whether any limit has been reached."""
+        return self.consumed(usage) >= 1.0
+
+    def remaining_credits(self, usage: Usage) -> float:
+        """Return the Tavily credits left, or infinity when unbounded."""
+        if not self.max_tavily_credits:
+            return math.inf
+        return max(0, self.max_tavily_credits - usage.tavily_credits_used)
+
+    def extract_depth(self, usage: Usage) -> Literal["basic", "advanced"]:
+        """Return the extract depth affordable at the current consumption."""
+        return "basic" if self.consumed(usage) >= self.degrade_at else "advanced"
+
+    def allow_email_crawl(self, usage: Usage) -> bool:
+        """Return whether the email crawl fallback is still affordable."""
+        return self.consumed(usage) < self.skip_email_crawl_at
+
+    def max_fanout(self, requested: int, usage: Usage, credits_per_item: int) -> int:
+        """Return how many of `requested` parallel branches the budget allows.
+
+        Past `degrade_at` the count shrinks in proportion to the budget left, and it
+        never exceeds what the remaining Tavily credits can pay for.
+        """
+        consumed = self.consumed(usage)
+        if consumed >= 1.0:
+            return 0
+        allowed = requested
+        if consumed >= self.degrade_at:
+            allowed = max(1, math.ceil(requested * (1.0 - consumed)))
+        affordable = self.remaining_credits(usage) / max(1, credits_per_item)
+        return int(min(allowed, affordable))
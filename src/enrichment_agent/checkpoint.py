@@ -0,0 +1,237 @@
+"""Local SQLite checkpointing for resumable runs.
+
+With a checkpointer attached, LangGraph saves the writes of every completed
+task as it finishes, including each parallel `search_node` and
+`crawl_and_extract` branch. Re-invoking the graph with the same thread id and
+no input resumes the interrupted step and only re-runs the branches that had
+not finished.
+
+The stock SQLite saver serializes every channel of the state into every
+checkpoint, so each step re-writes the whole message history, search results
+and suppliers. `IncrementalSqliteSaver` instead stores each channel value once
+per channel version, like LangGraph's Postgres saver: a step serializes only
+the channels it changed, and a checkpoint row holds just the version map.
+
+Requires the optional `langgraph-checkpoint-sqlite` package
+(`pip install "enrichment-agent[checkpoint]"`).
+"""
+
+import contextlib
+import functools
+import json
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_metadata,
+)
+from langgraph.graph.state import CompiledStateGraph, StateGraph
+
+# WAL lets readers run alongside the writer and, with synchronous=NORMAL, only
+# fsyncs at WAL checkpoints rather than on every committed task write.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+@functools.cache
+def _incremental_saver_class() -> type:
+    """Define `IncrementalSqliteSaver` on first use, as its base class is an optional dependency."""
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class IncrementalSqliteSaver(AsyncSqliteSaver):
+        """`AsyncSqliteSaver` that writes each channel value once per channel version."""
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            # (thread, namespace, channel, version) already written by this saver
+            self._stored: Set[Tuple[str, str, str, str]] = set()
+
+        async def setup(self) -> None:  # noqa: D102
+            if self.is_setup:
+                return
+            async with self.lock:
+                await self.conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+                        thread_id TEXT NOT NULL,
+                        checkpoint_ns TEXT NOT NULL DEFAULT '',
+                        channel TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        type TEXT NOT NULL,
+                        blob BLOB,
+                        PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+                    )
+                    """
+                )
+                await self.conn.commit()
+            await super().setup()
+
+        async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+        ) -> RunnableConfig:
+            """Save the changed channel values and the checkpoint in one transaction."""
+            await self.setup()
+            thread_id = str(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            versions = checkpoint["channel_versions"]
+            rows, keys = [], []
+            for channel, value in checkpoint["channel_values"].items():
+                key = (thread_id, checkpoint_ns, channel, str(versions.get(channel, "")))
+                # Unchanged channels were written at an earlier step
+                if channel not in new_versions and key in self._stored:
+                    continue
+                rows.append((*key, *self.serde.dumps_typed(value)))
+                keys.append(key)
+            # The checkpoint row holds only the version map; values are loaded from checkpoint_blobs
+            stripped = checkpoint.copy()
+            stripped["channel_values"] = {}
+            type_, serialized = self.serde.dumps_typed(stripped)
+            serialized_metadata = json.dumps(
+                get_checkpoint_metadata(config, metadata), ensure_ascii=False
+            ).encode("utf-8", "ignore")
+            async with self.lock:
+                try:
+                    await self.conn.executemany(
+                        "INSERT OR IGNORE INTO checkpoint_blobs "
+                        "(thread_id, checkpoint_ns, channel, version, type, blob) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    await self.conn.execute(
+                        "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                        "parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            thread_id,
+                            checkpoint_ns,
+                            checkpoint["id"],
+                            config["configurable"].get("checkpoint_id"),
+                            type_,
+                            serialized,
+                            serialized_metadata,
+                        ),
+                    )
+                    await self.conn.commit()
+                except BaseException:
+                    await self.conn.rollback()
+                    raise
+            self._stored.update(keys)
+            return {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint["id"],
+                }
+            }
+
+        async def _load_values(self, tup: CheckpointTuple) -> CheckpointTuple:
+            versions = tup.checkpoint["channel_versions"]
+            if not versions:
+                return tup
+            thread_id = str(tup.config["configurable"]["thread_id"])
+            checkpoint_ns = tup.config["configurable"].get("checkpoint_ns", "")
+            pairs = [(channel, str(version)) for channel, version in versions.items()]
+            async with self.lock, self.conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT channel, type, blob FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                    f"AND (channel, version) IN (VALUES {', '.join('(?, ?)' for _ in pairs)})",
+                    (thread_id, checkpoint_ns, *(v for pair in pairs for v in pair)),
+                )
+                rows = await cur.fetchall()
+            # Checkpoints written by the stock saver keep their values inline
+            tup.checkpoint["channel_values"] = {
+                **tup.checkpoint["channel_values"],
+                **{channel: self.serde.loads_typed((type_, blob)) for channel, type_, blob in rows},
+            }
+            return tup
+
+        async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:  # noqa: D102
+            tup = await super().aget_tuple(config)
+            return await self._load_values(tup) if tup else None
+
+        async def alist(  # noqa: D102
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+        ) -> AsyncIterator[CheckpointTuple]:
+            async for tup in super().alist(config, filter=filter, before=before, limit=limit):
+                yield await self._load_values(tup)
+
+        async def adelete_thread(self, thread_id: str) -> None:  # noqa: D102
+            await super().adelete_thread(thread_id)
+            async with self.lock:
+                await self.conn.execute("DELETE FROM checkpoint_blobs WHERE thread_id = ?", (str(thread_id),))
+                await self.conn.commit()
+            self._stored = {key for key in self._stored if key[0] != str(thread_id)}
+
+    return IncrementalSqliteSaver
+
+
+@contextlib.asynccontextmanager
+async def sqlite_checkpointer(path: str) -> AsyncIterator[Any]:
+    """Open an `IncrementalSqliteSaver` on a local database file tuned for frequent small writes."""
+    try:
+        import aiosqlite
+
+        saver_class = _incremental_saver_class()
+    except ImportError as e:
+        raise ImportError(
+            "Checkpointing requires langgraph-checkpoint-sqlite. "
+            'Install it with: pip install "enrichment-agent[checkpoint]"'
+        ) from e
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    async with aiosqlite.connect(path) as conn:
+        for pragma in _PRAGMAS:
+            await conn.execute(pragma)
+        saver = saver_class(conn)
+        await saver.setup()
+        yield saver
+
+
+async def resume_or_start(
+    graph: CompiledStateGraph[Any, Any, Any, Any], input: Dict[str, Any], config: RunnableConfig
+) -> Dict[str, Any]:
+    """Run a checkpointed graph on the config's thread, resuming it if it already exists.
+
+    A thread with pending tasks is resumed from its last checkpoint, re-running only
+    unfinished branches; a finished thread returns its final output without running
+    anything; a new thread starts from `input`. The result always has the graph's
+    output shape.
+    """
+    snapshot = await graph.aget_state(config)
+    return await graph.ainvoke(None if snapshot.values else input, config)
+
+
+async def run_resumable(
+    workflow: StateGraph[Any, Any, Any, Any],
+    input: Dict[str, Any],
+    *,
+    thread_id: str,
+    path: str,
+    config: Optional[RunnableConfig] = None,
+) -> Dict[str, Any]:
+    """Run `workflow` under a SQLite checkpointer, resuming `thread_id` if it was interrupted.
+
+    See `resume_or_start`.
+    """
+    run_config: RunnableConfig = {
+        **(config or {}),
+        "configurable": {**(config or {}).get("configurable", {}), "thread_id": thread_id},
+    }
+    async with sqlite_checkpointer(path) as saver:
+        graph: CompiledStateGraph[Any, Any, Any, Any] = workflow.compile(checkpointer=saver)
+        return await resume_or_start(graph, input, run_config)
@@ -0,0 +1,54 @@
+"""Chunked processing of very large pages.
+
+Advanced extraction of a catalogue page can return megabytes of text. Rather
+than passing it to the model whole, the page is split into token-bounded
+chunks that are extracted one at a time, and the partial suppliers found in
+each are merged. Chunks are produced lazily, so only one is held in addition
+to the page, and processing stops as soon as the required fields are filled.
+The page itself is capped at `Configuration.max_page_chars` when it is
+fetched (see extraction.py).
+"""
+
+from typing import Iterable, Iterator, List
+
+from enrichment_agent.provenance import SUPPLIER_FIELDS, get_field
+from enrichment_agent.state import Supplier
+
+# Rough average for English web text; errs towards smaller chunks for denser text
+CHARS_PER_TOKEN = 4
+
+# The fields that must be filled before the remaining chunks of a page are skipped
+REQUIRED_FIELDS = SUPPLIER_FIELDS + ("contact_details.email", "contact_details.phone")
+
+_BREAKS = ("\n\n", "\n", ". ", " ")
+
+
+def estimate_tokens(text: str) -> int:
+    """Return an estimate of the number of tokens in `text`."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def iter_chunks(text: str, max_tokens: int) -> Iterator[str]:
+    """Yield consecutive chunks of `text` of at most about `max_tokens` tokens each.
+
+    Chunks end at a paragraph, line, sentence or word break when there is one
+    in the second half of the window, so records are rarely cut in two.
+    Joining the chunks gives back `text`.
+    """
+    limit = max(1, max_tokens * CHARS_PER_TOKEN)
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + limit)
+        if end < len(text):
+            for separator in _BREAKS:
+                cut = text.rfind(separator, start + limit // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        yield text[start:end]
+        start = end
+
+
+def unfilled_fields(supplier: Supplier, paths: Iterable[str] = REQUIRED_FIELDS) -> List[str]:
+    """Return the field paths of `supplier` that are still empty."""
+    return [path for path in paths if not get_field(supplier, path)]
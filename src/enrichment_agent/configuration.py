@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field, fields
-from typing import Annotated, Optional
+from typing import Annotated, Literal, Optional
 
 from langchain_core.runnables import RunnableConfig, ensure_config
 
 from enrichment_agent import prompts
+from enrichment_agent.budget import Budget
+
+ModelRole = Literal["planner", "extractor", "reflector"]
 
 
 @dataclass(kw_only=True)
@@ -22,6 +25,46 @@ class Configuration:
         },
     )
 
+    planner_model: Annotated[Optional[str], {"__template_metadata__": {"kind": "llm"}}] = field(
+        default=None,
+        metadata={
+            "description": "The model that plans research and generates search queries. "
+            "Defaults to `model`."
+        },
+    )
+
+    extractor_model: Annotated[Optional[str], {"__template_metadata__": {"kind": "llm"}}] = field(
+        default=None,
+        metadata={
+            "description": "The model that extracts a Supplier from each page; a cheaper model than "
+            "`model` is usually enough. Defaults to `model`."
+        },
+    )
+
+    reflector_model: Annotated[Optional[str], {"__template_metadata__": {"kind": "llm"}}] = field(
+        default=None,
+        metadata={
+            "description": "The model that judges whether gathered info is satisfactory. "
+            "Defaults to `model`."
+        },
+    )
+
+    extraction_escalation: bool = field(
+        default=True,
+        metadata={
+            "description": "Retry an extraction on `model` when the extractor model's output fails "
+            "Supplier validation or scores below min_extraction_confidence."
+        },
+    )
+
+    min_extraction_confidence: float = field(
+        default=0.6,
+        metadata={
+            "description": "Confidence (0-1) an extracted supplier needs to be kept without escalating "
+            "to `model`. Checks that the name and contact details are grounded in the page."
+        },
+    )
+
     prompt: str = field(
         default=prompts.MAIN_PROMPT,
         metadata={
@@ -37,6 +80,40 @@ class Configuration:
         },
     )
 
+    results_per_query: int = field(
+        default=1,
+        metadata={
+            "description": "The number of top-scoring search results per query that are kept and extracted."
+        },
+    )
+
+    query_planner: Literal["static", "coverage"] = field(
+        default="static",
+        metadata={
+            "description": "How the search graph plans its queries. 'static' searches one batch of queries; "
+            "'coverage' splits the requirement into facets (products, certifications) and, after each "
+            "round, searches again only for facets with fewer than facet_target_suppliers suppliers."
+        },
+    )
+
+    facet_target_suppliers: int = field(
+        default=3,
+        metadata={
+            "description": "The number of distinct suppliers each facet needs before the coverage "
+            "planner stops searching for it."
+        },
+    )
+
+    queries_per_facet: int = field(
+        default=2,
+        metadata={"description": "The most follow-up queries the coverage planner issues per under-covered facet."},
+    )
+
+    max_search_rounds: int = field(
+        default=3,
+        metadata={"description": "The most search rounds the coverage planner runs, including the first."},
+    )
+
     max_info_tool_calls: int = field(
         default=3,
         metadata={
@@ -51,6 +128,298 @@ class Configuration:
         },
     )
 
+    completeness_accept_threshold: float = field(
+        default=0.9,
+        metadata={
+            "description": "Submitted info scoring at or above this completeness is accepted without "
+            "calling the LLM reflector. Set above 1 to always reflect with the LLM."
+        },
+    )
+
+    completeness_reject_threshold: float = field(
+        default=0.5,
+        metadata={
+            "description": "Submitted info scoring below this completeness is rejected without "
+            "calling the LLM reflector. Set to 0 to never reject deterministically."
+        },
+    )
+
+    min_suppliers: int = field(
+        default=3,
+        metadata={
+            "description": "The number of entries a list in the submitted info (e.g. suppliers) "
+            "must hold to count as complete."
+        },
+    )
+
+    scrape_concurrency: int = field(
+        default=8,
+        metadata={
+            "description": "The maximum number of URLs fetched and extracted concurrently by a single scrape tool call."
+        },
+    )
+
+    max_scrape_chars: int = field(
+        default=20000,
+        metadata={
+            "description": "The maximum number of characters of page content passed to the model for each scraped URL."
+        },
+    )
+
+    max_page_chars: int = field(
+        default=1_000_000,
+        metadata={
+            "description": "Hard cap on the characters of content kept per fetched page; longer content "
+            "is truncated before it is stored or processed."
+        },
+    )
+
+    extraction_chunk_tokens: int = field(
+        default=6000,
+        metadata={
+            "description": "Pages longer than this many (estimated) tokens are extracted in chunks of at "
+            "most this size, and the suppliers found in each are merged."
+        },
+    )
+
+    max_extraction_chunks: int = field(
+        default=8,
+        metadata={
+            "description": "The most chunks of a large page sent to the model. Extraction stops earlier "
+            "once the supplier's required fields are filled."
+        },
+    )
+
+    adaptive_extract_depth: bool = field(
+        default=True,
+        metadata={
+            "description": "Extract pages at basic depth first and escalate to advanced depth only when "
+            "the content looks insufficient, learning per domain which depth works."
+        },
+    )
+
+    min_content_chars: int = field(
+        default=500,
+        metadata={
+            "description": "Extracted content shorter than this is considered insufficient and escalated."
+        },
+    )
+
+    fetch_engine: Literal["tavily", "local"] = field(
+        default="tavily",
+        metadata={
+            "description": "How page content is fetched. 'local' fetches pages directly over HTTP and "
+            "converts them to text, falling back to Tavily extract when the result looks like a "
+            "JS-rendered page; 'tavily' always uses Tavily extract."
+        },
+    )
+
+    fetch_politeness_delay: float = field(
+        default=1.0,
+        metadata={
+            "description": "The minimum number of seconds between the starts of two fetches to the same host."
+        },
+    )
+
+    per_host_concurrency: int = field(
+        default=2,
+        metadata={
+            "description": "The maximum number of fetches in flight to any one host, shared by all runs in the process."
+        },
+    )
+
+    max_fetch_concurrency: int = field(
+        default=32,
+        metadata={
+            "description": "The maximum number of fetches in flight across all hosts, shared by all runs in the process."
+        },
+    )
+
+    respect_robots_txt: bool = field(
+        default=True,
+        metadata={"description": "Whether local fetches honour each site's robots.txt."},
+    )
+
+    email_crawl_engine: Literal["local", "tavily"] = field(
+        default="local",
+        metadata={
+            "description": "How a supplier's site is searched for a missing email. 'local' runs a "
+            "small best-first crawl over contact/about pages; 'tavily' uses a remote Tavily crawl "
+            "followed by a contact-details-only extraction of the page it finds."
+        },
+    )
+
+    crawl_max_pages: int = field(
+        default=5,
+        metadata={"description": "The most pages a local email crawl fetches per supplier."},
+    )
+
+    crawl_time_budget_seconds: float = field(
+        default=15.0,
+        metadata={"description": "The most seconds a local email crawl spends per supplier."},
+    )
+
+    cache_dir: str = field(
+        default=".cache/enrichment_agent",
+        metadata={
+            "description": "Directory for state persisted across runs, such as per-domain extract depth hints."
+        },
+    )
+
+    blob_store_max_mb: int = field(
+        default=512,
+        metadata={
+            "description": "The size bound of the on-disk page content store under cache_dir; "
+            "least recently used content is evicted beyond it."
+        },
+    )
+
+    page_cache_ttl_hours: float = field(
+        default=168.0,
+        metadata={
+            "description": "How long fetched page content is reused from the content store before "
+            "the page is fetched again."
+        },
+    )
+
+    cpu_workers: int = field(
+        default=0,
+        metadata={
+            "description": "The number of worker processes for CPU-bound post-processing such as "
+            "contact scanning and dedup. 0 runs that work inline on the event loop."
+        },
+    )
+
+    cpu_queue_size: int = field(
+        default=64,
+        metadata={
+            "description": "The maximum number of CPU tasks queued or running in the worker pool at once."
+        },
+    )
+
+    pipelined: bool = field(
+        default=False,
+        metadata={
+            "description": "Overlap query generation, search and extraction: queries are searched as the "
+            "model streams them and results are extracted as each search returns."
+        },
+    )
+
+    hedge_requests: bool = field(
+        default=False,
+        metadata={
+            "description": "Issue a duplicate of Tavily search and extract calls that run past the observed "
+            "latency quantile, and take whichever response arrives first. Duplicates cost credits."
+        },
+    )
+
+    hedge_quantile: float = field(
+        default=0.95,
+        metadata={
+            "description": "The latency quantile of a call type after which a hedged duplicate is sent."
+        },
+    )
+
+    max_hedge_rate: float = field(
+        default=0.1,
+        metadata={
+            "description": "The largest fraction of calls of one type that may be hedged."
+        },
+    )
+
+    field_cache_ttl_hours: float = field(
+        default=168.0,
+        metadata={
+            "description": "How long extracted supplier fields are reused for the same source URL before "
+            "they are fetched again. Only stale fields are re-fetched. Set to 0 to disable."
+        },
+    )
+
+    missing_field_ttl_hours: float = field(
+        default=24.0,
+        metadata={
+            "description": "How long a field that could not be found (e.g. a missing email) is left empty "
+            "before it is looked for again."
+        },
+    )
+
+    export_jsonl_path: Optional[str] = field(
+        default=None,
+        metadata={
+            "description": "Append each supplier to this JSONL file as soon as it is extracted."
+        },
+    )
+
+    export_path: Optional[str] = field(
+        default=None,
+        metadata={
+            "description": "Write the ranked suppliers of the run to this file; the format follows the "
+            "extension (.csv, .jsonl or .parquet)."
+        },
+    )
+
+    job_broker_url: Optional[str] = field(
+        default=None,
+        metadata={
+            "description": "The job queue broker shared with queue workers, e.g. "
+            "'sqlite:///.cache/enrichment_agent/jobs.sqlite' or 'redis://host:6379/0'."
+        },
+    )
+
+    distributed_extract: bool = field(
+        default=False,
+        metadata={
+            "description": "Hand each crawl_and_extract task to queue workers through job_broker_url "
+            "instead of running it in this process."
+        },
+    )
+
+    remote_task_timeout_seconds: float = field(
+        default=600.0,
+        metadata={
+            "description": "How long a run waits for a distributed extraction task before giving up on it."
+        },
+    )
+
+    job_result_ttl_hours: float = field(
+        default=24.0,
+        metadata={
+            "description": "How long a finished job's key and result are kept by the broker. Until then "
+            "the same job is not queued again and its result is shared; afterwards it runs afresh."
+        },
+    )
+
+    context_mode: Literal["full", "compact"] = field(
+        default="full",
+        metadata={
+            "description": "How tool results from earlier loops are sent back to the model. "
+            "'full' re-sends every tool message verbatim; 'compact' replaces tool messages "
+            "the model has already seen with short digests."
+        },
+    )
+
+    context_digest_chars: int = field(
+        default=600,
+        metadata={
+            "description": "The maximum number of characters kept from an already-consumed tool message "
+            "when context_mode is 'compact'."
+        },
+    )
+
+    budget: Budget = field(
+        default_factory=Budget,
+        metadata={
+            "description": "Run-level limits on LLM tokens, Tavily credits and wall time. "
+            "As the budget is consumed the run issues fewer queries, extracts at basic depth "
+            "and skips the email crawl before stopping."
+        },
+    )
+
+    def __post_init__(self) -> None:
+        """Accept the budget as a plain dict, as passed through a RunnableConfig."""
+        if isinstance(self.budget, dict):
+            self.budget = Budget(**self.budget)
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -60,3 +429,12 @@ class Configuration:
         configurable = config.get("configurable") or {}
         _fields = {f.name for f in fields(cls) if f.init}
         return cls(**{k: v for k, v in configurable.items() if k in _fields})
+
+    def model_for(self, role: Optional[ModelRole] = None) -> str:
+        """Return the model configured for `role`, falling back to `model`."""
+        overrides = {
+            "planner": self.planner_model,
+            "extractor": self.extractor_model,
+            "reflector": self.reflector_model,
+        }
+        return (overrides[role] if role else None) or self.model
@@ -0,0 +1,82 @@
+"""Regex extraction of contact details from page text and links."""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{8,}\d")
+
+# Directory and marketplace sites that list many suppliers under one domain
+DIRECTORY_SITES = (
+    "indiamart", "tradeindia", "justdial", "yellowpages",
+    "exportersindia", "alibaba", "made-in-china", "thomasnet", "globalsources",
+)  # fmt: skip
+
+# Legal-form suffixes dropped when comparing company names
+_NAME_SUFFIXES = re.compile(r"\b(pvt|private|ltd|limited|llp|llc|inc|corp|co|gmbh)\b|[^a-z0-9]")
+
+# Things that look like emails but are asset names or placeholders
+_EMAIL_FALSE_POSITIVES = re.compile(
+    r"\.(png|jpe?g|gif|svg|webp)$|^(example|name|your|user)@|@(example|domain)\.", re.I
+)
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Return a company name lowercased, without legal-form suffixes or punctuation."""
+    return _NAME_SUFFIXES.sub("", (name or "").lower())
+
+
+def website_domain(website: Optional[str]) -> str:
+    """Return the host of a website URL (with or without a scheme), without a leading "www."."""
+    website = (website or "").strip().lower()
+    if not website:
+        return ""
+    host = urlsplit(website if "//" in website else f"//{website}").hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def is_directory_site(url: str) -> bool:
+    """Return whether a URL or host belongs to a supplier directory or marketplace."""
+    url = url.lower()
+    return any(site in url for site in DIRECTORY_SITES)
+
+
+def find_emails(text: str) -> List[str]:
+    """Return the distinct plausible email addresses in `text`, in order of appearance."""
+    seen: Dict[str, None] = {}
+    for match in EMAIL_RE.findall(text):
+        email = match.strip(".").lower()
+        if not _EMAIL_FALSE_POSITIVES.search(email):
+            seen.setdefault(email, None)
+    return list(seen)
+
+
+def find_phones(text: str) -> List[str]:
+    """Return the distinct phone-number-like strings in `text` with 10 to 15 digits."""
+    seen: Dict[str, None] = {}
+    for match in PHONE_RE.findall(text):
+        digits = re.sub(r"\D", "", match)
+        if 10 <= len(digits) <= 15:
+            seen.setdefault(" ".join(match.split()), None)
+    return list(seen)
+
+
+def find_contacts(
+    text: str, links: Iterable[Tuple[str, str]] = ()
+) -> Dict[str, Optional[str]]:
+    """Return the first email and phone found in page text and its mailto:/tel: links."""
+    emails, phones = [], []
+    for href, _ in links:
+        scheme = urlsplit(href).scheme
+        target = unquote(href.split(":", 1)[-1].split("?", 1)[0])
+        if scheme == "mailto":
+            emails.extend(find_emails(target))
+        elif scheme == "tel":
+            phones.append(target)
+    emails.extend(find_emails(text))
+    phones.extend(find_phones(text))
+    return {
+        "email": emails[0] if emails else None,
+        "phone": phones[0] if phones else None,
+    }
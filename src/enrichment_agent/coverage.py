@@ -0,0 +1,62 @@
+"""Coverage of a procurement requirement's facets by the suppliers found so far.
+
+A requirement usually asks for several things at once: "medical-grade
+polymers and electronic components ... meeting ISO 13485 and FDA". Each of
+these is a facet. Certifications the requirement names become facets
+directly; product and material facets come from the planner model. After
+each search round the ranked suppliers are counted per facet, and only
+facets with fewer than the target number of distinct suppliers get follow-up
+queries.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+from enrichment_agent.ranking import SupplierScore, criteria_for, parse_certifications
+from enrichment_agent.state import Facet
+
+_TEXT_FIELDS = ("name", "description", "standards_compliance", "certifications")
+
+
+def requirement_facets(requirement: str, planned: Sequence[Facet] = ()) -> List[Facet]:
+    """Return the facets of a requirement: the planned ones plus its required certifications.
+
+    Certifications the planner already made a facet of are not repeated. A
+    requirement with no facets at all gets a single catch-all facet, so the
+    search still stops once enough suppliers are found.
+    """
+    facets = list(planned)
+    planned_certifications = parse_certifications(*(k for f in facets for k in f.keywords))
+    for criterion in criteria_for(requirement):
+        if criterion.required and criterion.name not in planned_certifications:
+            facets.append(Facet(name=criterion.name, keywords=[criterion.name]))
+    return facets or [Facet(name="procurement requirement", keywords=[])]
+
+
+def facet_matches(supplier: Dict[str, Any], facet: Facet) -> bool:
+    """Return whether a supplier dict covers a facet.
+
+    Facets whose keywords name certifications are compared on normalized
+    certifications, so "ISO13485:2016" covers "ISO 13485"; other facets match
+    on any keyword in the supplier's text fields. A facet without keywords
+    matches every supplier.
+    """
+    required = parse_certifications(*facet.keywords)
+    if required:
+        found = parse_certifications(
+            supplier.get("certifications"), supplier.get("standards_compliance")
+        )
+        return bool(required & found)
+    if not facet.keywords:
+        return True
+    text = " ".join(str(supplier.get(f) or "") for f in _TEXT_FIELDS).lower()
+    return any(k.lower() in text for k in facet.keywords)
+
+
+def facet_coverage(ranked: Sequence[SupplierScore], facets: Sequence[Facet]) -> Dict[str, int]:
+    """Count the distinct ranked suppliers covering each facet."""
+    return {f.name: sum(facet_matches(r.supplier, f) for r in ranked) for f in facets}
+
+
+def under_covered(coverage: Dict[str, int], target: int) -> List[str]:
+    """Return the facets with fewer than `target` suppliers, least covered first."""
+    return sorted((name for name, count in coverage.items() if count < target), key=coverage.__getitem__)
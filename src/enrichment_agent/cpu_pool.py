@@ -0,0 +1,136 @@
+"""Process pool for CPU-bound post-processing.
+
+HTML-to-text parsing, regex contact scanning and supplier dedup and ranking
+are pure CPU work; run inline they stall the event loop driving the search
+fan-out. With `Configuration.cpu_workers` above zero they run in a shared
+process pool instead. Stored page text is passed to workers as blob store
+keys rather than pickled strings: each worker opens the same on-disk store
+and reads the content itself, so only small handles and results cross the
+process boundary. Freshly fetched HTML, which is never stored, is passed as
+is. The pools are shut down when the interpreter exits.
+
+The stage functions are module-level so they can be pickled by reference,
+and this module avoids importing the model and graph stack so that workers
+stay light.
+"""
+
+import asyncio
+import atexit
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from enrichment_agent.blobs import get_blob_store
+from enrichment_agent.contacts import (
+    find_contacts,
+    is_directory_site,
+    normalize_name,
+    website_domain,
+)
+
+T = TypeVar("T")
+
+
+# Stages (run inside worker processes)
+
+
+def scan_contacts_blob(cache_dir: str, max_bytes: int, key: str) -> Dict[str, Optional[str]]:
+    """Scan the stored text under `key` for an email address and phone number.
+
+    `cache_dir` and `max_bytes` identify the caller's blob store.
+    """
+    text = get_blob_store(cache_dir, max_bytes).get(key)
+    return find_contacts(text) if text else {"email": None, "phone": None}
+
+
+def _dedupe_key(supplier: Dict[str, Any], index: int) -> str:
+    domain = website_domain((supplier.get("contact_details") or {}).get("website"))
+    name = normalize_name(supplier.get("name"))
+    if domain and not is_directory_site(domain):
+        return f"domain:{domain}"
+    if name:
+        # A directory domain is shared by every supplier listed there, so it only narrows the name
+        return f"name:{name}@{domain}"
+    # Nothing identifies the supplier; never merge it
+    return f"index:{index}"
+
+
+def dedupe_suppliers(suppliers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge duplicate suppliers, filling empty fields.
+
+    Suppliers match when they share a company website domain. Suppliers whose
+    website is missing or a directory listing match only on their normalized
+    name (and directory domain), and suppliers with neither are kept apart.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for index, supplier in enumerate(suppliers):
+        key = _dedupe_key(supplier, index)
+        if key not in merged:
+            merged[key] = {**supplier, "contact_details": dict(supplier.get("contact_details") or {})}
+            continue
+        existing = merged[key]
+        for field_name, value in supplier.items():
+            if field_name == "contact_details":
+                for contact_field, contact_value in (value or {}).items():
+                    if contact_value and not existing["contact_details"].get(contact_field):
+                        existing["contact_details"][contact_field] = contact_value
+            elif value and not existing.get(field_name):
+                existing[field_name] = value
+    return list(merged.values())
+
+
+# Pool
+
+
+_executors: Dict[int, ProcessPoolExecutor] = {}
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return executor
+
+
+def shutdown_executors() -> None:
+    """Shut down the shared process pools, cancelling queued tasks; runs at interpreter exit."""
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_executors)
+
+
+class CpuPool:
+    """Runs CPU stages in a process pool with a bounded number of queued tasks.
+
+    With zero workers, stages run inline on the calling thread.
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        """Create a pool front-end; the process pool itself is shared per worker count."""
+        self.workers = workers
+        self._slots = asyncio.Semaphore(max(1, queue_size))
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run `fn(*args)` in the pool once a queue slot is free, and return its result."""
+        if self.workers <= 0:
+            return fn(*args)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_executor(self.workers), fn, *args)
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, CpuPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_cpu_pool(workers: int, queue_size: int) -> CpuPool:
+    """Return the CPU pool shared by everything running on the current event loop."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = CpuPool(workers, queue_size)
+    return pool
@@ -0,0 +1,103 @@
+"""Focused in-process crawler for supplier contact details.
+
+Replaces a full remote crawl with a small best-first walk over a supplier's
+own site: links that look like contact or about pages are fetched first, and
+the crawl stops as soon as an email address turns up or its page or time
+budget runs out.
+"""
+
+import asyncio
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urlsplit
+
+from enrichment_agent.contacts import find_contacts
+from enrichment_agent.fetcher import Fetcher, domain_of
+
+# Lower is fetched sooner
+_LINK_PRIORITIES = (
+    (0, ("contact", "reach-us", "reach us", "get-in-touch", "enquiry", "inquiry")),
+    (1, ("about", "company", "profile", "support")),
+)
+_DEFAULT_PRIORITY = 5
+_SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".doc", ".docx", ".xls", ".xlsx")
+
+
+def link_priority(href: str, anchor: str) -> int:
+    """Rank a link by how likely it leads to contact details."""
+    haystack = f"{urlsplit(href).path} {anchor}".lower()
+    for priority, keywords in _LINK_PRIORITIES:
+        if any(keyword in haystack for keyword in keywords):
+            return priority
+    return _DEFAULT_PRIORITY
+
+
+@dataclass
+class CrawlResult:
+    """Contact details found by a crawl and the pages it took."""
+
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    source_url: Optional[str] = None
+    visited: List[str] = field(default_factory=list)
+
+
+async def find_contact_details(
+    start_url: str,
+    fetcher: Fetcher,
+    *,
+    max_pages: int = 5,
+    time_budget: float = 15.0,
+) -> CrawlResult:
+    """Crawl a supplier's site best-first until an email address is found.
+
+    Args:
+        start_url: The page to start from, usually the supplier's page found by search.
+        fetcher: The shared fetcher, so connections and politeness state are reused.
+        max_pages: The most pages to fetch.
+        time_budget: The most seconds to spend crawling.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + time_budget
+    site = domain_of(start_url)
+    result = CrawlResult()
+    counter = itertools.count()  # tie-breaker keeping discovery order within a priority
+    frontier: List[Tuple[int, int, str]] = [(0, next(counter), start_url)]
+    seen: Dict[str, None] = {urldefrag(start_url)[0]: None}
+
+    while frontier and len(result.visited) < max_pages:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        _, _, url = heapq.heappop(frontier)
+        try:
+            page = await asyncio.wait_for(fetcher.fetch(url), timeout=remaining)
+        except asyncio.TimeoutError:
+            break
+        result.visited.append(url)
+        if page is None:
+            continue
+
+        found = find_contacts(page.text, page.links)
+        result.phone = result.phone or found["phone"]
+        if found["email"]:
+            result.email = found["email"]
+            result.source_url = page.url
+            return result
+
+        for href, anchor in page.links:
+            href = urldefrag(href)[0]
+            parts = urlsplit(href)
+            if (
+                href in seen
+                or parts.scheme not in ("http", "https")
+                or domain_of(href) != site
+                or parts.path.lower().endswith(_SKIP_EXTENSIONS)
+            ):
+                continue
+            seen[href] = None
+            heapq.heappush(frontier, (link_priority(href, anchor), next(counter), href))
+
+    return result
@@ -0,0 +1,178 @@
+"""Export suppliers to CSV, JSONL and Parquet.
+
+Suppliers are flattened to one row each, with `ContactDetails` spread into
+`email`, `phone`, `website` and `address` columns, field provenance as a JSON
+column, and ranking results (score, normalized certifications, missing
+requirements) alongside when available.
+
+Every writer consumes an iterable of suppliers and writes as it goes, so a
+batch of thousands of runs never has to be held in memory: append each run's
+suppliers to a JSONL file as they are produced (see
+`Configuration.export_jsonl_path`), then convert it in one pass:
+
+    python -m enrichment_agent.export suppliers.jsonl suppliers.parquet
+
+Parquet support requires the optional `pyarrow` package
+(`pip install "enrichment-agent[export]"`).
+"""
+
+import argparse
+import csv
+import json
+import logging
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+from pydantic import BaseModel
+
+from enrichment_agent.ranking import SupplierScore
+
+COLUMNS = [
+    "name",
+    "description",
+    "standards_compliance",
+    "certifications",
+    "email",
+    "phone",
+    "website",
+    "address",
+    "source_url",
+    "score",
+    "normalized_certifications",
+    "missing_required",
+    "provenance",
+]
+
+logger = logging.getLogger(__name__)
+
+SupplierLike = Union[BaseModel, SupplierScore, Dict[str, Any]]
+
+
+def flatten_supplier(supplier: SupplierLike) -> Dict[str, Any]:
+    """Return `supplier` as a flat row keyed by `COLUMNS`.
+
+    Accepts a `Supplier`, a ranked `SupplierScore`, or either one as a plain
+    dict (e.g. read back from JSONL). List values are joined with "; " so every
+    column is a scalar.
+    """
+    if isinstance(supplier, BaseModel):
+        data = supplier.model_dump()
+    elif is_dataclass(supplier):
+        data = asdict(supplier)
+    else:
+        data = dict(supplier)
+
+    # A ranked entry wraps the supplier with its score
+    if isinstance(data.get("supplier"), dict):
+        ranking = {
+            "score": data.get("score"),
+            "normalized_certifications": data.get("certifications"),
+            "missing_required": data.get("missing_required"),
+        }
+        data = {**data["supplier"], **ranking}
+
+    row = {**data, **(data.get("contact_details") or {})}
+    if isinstance(row.get("provenance"), dict):
+        row["provenance"] = json.dumps(row["provenance"], sort_keys=True) if row["provenance"] else None
+    return {
+        column: "; ".join(row[column]) if isinstance(row.get(column), list) else row.get(column)
+        for column in COLUMNS
+    }
+
+
+def append_jsonl(path: Union[str, Path], suppliers: Iterable[SupplierLike]) -> None:
+    """Append suppliers to a JSONL file, one flattened row per line."""
+    lines = "".join(json.dumps(flatten_supplier(s), ensure_ascii=False) + "\n" for s in suppliers)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    # A single write per call keeps lines from concurrent writers intact
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(lines)
+
+
+def read_jsonl(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of a JSONL file one at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_csv(suppliers: Iterable[SupplierLike], path: Union[str, Path]) -> int:
+    """Write suppliers to a CSV file and return the number of rows written."""
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for supplier in suppliers:
+            writer.writerow(flatten_supplier(supplier))
+            count += 1
+    return count
+
+
+def write_jsonl(suppliers: Iterable[SupplierLike], path: Union[str, Path]) -> int:
+    """Write suppliers to a JSONL file and return the number of rows written."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for supplier in suppliers:
+            f.write(json.dumps(flatten_supplier(supplier), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def write_parquet(
+    suppliers: Iterable[SupplierLike], path: Union[str, Path], batch_size: int = 10_000
+) -> int:
+    """Write suppliers to a Parquet file in row groups of `batch_size`; return the rows written."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export requires pyarrow. "
+            'Install it with: pip install "enrichment-agent[export]"'
+        ) from e
+
+    schema = pa.schema(
+        [(c, pa.float64() if c == "score" else pa.string()) for c in COLUMNS]
+    )
+    count = 0
+    with pq.ParquetWriter(str(path), schema) as writer:
+        batch: List[Dict[str, Any]] = []
+        for supplier in suppliers:
+            batch.append(flatten_supplier(supplier))
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+_WRITERS = {".csv": write_csv, ".jsonl": write_jsonl, ".parquet": write_parquet}
+
+
+def export_suppliers(suppliers: Iterable[SupplierLike], path: Union[str, Path]) -> int:
+    """Write suppliers in the format given by the extension of `path`; return the rows written."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in _WRITERS:
+        raise ValueError(f"Unsupported export format {suffix!r}; use one of {sorted(_WRITERS)}")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    return _WRITERS[suffix](suppliers, path)
+
+
+def main() -> None:
+    """Convert a JSONL export to CSV or Parquet from the command line."""
+    parser = argparse.ArgumentParser(description="Convert a supplier JSONL export.")
+    parser.add_argument("source", help="JSONL file written by append_jsonl or write_jsonl")
+    parser.add_argument("destination", help="Output path ending in .csv, .jsonl or .parquet")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    count = export_suppliers(read_jsonl(args.source), args.destination)
+    logger.info("Wrote %d suppliers to %s", count, args.destination)
+
+
+if __name__ == "__main__":
+    main()
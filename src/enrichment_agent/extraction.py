@@ -0,0 +1,369 @@
+"""Tiered page extraction.
+
+Pages already in the content store (see blobs.py) are served from disk.
+With `Configuration.fetch_engine` set to "local", pages are first fetched
+directly (see fetcher.py) and Tavily is only used when the local text is
+insufficient. Tavily pages are extracted at basic depth first and only
+escalated to advanced depth when the basic content looks insufficient (too
+short, or no contact or certification signals). Which depth ends up working
+is recorded per domain and persisted under `Configuration.cache_dir`, so
+later runs go straight to advanced extraction for domains that always need
+it. Slow Tavily calls can be hedged (see hedging.py).
+"""
+
+import asyncio
+import atexit
+import contextlib
+import functools
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Dict, Literal, Optional, Tuple, Union
+
+from enrichment_agent.blobs import DiskBlobStore, get_blob_store
+from enrichment_agent.budget import extract_cost
+from enrichment_agent.configuration import Configuration
+from enrichment_agent.contacts import EMAIL_RE, PHONE_RE
+from enrichment_agent.cpu_pool import get_cpu_pool
+from enrichment_agent.fetcher import Fetcher, domain_of, get_fetcher
+from enrichment_agent.hedging import Hedger, get_hedger
+from enrichment_agent.scheduler import HostScheduler, get_scheduler
+
+logger = logging.getLogger(__name__)
+
+Depth = Literal["basic", "advanced"]
+
+_CONTACT_RE = re.compile(r"\b(contact us|get in touch|reach us|enquiry|inquiry)\b", re.I)
+_CERTIFICATION_RE = re.compile(
+    r"\b(ISO\s?\d{4,5}|FDA|CE mark(ed)?|BIS|GMP|certified|certification)\b", re.I
+)
+
+
+@dataclass
+class ContentQuality:
+    """Signals used to decide whether extracted content is good enough."""
+
+    length: int
+    has_contact: bool
+    has_certification: bool
+
+    def sufficient(self, min_chars: int) -> bool:
+        """Return whether the content is long enough and carries useful signals."""
+        return self.length >= min_chars and (self.has_contact or self.has_certification)
+
+
+def assess_content(content: str) -> ContentQuality:
+    """Measure the length and contact/certification signals of page content."""
+    return ContentQuality(
+        length=len(content),
+        has_contact=bool(
+            EMAIL_RE.search(content)
+            or PHONE_RE.search(content)
+            or _CONTACT_RE.search(content)
+        ),
+        has_certification=bool(_CERTIFICATION_RE.search(content)),
+    )
+
+
+class DomainDepthHints:
+    """Per-domain record of which extract depth produced sufficient content.
+
+    Stored as a small JSON file mapping each domain to how often basic
+    extraction sufficed and how often it had to be escalated. Records are
+    kept in memory and written at most once per `flush_delay` seconds, in a
+    worker thread, and once more at exit if any are still unwritten.
+    """
+
+    def __init__(self, path: Path, flush_delay: float = 5.0) -> None:
+        """Load hints from `path`, starting empty if it does not exist."""
+        self.path = path
+        self.flush_delay = flush_delay
+        try:
+            self._hints: Dict[str, Dict[str, int]] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self._hints = {}
+        self._dirty = False
+        # Snapshots are numbered so an older one never overwrites a newer one
+        self._version = 0
+        self._written_version = 0
+        self._flush_task: Optional[asyncio.Task[None]] = None
+        self._write_lock = threading.Lock()
+        atexit.register(self._write_pending)
+
+    def preferred_depth(self, domain: str) -> Depth:
+        """Return the depth to try first for `domain`."""
+        counts = self._hints.get(domain, {})
+        return "advanced" if counts.get("advanced", 0) > counts.get("basic", 0) else "basic"
+
+    def record(self, domain: str, depth: Depth) -> None:
+        """Record that `depth` was the shallowest depth that worked for `domain`.
+
+        The file is written after `flush_delay` seconds, together with every
+        other record made in the meantime.
+        """
+        counts = self._hints.setdefault(domain, {})
+        counts[depth] = counts.get(depth, 0) + 1
+        self._dirty = True
+        if self._flush_task and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+        except RuntimeError:
+            self._write_pending()
+
+    async def flush(self) -> None:
+        """Write any unwritten records now."""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self._flush_now()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self._flush_now()
+
+    async def _flush_now(self) -> None:
+        # Serialize on the caller's thread, where `record` mutates the hints; only the I/O moves
+        snapshot = self._snapshot()
+        if snapshot:
+            await asyncio.to_thread(self._write, *snapshot)
+
+    def _write_pending(self) -> None:
+        snapshot = self._snapshot()
+        if snapshot:
+            self._write(*snapshot)
+
+    def _snapshot(self) -> Optional[Tuple[int, str]]:
+        if not self._dirty:
+            return None
+        self._dirty = False
+        self._version += 1
+        return self._version, json.dumps(self._hints)
+
+    def _write(self, version: int, data: str) -> None:
+        with self._write_lock:
+            if version <= self._written_version:
+                return
+            tmp = None
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=self.path.parent, prefix=f".{self.path.name}.", delete=False
+                ) as tmp:
+                    tmp.write(data)
+                os.replace(tmp.name, self.path)
+                self._written_version = version
+            except OSError as e:
+                if tmp:
+                    with contextlib.suppress(OSError):
+                        os.unlink(tmp.name)
+                # Written again with the next record, or at exit
+                self._dirty = True
+                logger.warning("Failed to write extract depth hints to %s: %s", self.path, e)
+
+
+@functools.cache
+def get_domain_hints(cache_dir: str) -> DomainDepthHints:
+    """Return the shared hints for a cache directory."""
+    return DomainDepthHints(Path(cache_dir) / "extract_depth_hints.json")
+
+
+@dataclass
+class ExtractedPage:
+    """The content of a page and what it cost to get it."""
+
+    url: str
+    content: Optional[str]
+    depth: Union[Depth, Literal["local", "cached", "search"]]
+    credits_used: int
+    content_key: Optional[str] = None
+    fetched_at: float = field(default_factory=time.time)
+
+
+async def tavily_extract(
+    url: str,
+    extract_depth: Depth,
+    scheduler: Optional[HostScheduler] = None,
+    hedger: Optional[Hedger] = None,
+) -> Tuple[Optional[str], int]:
+    """Extract the raw content of a single URL with Tavily.
+
+    Tavily fetches the page on our behalf, so the call is still paced per target
+    host when a scheduler is given. With a hedger, a slow call is duplicated.
+
+    Returns:
+        The content, or None if Tavily returned nothing, and the credits used.
+    """
+    from tavily import TavilyClient
+
+    host = domain_of(url)
+    # Requests actually sent; a hedge still waiting for its slot when the primary returns costs nothing
+    sent = 0
+
+    def call() -> Awaitable[Dict[str, Any]]:
+        nonlocal sent
+        sent += 1
+        return asyncio.to_thread(lambda: TavilyClient().extract(url, extract_depth=extract_depth))
+
+    async def hedge_call() -> Dict[str, Any]:
+        # The duplicate is a second request to the host, so it holds a slot of its own
+        async with (scheduler.slot(host) if scheduler else contextlib.nullcontext()):
+            return await call()
+
+    async with (scheduler.slot(host) if scheduler else contextlib.nullcontext()):
+        if hedger:
+            result, _ = await hedger.run(f"extract:{extract_depth}", call, hedge_call)
+        else:
+            result = await call()
+    credits_used = extract_cost(extract_depth) * sent
+    try:
+        return result["results"][0]["raw_content"], credits_used
+    except (KeyError, IndexError, TypeError):
+        return None, credits_used
+
+
+async def extract_page(
+    url: str,
+    *,
+    max_depth: Depth = "advanced",
+    adaptive: bool = True,
+    min_chars: int = 500,
+    hints: Optional[DomainDepthHints] = None,
+    scheduler: Optional[HostScheduler] = None,
+    hedger: Optional[Hedger] = None,
+) -> ExtractedPage:
+    """Extract a page, escalating from basic to advanced depth only when needed.
+
+    Args:
+        url: The page to extract.
+        max_depth: The deepest extraction allowed, e.g. "basic" once the budget degrades.
+        adaptive: When False, extract once at `max_depth` like a plain Tavily call.
+        min_chars: The content length below which basic content is considered insufficient.
+        hints: Per-domain depth hints to consult and update.
+        scheduler: Paces Tavily calls per target host.
+        hedger: Duplicates slow Tavily calls.
+    """
+    if not adaptive or max_depth == "basic":
+        content, credits_used = await tavily_extract(url, max_depth, scheduler, hedger)
+        return ExtractedPage(url, content, max_depth, credits_used)
+
+    domain = domain_of(url)
+    start: Depth = hints.preferred_depth(domain) if hints else "basic"
+    credits_used = 0
+    content = None
+    if start == "basic":
+        content, basic_credits = await tavily_extract(url, "basic", scheduler, hedger)
+        credits_used += basic_credits
+        if content and assess_content(content).sufficient(min_chars):
+            if hints:
+                hints.record(domain, "basic")
+            return ExtractedPage(url, content, "basic", credits_used)
+
+    advanced, advanced_credits = await tavily_extract(url, "advanced", scheduler, hedger)
+    credits_used += advanced_credits
+    if advanced and assess_content(advanced).sufficient(min_chars) and hints:
+        hints.record(domain, "advanced")
+    # Fall back to the basic content if advanced extraction returned nothing
+    return ExtractedPage(url, advanced or content, "advanced", credits_used)
+
+
+def get_configured_scheduler(configuration: Configuration) -> HostScheduler:
+    """Return the current event loop's shared host scheduler, configured on first use."""
+    return get_scheduler(
+        max_concurrency=configuration.max_fetch_concurrency,
+        per_host_concurrency=configuration.per_host_concurrency,
+        min_delay=configuration.fetch_politeness_delay,
+    )
+
+
+# Bytes of HTML read per character of page text kept: markup rarely exceeds this
+_HTML_BYTES_PER_CHAR = 8
+
+
+def get_configured_fetcher(configuration: Configuration) -> Fetcher:
+    """Return the current event loop's shared fetcher, configured on first use.
+
+    Local fetches stop reading once `max_page_chars` of text are collected, so
+    oversized pages are cut off as they stream in rather than after download.
+    With `cpu_workers` set, pages are parsed in the shared CPU pool.
+    """
+    return get_fetcher(
+        scheduler=get_configured_scheduler(configuration),
+        respect_robots=configuration.respect_robots_txt,
+        max_chars=configuration.max_page_chars,
+        max_bytes=configuration.max_page_chars * _HTML_BYTES_PER_CHAR,
+        cpu_pool=get_cpu_pool(configuration.cpu_workers, configuration.cpu_queue_size),
+    )
+
+
+def get_configured_hedger(configuration: Configuration) -> Optional[Hedger]:
+    """Return the current event loop's shared hedger, or None when hedging is off."""
+    if not configuration.hedge_requests:
+        return None
+    return get_hedger(
+        quantile=configuration.hedge_quantile, max_hedge_rate=configuration.max_hedge_rate
+    )
+
+
+def get_configured_blob_store(configuration: Configuration) -> DiskBlobStore:
+    """Return the shared content store for the configured cache directory."""
+    return get_blob_store(configuration.cache_dir, configuration.blob_store_max_mb * 1024 * 1024)
+
+
+async def fetch_page(
+    url: str,
+    configuration: Configuration,
+    max_depth: Depth = "advanced",
+    search_content_key: Optional[str] = None,
+) -> ExtractedPage:
+    """Get a page's content, fetching it only if the content store has no fresh copy.
+
+    The text a search returned for the page (stored under `search_content_key`)
+    is used as is when it is already sufficient content, as with raw content
+    from search. Otherwise the local fetcher is tried first when enabled;
+    Tavily extraction (capped at `max_depth`) is the fallback for pages that
+    cannot be fetched or that come back without enough content, typically
+    JS-heavy sites. Content beyond `max_page_chars` is dropped: local fetches
+    stop reading at that size, while Tavily returns whole pages, which are cut
+    on receipt. Sufficient content is written to the content store so later
+    calls and runs reuse it.
+    """
+    store = get_configured_blob_store(configuration)
+    cached = await asyncio.to_thread(
+        store.lookup_url, url, configuration.page_cache_ttl_hours * 3600
+    )
+    if cached:
+        content = await asyncio.to_thread(store.get, cached[0])
+        if content is not None:
+            return ExtractedPage(url, content, "cached", 0, cached[0], fetched_at=cached[1])
+    if search_content_key:
+        content = await asyncio.to_thread(store.get, search_content_key)
+        if content and assess_content(content).sufficient(configuration.min_content_chars):
+            return ExtractedPage(url, content[: configuration.max_page_chars], "search", 0, search_content_key)
+
+    page = None
+    if configuration.fetch_engine == "local":
+        fetched = await get_configured_fetcher(configuration).fetch(url)
+        if fetched and assess_content(fetched.text).sufficient(configuration.min_content_chars):
+            page = ExtractedPage(url, fetched.text, "local", 0)
+    if page is None:
+        page = await extract_page(
+            url,
+            max_depth=max_depth,
+            adaptive=configuration.adaptive_extract_depth,
+            min_chars=configuration.min_content_chars,
+            hints=get_domain_hints(configuration.cache_dir),
+            scheduler=get_configured_scheduler(configuration),
+            hedger=get_configured_hedger(configuration),
+        )
+    if page.content and len(page.content) > configuration.max_page_chars:
+        # Tavily returns pages whole; cap what is kept, stored and processed
+        page.content = page.content[: configuration.max_page_chars]
+    if page.content and assess_content(page.content).sufficient(configuration.min_content_chars):
+        page.content_key = await asyncio.to_thread(store.put_url, url, page.content)
+    return page
@@ -0,0 +1,330 @@
+"""Direct HTTP fetching of supplier pages.
+
+An alternative to Tavily extract for plain HTML sites: pages are fetched with a
+pooled aiohttp session, checked against robots.txt (whose Crawl-delay feeds the
+host's pacing), paced per host by a `HostScheduler`, and converted to text incrementally as the body streams in.
+When the fetcher is given a `CpuPool` with worker processes, the HTML is
+instead read whole (up to `max_bytes`) and parsed in the pool, keeping the
+parse off the event loop. Callers fall back to Tavily when the local result looks like a JS-rendered
+shell.
+"""
+
+import asyncio
+import codecs
+import importlib.util
+import weakref
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib import robotparser
+from urllib.parse import urljoin, urlsplit
+
+from enrichment_agent.scheduler import HostScheduler
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from enrichment_agent.cpu_pool import CpuPool
+
+# aiohttp decodes brotli only when a brotli package is installed
+_ACCEPT_ENCODING = (
+    "gzip, deflate, br" if importlib.util.find_spec("brotli") else "gzip, deflate"
+)
+
+_SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "iframe"}
+_BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article",
+    "header", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "address", "dd", "dt",
+}  # fmt: skip
+
+
+def domain_of(url: str) -> str:
+    """Return the host of a URL without a leading "www."."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Incremental HTML-to-text converter.
+
+    Feed it chunks of HTML as they arrive; it drops scripts and styles, breaks
+    lines at block elements and collects absolute link targets along the way.
+    """
+
+    def __init__(self, base_url: str = "") -> None:
+        """Create an extractor resolving relative links against `base_url`."""
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links: List[Tuple[str, str]] = []
+        """(absolute href, anchor text) pairs, in document order."""
+        self.chars = 0
+        """Characters of text collected so far, before whitespace is collapsed."""
+        self._parts: List[str] = []
+        self._skip_depth = 0
+        self._href: Optional[str] = None
+        self._anchor: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:  # noqa: D102
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+        if tag == "a":
+            href = dict(attrs).get("href")
+            self._href = urljoin(self.base_url, href) if href else None
+            self._anchor = []
+
+    def handle_endtag(self, tag: str) -> None:  # noqa: D102
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+        if tag == "a" and self._href:
+            self.links.append((self._href, " ".join("".join(self._anchor).split())))
+            self._href = None
+
+    def handle_data(self, data: str) -> None:  # noqa: D102
+        if self._skip_depth:
+            return
+        # Data may arrive split mid-word across chunks, so whitespace is kept
+        # as-is here and only collapsed when the text is assembled
+        data = data.replace("\n", " ").replace("\r", " ")
+        self._parts.append(data)
+        self.chars += len(data)
+        if self._href:
+            self._anchor.append(data)
+
+    def text(self) -> str:
+        """Return the text seen so far with whitespace and blank lines collapsed."""
+        lines = (" ".join(line.split()) for line in "".join(self._parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+def parse_html(html: str, base_url: str = "") -> Tuple[str, List[Tuple[str, str]]]:
+    """Convert a complete HTML document to text and its (absolute href, anchor text) links."""
+    parser = HTMLTextExtractor(base_url)
+    parser.feed(html)
+    parser.close()
+    return parser.text(), parser.links
+
+
+def html_to_text(html: str, base_url: str = "") -> str:
+    """Convert a complete HTML document to text."""
+    return parse_html(html, base_url)[0]
+
+
+@dataclass
+class FetchedPage:
+    """A page fetched and converted locally."""
+
+    url: str
+    status: int
+    text: str
+    links: List[Tuple[str, str]] = field(default_factory=list)
+    truncated: bool = False
+
+
+class Fetcher:
+    """Pooled, polite async HTTP fetcher.
+
+    One instance should be shared per event loop so connections are reused
+    across every branch of a run.
+    """
+
+    def __init__(
+        self,
+        *,
+        scheduler: Optional[HostScheduler] = None,
+        user_agent: str = "supplier-deep-research/0.1",
+        timeout_seconds: float = 20.0,
+        respect_robots: bool = True,
+        max_connections: int = 64,
+        max_connections_per_host: int = 4,
+        max_bytes: int = 5_000_000,
+        max_chars: Optional[int] = None,
+        cpu_pool: Optional["CpuPool"] = None,
+    ) -> None:
+        """Configure the fetcher; the session is created on first use.
+
+        Requests are paced per host by `scheduler`, which defaults to a private
+        `HostScheduler`; pass a shared one to pace across fetchers. Reading a
+        body stops after `max_bytes` of HTML or once `max_chars` characters of
+        text have been collected, whichever comes first. With a `cpu_pool`
+        that has worker processes, pages are parsed in the pool and only
+        `max_bytes` bounds the read.
+        """
+        self.scheduler = scheduler or HostScheduler()
+        self.user_agent = user_agent
+        self.timeout_seconds = timeout_seconds
+        self.respect_robots = respect_robots
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.cpu_pool = cpu_pool
+        self._session: Optional[aiohttp.ClientSession] = None
+        # One robots.txt load per origin, shared by every request waiting on it
+        self._robots: Dict[str, asyncio.Future[Optional[robotparser.RobotFileParser]]] = {}
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        """Return the shared session, creating it on first use."""
+        # aiohttp is imported with the first session, only by runs that fetch locally
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers={
+                    "User-Agent": self.user_agent,
+                    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+                    "Accept-Encoding": _ACCEPT_ENCODING,
+                },
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the underlying session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "Fetcher":
+        """Return the fetcher; its session is closed when the block exits."""
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the session."""
+        await self.close()
+
+    async def allowed(self, url: str) -> bool:
+        """Return whether robots.txt permits fetching `url`."""
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self._robots:
+            # Concurrent requests to a new origin all wait for this one load
+            self._robots[origin] = asyncio.ensure_future(self._load_robots(origin))
+        # Shielded so a cancelled request does not cancel the load others wait on
+        rules = await asyncio.shield(self._robots[origin])
+        return rules is None or rules.can_fetch(self.user_agent, url)
+
+    async def _load_robots(self, origin: str) -> Optional[robotparser.RobotFileParser]:
+        """Fetch and parse an origin's robots.txt, applying its Crawl-delay to the scheduler."""
+        import aiohttp
+
+        try:
+            async with self.session.get(f"{origin}/robots.txt") as resp:
+                if resp.status >= 400:
+                    return None
+                rules = robotparser.RobotFileParser()
+                rules.parse((await resp.text(errors="replace")).splitlines())
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # A missing or unreachable robots.txt allows everything
+            return None
+        delay = rules.crawl_delay(self.user_agent)
+        if delay:
+            self.scheduler.set_host_delay(domain_of(origin), float(delay))
+        return rules
+
+    async def fetch(self, url: str) -> Optional[FetchedPage]:
+        """Fetch `url` and convert it to text, or return None if it cannot be fetched.
+
+        The body is decoded and parsed chunk by chunk and reading stops after
+        `max_bytes` (or `max_chars` of text), so oversized pages never have to
+        be held whole. With a process pool, the body (up to `max_bytes`) is
+        parsed there instead.
+        """
+        if not await self.allowed(url):
+            return None
+        async with self.scheduler.slot(domain_of(url)):
+            return await self._fetch(url)
+
+    async def _fetch(self, url: str) -> Optional[FetchedPage]:
+        import aiohttp
+
+        in_pool = self.cpu_pool is not None and self.cpu_pool.workers > 0
+        try:
+            async with self.session.get(url, allow_redirects=True) as resp:
+                content_type = resp.headers.get("Content-Type", "")
+                if resp.status >= 400 or "html" not in content_type:
+                    return None
+                base_url, status = str(resp.url), resp.status
+                # An incremental decoder keeps multi-byte characters split across chunks intact
+                decoder = codecs.getincrementaldecoder(resp.charset or "utf-8")(errors="replace")
+                if in_pool:
+                    html, truncated = await self._read_html(resp, decoder)
+                else:
+                    parser = HTMLTextExtractor(base_url)
+                    truncated = await self._parse_streaming(resp, decoder, parser)
+                    text, links = parser.text(), parser.links
+        except (aiohttp.ClientError, asyncio.TimeoutError, LookupError):
+            return None
+        if in_pool:
+            # Parsed after the connection is released, in a worker process
+            text, links = await self.cpu_pool.run(parse_html, html, base_url)  # type: ignore[union-attr]
+        if self.max_chars is not None and len(text) > self.max_chars:
+            text, truncated = text[: self.max_chars], True
+        return FetchedPage(url=base_url, status=status, text=text, links=links, truncated=truncated)
+
+    async def _parse_streaming(
+        self, resp: "aiohttp.ClientResponse", decoder: codecs.IncrementalDecoder, parser: HTMLTextExtractor
+    ) -> bool:
+        """Feed the body to `parser` as it arrives; return whether reading stopped early."""
+        read = 0
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            parser.feed(decoder.decode(chunk))
+            read += len(chunk)
+            if read >= self.max_bytes or (self.max_chars is not None and parser.chars >= self.max_chars):
+                parser.feed(decoder.decode(b"", final=True))
+                parser.close()
+                return True
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        return False
+
+    async def _read_html(
+        self, resp: "aiohttp.ClientResponse", decoder: codecs.IncrementalDecoder
+    ) -> Tuple[str, bool]:
+        """Read and decode the body up to `max_bytes`; return it and whether it was cut short."""
+        parts: List[str] = []
+        read = 0
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            parts.append(decoder.decode(chunk))
+            read += len(chunk)
+            if read >= self.max_bytes:
+                parts.append(decoder.decode(b"", final=True))
+                return "".join(parts), True
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), False
+
+
+_fetchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Fetcher]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def close_fetcher() -> None:
+    """Close and forget the current event loop's shared fetcher, if one was created."""
+    fetcher = _fetchers.pop(asyncio.get_running_loop(), None)
+    if fetcher is not None:
+        await fetcher.close()
+
+
+def get_fetcher(**kwargs: object) -> Fetcher:
+    """Return the fetcher shared by everything running on the current event loop.
+
+    Keyword arguments configure the fetcher the first time it is created on a loop.
+    """
+    loop = asyncio.get_running_loop()
+    fetcher = _fetchers.get(loop)
+    if fetcher is None:
+        fetcher = _fetchers[loop] = Fetcher(**kwargs)  # type: ignore[arg-type]
+    return fetcher
@@ -0,0 +1,150 @@
+"""Hedged calls to slow external APIs.
+
+Tail latency of a run is set by its slowest Tavily responses. With hedging,
+a call that has not returned by the observed p95 latency of its kind gets a
+duplicate, and whichever finishes first wins. Only calls in the tail are
+duplicated, so the extra load is roughly 5% of calls, and a hard cap on the
+hedge rate keeps an outage (when every call is slow) from doubling traffic.
+
+Duplicates cost Tavily credits, so `Hedger.run` reports how many requests
+were issued for the caller to charge against the budget. The losing
+request is cancelled, but a blocking call already running in a worker thread
+still completes in the background; only its result is discarded.
+"""
+
+import asyncio
+import math
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class HedgeStats:
+    """Latency samples and hedge counters for one kind of call."""
+
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=500))
+    calls: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+
+    def quantile(self, q: float) -> float:
+        """Return the `q` quantile of the recorded latencies, in seconds."""
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+class Hedger:
+    """Issues a duplicate of calls that run past the observed latency quantile."""
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        max_hedge_rate: float = 0.1,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+    ) -> None:
+        """Configure hedging.
+
+        Args:
+            quantile: The latency quantile after which a duplicate is issued.
+            max_hedge_rate: The largest fraction of calls of one kind that may be hedged.
+            min_samples: Calls are not hedged until this many latencies have been seen.
+            min_delay: The shortest wait, in seconds, before hedging.
+        """
+        self.quantile = quantile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._stats: Dict[str, HedgeStats] = {}
+
+    def _hedge_delay(self, stats: HedgeStats) -> Optional[float]:
+        if len(stats.samples) < self.min_samples:
+            return None
+        if stats.hedged + 1 > self.max_hedge_rate * stats.calls:
+            return None
+        return max(self.min_delay, stats.quantile(self.quantile))
+
+    async def run(
+        self,
+        kind: str,
+        call: Callable[[], Awaitable[T]],
+        hedge_call: Optional[Callable[[], Awaitable[T]]] = None,
+    ) -> Tuple[T, int]:
+        """Run `call`, hedging it once if it is slow; return its result and the requests issued.
+
+        Args:
+            kind: Groups calls with similar latency, e.g. "search" or "extract:advanced".
+            call: Starts the request; invoked a second time for the hedge.
+            hedge_call: Starts the hedge instead of `call`, e.g. to take a rate-limit slot of its own.
+        """
+        stats = self._stats.setdefault(kind, HedgeStats())
+        stats.calls += 1
+        delay = self._hedge_delay(stats)
+        start = time.monotonic()
+        primary = asyncio.ensure_future(call())
+        if delay is None:
+            result = await primary
+            stats.samples.append(time.monotonic() - start)
+            return result, 1
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            stats.samples.append(time.monotonic() - start)
+            return primary.result(), 1
+
+        stats.hedged += 1
+        hedge = asyncio.ensure_future((hedge_call or call)())
+        pending = {primary, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer a successful response; only fail once both requests have failed
+                winner = next((t for t in done if t.exception() is None), None)
+                if winner is not None or not pending:
+                    break
+            # The primary's full latency is unknown when the hedge wins; record the lower bound
+            stats.samples.append(time.monotonic() - start)
+            if winner is None:
+                return primary.result(), 2
+            if winner is hedge:
+                stats.hedge_wins += 1
+            return winner.result(), 2
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-kind call, hedge and hedge-win counts and the current hedge delay."""
+        return {
+            kind: {
+                "calls": s.calls,
+                "hedged": s.hedged,
+                "hedge_wins": s.hedge_wins,
+                "hedge_rate": s.hedged / s.calls if s.calls else 0.0,
+                "p_latency_seconds": s.quantile(self.quantile) if s.samples else None,
+            }
+            for kind, s in self._stats.items()
+        }
+
+
+_hedgers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Hedger]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_hedger(**kwargs: Any) -> Hedger:
+    """Return the hedger shared by everything running on the current event loop.
+
+    Latencies are learned across all runs on the loop. `kwargs` configure the
+    hedger when it is first created and are ignored afterwards.
+    """
+    loop = asyncio.get_running_loop()
+    hedger = _hedgers.get(loop)
+    if hedger is None:
+        hedger = _hedgers[loop] = Hedger(**kwargs)
+    return hedger
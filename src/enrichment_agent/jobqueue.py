@@ -0,0 +1,458 @@
+"""Job queue for spreading research runs and extraction tasks across workers.
+
+Jobs are pulled from a broker with at-least-once delivery: a reserved job is
+hidden for a visibility timeout and handed out again if its worker does not
+acknowledge it in time. A worker on a long job extends its lease before the
+timeout passes. Each job carries an idempotent key, so enqueueing the
+same work twice is a no-op and a re-delivered job overwrites its own result.
+Extraction tasks are keyed by canonical URL, so a page queued by several runs
+is processed once and its result is shared.
+
+Keys and results do not live forever: an acknowledged job's key and its
+result expire after the broker's `result_ttl`, after which the same work can
+be queued again. A job that fails for good is released instead of
+acknowledged, which frees its key at once, and queueing a key again clears
+any result left under it, so an error is never served to a later run.
+
+Two brokers are provided: `SqliteBroker` for a single host and tests, and
+`RedisBroker` (requires the optional `queue` extra) for many nodes. Use
+`connect_broker` with a "sqlite:///path" or "redis://host" URL.
+"""
+
+import asyncio
+import functools
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Protocol
+
+DEFAULT_RESULT_TTL = 24 * 3600.0
+
+
+@dataclass
+class Job:
+    """A reserved job. Acknowledge it once its result is stored."""
+
+    queue: str
+    key: str
+    payload: Dict[str, Any]
+    attempts: int
+    receipt: str
+    """Identifies this delivery; a stale receipt cannot acknowledge a re-delivered job."""
+
+
+class Broker(Protocol):
+    """Operations every broker supports."""
+
+    async def enqueue(self, queue: str, key: str, payload: Dict[str, Any]) -> bool:
+        """Add a job unless one with the same key exists; return whether it was added.
+
+        Adding a job clears any result left under its key by an earlier job.
+        """
+        ...
+
+    async def reserve(self, queue: str, visibility_timeout: float) -> Optional[Job]:
+        """Take the next visible job, hiding it for `visibility_timeout` seconds."""
+        ...
+
+    async def extend(self, job: Job, visibility_timeout: float) -> bool:
+        """Keep a reserved job hidden for another `visibility_timeout` seconds.
+
+        Returns False if the job is no longer held by this delivery.
+        """
+        ...
+
+    async def ack(self, job: Job) -> None:
+        """Mark a reserved job as done; its key and result expire after the result TTL."""
+        ...
+
+    async def release(self, job: Job) -> None:
+        """Forget a reserved job that will not be retried, so its key can be queued again."""
+        ...
+
+    async def put_result(self, key: str, result: Any) -> None:
+        """Store the result for a job key until the result TTL passes."""
+        ...
+
+    async def get_results(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return the unexpired stored results among `keys`."""
+        ...
+
+
+class SqliteBroker:
+    """Single-host broker backed by a SQLite file."""
+
+    _PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str, result_ttl: float = DEFAULT_RESULT_TTL) -> None:
+        """Open (or create) the broker database at `path`.
+
+        Args:
+            path: The database file.
+            result_ttl: Seconds an acknowledged job's key and its result are kept.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.result_ttl = result_ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    queue TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    visible_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    receipt TEXT,
+                    expires_at REAL,
+                    PRIMARY KEY (queue, key)
+                );
+                CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (queue, done, visible_at);
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL DEFAULT 0
+                );
+                """
+            )
+            # Databases created before keys expired lack the expiry columns
+            for table in ("jobs", "results"):
+                columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                if "expires_at" not in columns:
+                    default = "" if table == "jobs" else " NOT NULL DEFAULT 0"
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN expires_at REAL{default}")
+            self._conn.executescript(
+                """
+                CREATE INDEX IF NOT EXISTS jobs_expiry ON jobs (done, expires_at);
+                CREATE INDEX IF NOT EXISTS results_expiry ON results (expires_at);
+                """
+            )
+
+    def _purge(self, now: float) -> None:
+        # Called with the lock held; expired rows are only dropped every so often
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self._PURGE_INTERVAL
+        self._conn.execute(
+            "DELETE FROM jobs WHERE done = 1 AND (expires_at IS NULL OR expires_at <= ?)", (now,)
+        )
+        self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+
+    def _enqueue(self, queue: str, key: str, payload: Dict[str, Any]) -> bool:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE queue = ? AND key = ? AND done = 1 "
+                    "AND (expires_at IS NULL OR expires_at <= ?)",
+                    (queue, key, now),
+                )
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO jobs (queue, key, payload, visible_at) VALUES (?, ?, ?, ?)",
+                    (queue, key, json.dumps(payload), now),
+                )
+                added = cur.rowcount == 1
+                if added:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def _reserve(self, queue: str, visibility_timeout: float) -> Optional[Job]:
+        now = time.time()
+        receipt = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT key, payload, attempts FROM jobs "
+                    "WHERE queue = ? AND done = 0 AND visible_at <= ? "
+                    "ORDER BY visible_at LIMIT 1",
+                    (queue, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET visible_at = ?, attempts = attempts + 1, receipt = ? "
+                    "WHERE queue = ? AND key = ?",
+                    (now + visibility_timeout, receipt, queue, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(queue, row[0], json.loads(row[1]), row[2] + 1, receipt)
+
+    def _extend(self, job: Job, visibility_timeout: float) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE queue = ? AND key = ? AND receipt = ? AND done = 0",
+                (time.time() + visibility_timeout, job.queue, job.key, job.receipt),
+            )
+        return cur.rowcount == 1
+
+    def _ack(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET done = 1, expires_at = ? WHERE queue = ? AND key = ? AND receipt = ?",
+                (time.time() + self.result_ttl, job.queue, job.key, job.receipt),
+            )
+
+    def _release(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE queue = ? AND key = ? AND receipt = ?",
+                (job.queue, job.key, job.receipt),
+            )
+
+    def _put_result(self, key: str, result: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, result, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time() + self.result_ttl),
+            )
+
+    def _get_results(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        now = time.time()
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, result FROM results WHERE key IN ({','.join('?' * len(chunk))}) "
+                    "AND expires_at > ?",
+                    (*chunk, now),
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    async def enqueue(self, queue: str, key: str, payload: Dict[str, Any]) -> bool:  # noqa: D102
+        return await asyncio.to_thread(self._enqueue, queue, key, payload)
+
+    async def reserve(self, queue: str, visibility_timeout: float) -> Optional[Job]:  # noqa: D102
+        return await asyncio.to_thread(self._reserve, queue, visibility_timeout)
+
+    async def extend(self, job: Job, visibility_timeout: float) -> bool:  # noqa: D102
+        return await asyncio.to_thread(self._extend, job, visibility_timeout)
+
+    async def ack(self, job: Job) -> None:  # noqa: D102
+        await asyncio.to_thread(self._ack, job)
+
+    async def release(self, job: Job) -> None:  # noqa: D102
+        await asyncio.to_thread(self._release, job)
+
+    async def put_result(self, key: str, result: Any) -> None:  # noqa: D102
+        await asyncio.to_thread(self._put_result, key, result)
+
+    async def get_results(self, keys: Iterable[str]) -> Dict[str, Any]:  # noqa: D102
+        return await asyncio.to_thread(self._get_results, list(keys))
+
+
+# Adds the job unless its key is taken, clearing any result left under the key
+_ENQUEUE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX') then
+    redis.call('DEL', KEYS[2])
+    redis.call('LPUSH', KEYS[3], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Requeues expired reservations, then reserves the next ready job. Deadlines use
+# the server clock so workers on different hosts agree on them.
+_RESERVE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+for _, key in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], 0, now)) do
+    redis.call('ZREM', KEYS[1], key)
+    redis.call('RPUSH', KEYS[2], key)
+end
+while true do
+    local key = redis.call('RPOP', KEYS[2])
+    if not key then
+        return false
+    end
+    local payload = redis.call('GET', ARGV[3] .. key)
+    -- A job released while it sat in the ready list is skipped
+    if payload then
+        redis.call('ZADD', KEYS[1], now + tonumber(ARGV[1]), key)
+        redis.call('HSET', KEYS[3], key, ARGV[2])
+        local attempts = redis.call('HINCRBY', KEYS[4], key, 1)
+        return {key, payload, attempts}
+    end
+end
+"""
+
+# Pushes back the deadline of a reservation still held by the given receipt
+_EXTEND_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# Ends a reservation still held by the given receipt; the job key is kept for
+# ARGV[3] seconds, or deleted at once when ARGV[3] is 0
+_FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[4], ARGV[3])
+else
+    redis.call('DEL', KEYS[4])
+end
+return 1
+"""
+
+
+class RedisBroker:
+    """Multi-node broker backed by Redis (or any Redis-compatible server).
+
+    Each job's payload is stored under its own key, so an acknowledged job can
+    simply expire. A queue is a list of ready keys plus a sorted set of
+    reserved keys scored by their visibility deadline; expired reservations are
+    moved back to the list on the next `reserve`. Every multi-key operation runs
+    as a Lua script, so a worker dying mid-call cannot lose or duplicate a job.
+    """
+
+    def __init__(
+        self, url: str, prefix: str = "enrichment", result_ttl: float = DEFAULT_RESULT_TTL
+    ) -> None:
+        """Connect to the Redis server at `url`.
+
+        Args:
+            url: The server URL.
+            prefix: Prepended to every key the broker uses.
+            result_ttl: Seconds an acknowledged job's key and its result are kept.
+        """
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as e:
+            raise ImportError(
+                "RedisBroker requires the redis package. "
+                'Install it with: pip install "enrichment-agent[queue]"'
+            ) from e
+        self._redis = aioredis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self.result_ttl = result_ttl
+        self._enqueue_script = self._redis.register_script(_ENQUEUE_SCRIPT)
+        self._reserve_script = self._redis.register_script(_RESERVE_SCRIPT)
+        self._extend_script = self._redis.register_script(_EXTEND_SCRIPT)
+        self._finish_script = self._redis.register_script(_FINISH_SCRIPT)
+
+    def _k(self, *parts: str) -> str:
+        return ":".join((self._prefix, *parts))
+
+    async def enqueue(self, queue: str, key: str, payload: Dict[str, Any]) -> bool:  # noqa: D102
+        added = await self._enqueue_script(
+            keys=[self._k("job", queue, key), self._k("result", key), self._k("ready", queue)],
+            args=[json.dumps(payload), key],
+        )
+        return bool(added)
+
+    async def reserve(self, queue: str, visibility_timeout: float) -> Optional[Job]:  # noqa: D102
+        receipt = uuid.uuid4().hex
+        reserved = await self._reserve_script(
+            keys=[
+                self._k("reserved", queue),
+                self._k("ready", queue),
+                self._k("receipt", queue),
+                self._k("attempts", queue),
+            ],
+            args=[visibility_timeout, receipt, self._k("job", queue, "")],
+        )
+        if not reserved:
+            return None
+        key, payload, attempts = reserved
+        return Job(queue, key, json.loads(payload), int(attempts), receipt)
+
+    async def extend(self, job: Job, visibility_timeout: float) -> bool:  # noqa: D102
+        extended = await self._extend_script(
+            keys=[self._k("reserved", job.queue), self._k("receipt", job.queue)],
+            args=[job.key, job.receipt, visibility_timeout],
+        )
+        return bool(extended)
+
+    async def _finish(self, job: Job, keep_for: int) -> None:
+        await self._finish_script(
+            keys=[
+                self._k("reserved", job.queue),
+                self._k("receipt", job.queue),
+                self._k("attempts", job.queue),
+                self._k("job", job.queue, job.key),
+            ],
+            args=[job.key, job.receipt, keep_for],
+        )
+
+    async def ack(self, job: Job) -> None:  # noqa: D102
+        await self._finish(job, keep_for=max(1, int(self.result_ttl)))
+
+    async def release(self, job: Job) -> None:  # noqa: D102
+        await self._finish(job, keep_for=0)
+
+    async def put_result(self, key: str, result: Any) -> None:  # noqa: D102
+        await self._redis.set(self._k("result", key), json.dumps(result), ex=max(1, int(self.result_ttl)))
+
+    async def get_results(self, keys: Iterable[str]) -> Dict[str, Any]:  # noqa: D102
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = await self._redis.mget([self._k("result", k) for k in keys])
+        return {k: json.loads(v) for k, v in zip(keys, values) if v is not None}
+
+
+@functools.cache
+def get_broker(url: str, result_ttl: float = DEFAULT_RESULT_TTL) -> Broker:
+    """Return a broker for `url` shared across the process."""
+    return connect_broker(url, result_ttl)
+
+
+def connect_broker(url: str, result_ttl: float = DEFAULT_RESULT_TTL) -> Broker:
+    """Return a broker for a "sqlite:///path/to.db" or "redis://host:port/db" URL."""
+    if url.startswith("sqlite:///"):
+        return SqliteBroker(url[len("sqlite:///") :], result_ttl=result_ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url, result_ttl=result_ttl)
+    raise ValueError(f"Unsupported broker URL: {url}")
+
+
+async def wait_for_results(
+    broker: Broker,
+    keys: Iterable[str],
+    *,
+    timeout: float,
+    poll_interval: float = 1.0,
+) -> Dict[str, Any]:
+    """Poll until results exist for all `keys` or `timeout` passes; return those found."""
+    pending = set(keys)
+    results: Dict[str, Any] = {}
+    deadline = time.monotonic() + timeout
+    while pending:
+        found = await broker.get_results(pending)
+        results.update(found)
+        pending.difference_update(found)
+        if not pending or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(poll_interval)
+    return results
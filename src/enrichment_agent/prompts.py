@@ -11,3 +11,29 @@ Procurement Requirement: {procurement_requirement}
 
 You will generate a list of search queries to find relevant information.
 """
+
+CONTACT_PROMPT = """
+Extract the contact details of {supplier_name} from the web page below. Only return details that appear on the page; leave a field empty if it is not there.
+
+{content}
+"""
+
+FACET_PROMPT = """
+You are a procurement specialist agent. Split the procurement requirement below into the distinct products, materials or services it asks suppliers for, so the search can check that suppliers are found for each one.
+
+Company Name: {company_name}
+Company Information: {company_info}
+Procurement Requirement: {procurement_requirement}
+
+Return one facet per product, material or service, with a few lower-case keywords that would appear in a matching supplier's description. Do not add facets for certifications or standards.
+"""
+
+FOLLOW_UP_PROMPT = """
+The searches so far found too few suppliers for these parts of the requirement:
+
+{facets}
+
+Generate at most {queries_per_facet} new search queries for each of them, and no queries for anything else. Do not repeat any of these earlier queries:
+
+{searched_queries}
+"""
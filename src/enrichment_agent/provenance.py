@@ -0,0 +1,157 @@
+"""Field-level provenance and caching for extracted suppliers.
+
+Every field of a `Supplier` records where its value came from in
+`Supplier.provenance`, keyed by field path ("name", "contact_details.email"):
+the source URL, when that page was fetched, and how the value was obtained
+("llm" extraction, a "regex" scan of the page, or the contact "parser" that
+crawls a supplier's site). An empty field's entry records when it was last
+looked for. A supplier whose email is empty and has no entry has not been
+looked up on the supplier's own site yet; the contact enrichment stage does
+that for all such suppliers after the primary extractions.
+
+Knowing the age of each field lets a cached supplier be reused field by
+field: `stale_fields` names the fields past their TTL, and only those are
+fetched again. Suppliers are cached per canonical source URL by
+`SupplierFieldCache`.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, List, Literal, Optional
+
+from enrichment_agent.state import ContactDetails, FieldSource, Supplier
+
+SUPPLIER_FIELDS = ("name", "description", "standards_compliance", "certifications")
+CONTACT_FIELDS = tuple(
+    f"contact_details.{name}" for name in ("email", "phone", "website", "address")
+)
+FIELD_PATHS = SUPPLIER_FIELDS + CONTACT_FIELDS
+
+
+def get_field(supplier: Supplier, path: str) -> Any:
+    """Return the value at a field path such as "contact_details.email"."""
+    value: Any = supplier
+    for part in path.split("."):
+        value = getattr(value, part)
+    return value
+
+
+def set_field(supplier: Supplier, path: str, value: Any, source: Optional[FieldSource] = None) -> None:
+    """Set the value at a field path and, if given, record its source."""
+    *parents, name = path.split(".")
+    target: Any = supplier
+    for part in parents:
+        target = getattr(target, part)
+    setattr(target, name, value)
+    if source is not None:
+        supplier.provenance[path] = source
+
+
+def record_fields(
+    supplier: Supplier,
+    url: str,
+    method: Literal["llm", "regex", "parser"],
+    fetched_at: Optional[float] = None,
+    paths: Iterable[str] = FIELD_PATHS,
+) -> None:
+    """Record `url` fetched at `fetched_at` (default now) as the source of the given fields."""
+    source = FieldSource(url=url, fetched_at=fetched_at or time.time(), method=method)
+    for path in paths:
+        supplier.provenance[path] = source
+
+
+def merge_supplier(
+    base: Supplier, update: Supplier, paths: Iterable[str] = FIELD_PATHS
+) -> Supplier:
+    """Fill the empty fields of `base` from `update`, keeping their provenance; return `base`.
+
+    Unlike replacing `base` outright, values already found stay in place with
+    their original sources.
+    """
+    for path in paths:
+        value = get_field(update, path)
+        if value and not get_field(base, path):
+            set_field(base, path, value, update.provenance.get(path))
+    return base
+
+
+def merge_contact_details(supplier: Supplier, contact: ContactDetails, source: FieldSource) -> Supplier:
+    """Fill the empty contact fields of `supplier` from `contact`, all found at `source`; return `supplier`."""
+    for path in CONTACT_FIELDS:
+        value = getattr(contact, path.split(".", 1)[1])
+        if value and not get_field(supplier, path):
+            set_field(supplier, path, value, source)
+    return supplier
+
+
+def needs_contact_lookup(supplier: Supplier) -> bool:
+    """Return whether the supplier's email is missing and has not been looked for."""
+    return (
+        not supplier.contact_details.email
+        and "contact_details.email" not in supplier.provenance
+    )
+
+
+def stale_fields(
+    supplier: Supplier,
+    max_age: float,
+    missing_max_age: Optional[float] = None,
+    now: Optional[float] = None,
+) -> List[str]:
+    """Return the field paths with no recorded source or a source older than their TTL.
+
+    Args:
+        supplier: The supplier to check.
+        max_age: The TTL, in seconds, of fields that hold a value.
+        missing_max_age: The TTL of empty fields, so missing details are looked
+            for again sooner. Defaults to `max_age`.
+        now: The current time; defaults to `time.time()`.
+    """
+    now = now or time.time()
+    stale = []
+    for path in FIELD_PATHS:
+        source = supplier.provenance.get(path)
+        ttl = max_age if get_field(supplier, path) else (missing_max_age or max_age)
+        if source is None or now - source.fetched_at > ttl:
+            stale.append(path)
+    return stale
+
+
+class SupplierFieldCache:
+    """Last extracted supplier per source URL, with provenance, as JSON files on disk."""
+
+    def __init__(self, root: Path) -> None:
+        """Open (or create) a cache under `root`."""
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url: str) -> Path:
+        # utils imports this module, so import it on use rather than at load time
+        from enrichment_agent.utils import canonical_url
+
+        return self.root / f"{hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[Supplier]:
+        """Return the cached supplier for `url`, if any."""
+        try:
+            return Supplier.model_validate_json(self._path(url).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, supplier: Supplier) -> None:
+        """Cache `supplier` as the one extracted from `url`."""
+        path = self._path(url)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(supplier.model_dump()), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+@functools.cache
+def get_field_cache(cache_dir: str) -> SupplierFieldCache:
+    """Return the process-wide supplier field cache for a cache directory."""
+    return SupplierFieldCache(Path(cache_dir) / "suppliers")
@@ -0,0 +1,123 @@
+"""Deterministic quality scoring for submitted info and extracted suppliers.
+
+Used by the reflection step to accept clearly complete results and reject
+clearly incomplete ones without an LLM call, and by supplier extraction to
+decide when a cheap model's output should be retried on a stronger one.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Tuple
+
+
+@dataclass
+class CompletenessReport:
+    """The result of scoring submitted info against an extraction schema."""
+
+    score: float
+    """Completeness between 0 (nothing filled) and 1 (everything filled)."""
+
+    issues: List[str] = field(default_factory=list)
+    """Human-readable descriptions of missing or insufficient fields."""
+
+    def verdict(
+        self, accept_threshold: float, reject_threshold: float
+    ) -> Literal["accept", "reject", "borderline"]:
+        """Classify the score against the configured thresholds."""
+        if self.score >= accept_threshold:
+            return "accept"
+        if self.score < reject_threshold:
+            return "reject"
+        return "borderline"
+
+
+def _is_filled(value: Any) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return value.strip().lower() not in {"", "n/a", "na", "none", "unknown", "not available"}
+    if isinstance(value, (list, dict)):
+        return len(value) > 0
+    return True
+
+
+def _score_value(
+    value: Any, schema: Dict[str, Any], path: str, min_items: int
+) -> Tuple[float, List[str]]:
+    if not _is_filled(value):
+        return 0.0, [f"{path} is missing"]
+
+    kind = schema.get("type")
+    if kind == "object" and isinstance(value, dict) and schema.get("properties"):
+        properties = schema["properties"]
+        # Objects without a "required" list (e.g. contact details) expect every property
+        expected = schema.get("required") or list(properties)
+        scores, issues = [], []
+        for name in expected:
+            s, i = _score_value(
+                value.get(name), properties.get(name, {}), f"{path}.{name}", min_items
+            )
+            scores.append(s)
+            issues.extend(i)
+        return (sum(scores) / len(scores) if scores else 1.0), issues
+
+    if kind == "array" and isinstance(value, list) and "items" in schema:
+        scores, issues = [], []
+        for idx, item in enumerate(value):
+            s, i = _score_value(item, schema["items"], f"{path}[{idx}]", min_items)
+            scores.append(s)
+            issues.extend(i)
+        mean = sum(scores) / len(scores)
+        if schema["items"].get("type") == "object" and len(value) < min_items:
+            issues.append(f"{path} has {len(value)} entries, expected at least {min_items}")
+            mean *= len(value) / min_items
+        return mean, issues
+
+    return 1.0, []
+
+
+def score_completeness(
+    info: Dict[str, Any], schema: Dict[str, Any], min_items: int = 1
+) -> CompletenessReport:
+    """Score how completely `info` fills the given JSON schema.
+
+    Every required field (or every property, for objects that list none) counts
+    equally within its parent object. Lists of objects are averaged over their
+    items and scaled down when they hold fewer than `min_items` entries.
+    """
+    score, issues = _score_value(info, schema, "info", min_items)
+    return CompletenessReport(score=round(score, 4), issues=issues)
+
+
+def _digits(text: str) -> str:
+    return re.sub(r"\D", "", text)
+
+
+def supplier_confidence(supplier: Any, content: str) -> float:
+    """Estimate how far an extracted `Supplier` can be trusted, between 0 and 1.
+
+    The name must be grounded in the page `content` (0.4), the description
+    substantive (0.2), contact details present with any email or phone found
+    verbatim on the page (0.2), and compliance or certifications filled (0.2).
+    """
+    text = content.lower()
+    score = 0.0
+
+    name_tokens = re.findall(r"[a-z0-9]{3,}", (supplier.name or "").lower())
+    if name_tokens and sum(t in text for t in name_tokens) * 2 >= len(name_tokens):
+        score += 0.4
+
+    if _is_filled(supplier.description) and len(supplier.description.strip()) >= 20:
+        score += 0.2
+
+    contact = supplier.contact_details
+    email = (contact.email or "").strip().lower()
+    phone = _digits(contact.phone or "")
+    grounded = (not email or email in text) and (not phone or phone in _digits(content))
+    if grounded and (email or phone or _is_filled(contact.website)):
+        score += 0.2
+
+    if _is_filled(supplier.standards_compliance) or _is_filled(supplier.certifications):
+        score += 0.2
+
+    return round(score, 4)
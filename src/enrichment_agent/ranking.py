@@ -0,0 +1,217 @@
+"""Local scoring and ranking of extracted suppliers.
+
+Suppliers come back from extraction with free-text `certifications` and
+`standards_compliance`. This module parses both into a normalized set of
+certifications (ISO 13485, FDA, CE, ...) and scores every candidate at once
+against criteria derived from the procurement requirement:
+
+- certifications the requirement names explicitly are required;
+- certifications `COMPLIANCE_AND_REGULATORY_GUIDANCE` lists for the product
+  categories the requirement mentions are preferred;
+- the quality, ESG and service criteria of `SUPPLIER_EVALUATION_CRITERIA` add
+  ISO 9001, ISO 14001 and reachable contact details.
+
+Scoring is a single matrix product over suppliers x criteria, so ranking
+thousands of candidates takes milliseconds and needs no model calls.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+)
+
+from enrichment_agent.cpu_pool import dedupe_suppliers
+from enrichment_agent.sourcing_knowledge import (
+    COMPLIANCE_AND_REGULATORY_GUIDANCE,
+    SUPPLIER_EVALUATION_CRITERIA,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_ISO_RE = re.compile(r"\b(ISO|IATF|IEC)[\s/:-]*(?:IEC[\s/:-]*)?(\d{4,5})(?:[:-]\d{4})?\b", re.IGNORECASE)
+
+# Acronyms that are ordinary words in lower case ("reach", "ce") match upper case only
+_NAMED_CERTIFICATIONS: Dict[str, Pattern[str]] = {
+    "FDA": re.compile(r"\b(?:US\s?)?FDA\b|\b510\s?\(k\)|\bPMA\b"),
+    "CE": re.compile(r"\bCE\b"),
+    "RoHS": re.compile(r"\bRoHS\b", re.IGNORECASE),
+    "REACH": re.compile(r"\bREACH\b"),
+    "WEEE": re.compile(r"\bWEEE\b", re.IGNORECASE),
+    "FCC": re.compile(r"\bFCC\b"),
+    "UL": re.compile(r"\bUL\b(?:[\s-]?(?:listed|certified|\d+))?"),
+    "GMP": re.compile(r"\bc?GMP\b|good manufacturing practice", re.IGNORECASE),
+    "HACCP": re.compile(r"\bHACCP\b", re.IGNORECASE),
+    "BRC": re.compile(r"\bBRC(?:GS)?\b"),
+    "SQF": re.compile(r"\bSQF\b"),
+    "CDSCO": re.compile(r"\bCDSCO\b", re.IGNORECASE),
+    "BIS": re.compile(r"\bBIS\b"),
+    "TSCA": re.compile(r"\bTSCA\b"),
+    "GHS": re.compile(r"\bGHS\b"),
+    "ASTM F963": re.compile(r"\bASTM[\s-]*F[\s-]?963\b", re.IGNORECASE),
+    "EN 71": re.compile(r"\bEN[\s-]?71\b"),
+    "CPSIA": re.compile(r"\bCPSIA\b"),
+}
+
+_CATEGORY_KEYWORDS: Dict[str, Sequence[str]] = {
+    "medical_devices": ("medical", "diagnostic", "surgical", "implant", "healthcare"),
+    "electronics": ("electronic", "pcb", "semiconductor", "circuit"),
+    "food_and_beverage": ("food", "beverage", "edible"),
+    "chemicals": ("chemical", "solvent", "resin"),
+    "toys_childrens_products": ("toy", "children", "infant"),
+}
+
+_CONTACT_FIELDS = ("email", "phone", "website")
+
+
+def parse_certifications(*texts: Optional[str]) -> FrozenSet[str]:
+    """Return the normalized certifications mentioned in `texts`.
+
+    ISO, IEC and IATF standards are normalized to "<family> <number>", ignoring
+    the year suffix, so "ISO13485:2016" and "iso 13485" both give
+    "ISO 13485".
+    """
+    found = set()
+    for text in texts:
+        if not text:
+            continue
+        for family, number in _ISO_RE.findall(text):
+            found.add(f"{family.upper()} {number}")
+        for name, pattern in _NAMED_CERTIFICATIONS.items():
+            if pattern.search(text):
+                found.add(name)
+    return frozenset(found)
+
+
+@dataclass(frozen=True)
+class Criterion:
+    """One column of the scoring matrix."""
+
+    name: str
+    """A normalized certification, or "contact:<field>" for a contact detail."""
+    weight: float
+    required: bool = False
+    source: str = ""
+    """Where the criterion came from: "requirement", a product category or an evaluation criterion."""
+
+
+def criteria_for(requirement: str) -> List[Criterion]:
+    """Derive scoring criteria from a procurement requirement."""
+    criteria: Dict[str, Criterion] = {}
+
+    def add(name: str, weight: float, source: str, required: bool = False) -> None:
+        existing = criteria.get(name)
+        if existing is None or weight > existing.weight:
+            criteria[name] = Criterion(name, weight, required or bool(existing and existing.required), source)
+
+    for name in sorted(parse_certifications(requirement)):
+        add(name, 3.0, "requirement", required=True)
+
+    lowered = requirement.lower()
+    product_guidance = COMPLIANCE_AND_REGULATORY_GUIDANCE["product_specific_compliance"]
+    for category, keywords in _CATEGORY_KEYWORDS.items():
+        if any(k in lowered for k in keywords):
+            for name in sorted(parse_certifications(*product_guidance[category])):
+                add(name, 1.5, category)
+
+    # Baselines from the general evaluation criteria
+    for name in sorted(parse_certifications(*SUPPLIER_EVALUATION_CRITERIA["quality"]["metrics"])):
+        add(name, 1.0, "quality")
+    for name in sorted(
+        parse_certifications(*SUPPLIER_EVALUATION_CRITERIA["esg_compliance_ethical_practices"]["metrics"])
+    ):
+        add(name, 0.5, "esg_compliance_ethical_practices")
+    for contact_field in _CONTACT_FIELDS:
+        add(f"contact:{contact_field}", 0.5, "service_and_support")
+
+    return list(criteria.values())
+
+
+@dataclass
+class SupplierScore:
+    """A supplier with its score against the criteria."""
+
+    supplier: Dict[str, Any]
+    score: float
+    """Weighted share of criteria met, between 0 and 1."""
+    certifications: List[str] = field(default_factory=list)
+    missing_required: List[str] = field(default_factory=list)
+
+
+def score_matrix(
+    certifications: Sequence[FrozenSet[str]],
+    contacts: Sequence[Dict[str, Any]],
+    criteria: Sequence[Criterion],
+) -> "np.ndarray":
+    """Return the suppliers x criteria matrix of met (1.0) and unmet (0.0) criteria."""
+    import numpy as np
+
+    matrix = np.zeros((len(certifications), len(criteria)), dtype=np.float32)
+    columns = {c.name: j for j, c in enumerate(criteria)}
+    for i, (certs, contact) in enumerate(zip(certifications, contacts)):
+        for name in certs:
+            j = columns.get(name)
+            if j is not None:
+                matrix[i, j] = 1.0
+        for contact_field in _CONTACT_FIELDS:
+            j = columns.get(f"contact:{contact_field}")
+            if j is not None and contact.get(contact_field):
+                matrix[i, j] = 1.0
+    return matrix
+
+
+def rank_suppliers(
+    suppliers: Sequence[Dict[str, Any]],
+    requirement: str,
+    *,
+    dedupe: bool = True,
+) -> List[SupplierScore]:
+    """Score suppliers against the requirement and return them best first.
+
+    Suppliers missing fewer required certifications always rank higher; ties
+    are broken by score, then by input order.
+
+    Args:
+        suppliers: Supplier dicts, as produced by `Supplier.model_dump()`.
+        requirement: The procurement requirement the criteria are derived from.
+        dedupe: Merge duplicate suppliers before scoring.
+    """
+    if dedupe:
+        suppliers = dedupe_suppliers(list(suppliers))
+    if not suppliers:
+        return []
+    import numpy as np
+
+    criteria = criteria_for(requirement)
+    certifications = [
+        parse_certifications(s.get("certifications"), s.get("standards_compliance"))
+        for s in suppliers
+    ]
+    matrix = score_matrix(
+        certifications, [s.get("contact_details") or {} for s in suppliers], criteria
+    )
+
+    weights = np.array([c.weight for c in criteria], dtype=np.float32)
+    required = np.array([c.required for c in criteria], dtype=bool)
+    scores = matrix @ weights / weights.sum()
+    missing = (matrix[:, required] == 0).sum(axis=1)
+    order = np.lexsort((-scores, missing))
+
+    required_names = [c.name for c in criteria if c.required]
+    return [
+        SupplierScore(
+            supplier=suppliers[i],
+            score=round(float(scores[i]), 4),
+            certifications=sorted(certifications[i]),
+            missing_required=[n for n in required_names if n not in certifications[i]],
+        )
+        for i in order
+    ]
@@ -0,0 +1,156 @@
+"""Per-host politeness scheduling for outbound page fetches.
+
+Many overlapping runs tend to hit the same directory sites (indiamart.com,
+tradeindia.com) at once. `HostScheduler` hands out fetch slots so that each
+host gets at most `per_host_concurrency` requests in flight, consecutive
+requests to a host start at least `min_delay` seconds apart (or the host's
+own robots.txt Crawl-delay, when longer), and hosts are served round-robin so
+one busy domain cannot starve the others.
+"""
+
+import asyncio
+import contextlib
+import time
+import weakref
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+
+class HostScheduler:
+    """Fair, rate-limited scheduler of fetch slots keyed by host."""
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 32,
+        per_host_concurrency: int = 2,
+        min_delay: float = 1.0,
+    ) -> None:
+        """Configure the global and per-host limits."""
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.min_delay = min_delay
+        self._waiters: Dict[str, Deque[asyncio.Future[None]]] = {}
+        self._rotation: Deque[str] = deque()
+        self._active: Dict[str, int] = {}
+        self._total_active = 0
+        self._next_start: Dict[str, float] = {}
+        self._host_delays: Dict[str, float] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def set_host_delay(self, host: str, delay: float) -> None:
+        """Space requests to `host` at least `delay` seconds apart, e.g. per its Crawl-delay."""
+        self._host_delays[host] = delay
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Return the number of requests waiting for each host."""
+        return {host: len(q) for host, q in self._waiters.items() if q}
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return queued and in-flight request counts per host."""
+        hosts = set(self._active) | set(self._waiters)
+        return {
+            host: {
+                "queued": len(self._waiters.get(host, ())),
+                "active": self._active.get(host, 0),
+            }
+            for host in sorted(hosts)
+            if self._waiters.get(host) or self._active.get(host)
+        }
+
+    async def acquire(self, host: str) -> None:
+        """Wait until a request to `host` may start."""
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue = self._waiters.setdefault(host, deque())
+        if not queue and host not in self._rotation:
+            self._rotation.append(host)
+        queue.append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before cancellation: give it back
+                self.release(host)
+            else:
+                with contextlib.suppress(ValueError):  # may already be dropped by _dispatch
+                    queue.remove(future)
+            raise
+
+    def release(self, host: str) -> None:
+        """Free the slot held by a finished request to `host`."""
+        self._active[host] -= 1
+        if not self._active[host]:
+            del self._active[host]
+        self._total_active -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """Hold a fetch slot for `host` for the duration of the block."""
+        await self.acquire(host)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def _dispatch(self) -> None:
+        """Grant slots round-robin to hosts that are under their limits and past their delay."""
+        now = time.monotonic()
+        earliest: Optional[float] = None
+        granted = True
+        while granted and self._total_active < self.max_concurrency:
+            granted = False
+            # One pass over the rotation grants at most one slot per host
+            for _ in range(len(self._rotation)):
+                if self._total_active >= self.max_concurrency:
+                    break
+                host = self._rotation.popleft()
+                queue = self._waiters.get(host)
+                while queue and queue[0].done():  # drop cancelled waiters
+                    queue.popleft()
+                if not queue:
+                    self._waiters.pop(host, None)
+                    continue
+                ready_at = self._next_start.get(host, 0.0)
+                if ready_at > now:
+                    earliest = ready_at if earliest is None else min(earliest, ready_at)
+                elif self._active.get(host, 0) < self.per_host_concurrency:
+                    queue.popleft().set_result(None)
+                    self._active[host] = self._active.get(host, 0) + 1
+                    self._total_active += 1
+                    self._next_start[host] = now + max(self.min_delay, self._host_delays.get(host, 0.0))
+                    granted = True
+                if queue:
+                    self._rotation.append(host)
+                else:
+                    self._waiters.pop(host, None)
+
+        if earliest is not None:
+            loop = asyncio.get_running_loop()
+            if self._timer is not None and self._timer.when() > loop.time() + (earliest - now):
+                self._timer.cancel()
+                self._timer = None
+            if self._timer is None:
+                self._timer = loop.call_later(earliest - now, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HostScheduler]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_scheduler(**kwargs: object) -> HostScheduler:
+    """Return the scheduler shared by every run on the current event loop.
+
+    Keyword arguments configure the scheduler the first time it is created on a loop.
+    """
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = HostScheduler(**kwargs)  # type: ignore[arg-type]
+    return scheduler
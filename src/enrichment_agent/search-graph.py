@@ -1,64 +1,203 @@
-import json
-import asyncio
-from typing import Any, Dict, List, Literal, Optional, cast
+"""Supplier search graph.
 
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+Plans search queries for a procurement requirement, searches, extracts a
+supplier from each hit, looks up missing contact details and ranks the
+suppliers against the requirement. This is the graph served by LangGraph
+(see langgraph.json).
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, replace
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union, cast
+
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
-from langgraph.prebuilt import ToolNode
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Send
-from pydantic import BaseModel, Field
 
-from enrichment_agent.prompts import MAIN_PROMPT
+from enrichment_agent.budget import TAVILY_CREDIT_COSTS, extract_cost, usage_tokens
+from enrichment_agent.checkpoint import run_resumable
 from enrichment_agent.configuration import Configuration
+from enrichment_agent.contacts import find_contacts, is_directory_site
+from enrichment_agent.coverage import facet_coverage, requirement_facets, under_covered
+from enrichment_agent.cpu_pool import get_cpu_pool, scan_contacts_blob
+from enrichment_agent.crawler import find_contact_details
+from enrichment_agent.export import append_jsonl, export_suppliers
+from enrichment_agent.extraction import (
+    fetch_page,
+    get_configured_blob_store,
+    get_configured_fetcher,
+    get_configured_hedger,
+)
+from enrichment_agent.fetcher import close_fetcher
+from enrichment_agent.jobqueue import get_broker, wait_for_results
+from enrichment_agent.prompts import FACET_PROMPT, FOLLOW_UP_PROMPT, MAIN_PROMPT
+from enrichment_agent.provenance import (
+    CONTACT_FIELDS,
+    FIELD_PATHS,
+    get_field_cache,
+    merge_contact_details,
+    merge_supplier,
+    needs_contact_lookup,
+    record_fields,
+    set_field,
+    stale_fields,
+)
+from enrichment_agent.ranking import rank_suppliers
 from enrichment_agent.schema import schema
-from enrichment_agent.state import InputState, OutputState, Queries, SearchState, State, Supplier, ResultState
-from enrichment_agent.utils import init_model, check_for_business_website
+from enrichment_agent.state import (
+    ContactDetails,
+    FieldSource,
+    InputState,
+    Queries,
+    ResultState,
+    SearchOutputState,
+    SearchPlan,
+    SearchResultRecord,
+    SearchState,
+    State,
+    Supplier,
+)
+from enrichment_agent.utils import (
+    canonical_url,
+    check_for_business_website,
+    extract_contact_details,
+    extract_supplier_chunked,
+    init_model,
+)
+from enrichment_agent.worker import EXTRACT_QUEUE, extract_task_key
+
+logger = logging.getLogger(__name__)
+
+
+def _follow_up_facets(state: State, configuration: Configuration) -> Dict[str, int]:
+    """Return the supplier count of each facet still short of its target after a search round."""
+    if configuration.query_planner != "coverage" or not state.search_rounds:
+        return {}
+    coverage = facet_coverage(state.ranked_suppliers, state.facets)
+    return {
+        name: coverage[name]
+        for name in under_covered(coverage, configuration.facet_target_suppliers)
+    }
 
 
-from tavily import TavilyClient
+def _query_messages(state: State, configuration: Configuration) -> List[BaseMessage]:
+    """Format the query generation prompt followed by the conversation so far.
 
-import asyncio
+    In a follow-up round of the coverage planner, a final message asks for
+    queries covering only the facets that are still short of suppliers.
+    """
+    p = MAIN_PROMPT.format(
+        company_name=state.company_name,
+        company_info=state.company_info,
+        procurement_requirement=state.procurement_requirement,
+        info=json.dumps(schema, indent=2),
+    )
+    messages = [HumanMessage(content=p)] + state.messages
+    follow_up = _follow_up_facets(state, configuration)
+    if follow_up:
+        keywords = {f.name: f.keywords for f in state.facets}
+        facets = "\n".join(
+            f"- {name} (keywords: {', '.join(keywords[name]) or 'any'}): "
+            f"{count} of {configuration.facet_target_suppliers} suppliers found"
+            for name, count in follow_up.items()
+        )
+        messages.append(
+            HumanMessage(
+                content=FOLLOW_UP_PROMPT.format(
+                    facets=facets,
+                    queries_per_facet=configuration.queries_per_facet,
+                    searched_queries="\n".join(f"- {q}" for q in state.searched_queries),
+                )
+            )
+        )
+    return messages
+
+
+def _query_limit(state: State, configuration: Configuration) -> Optional[int]:
+    """Return the most queries a follow-up round may issue, or None in the first round."""
+    follow_up = _follow_up_facets(state, configuration)
+    return configuration.queries_per_facet * len(follow_up) if follow_up else None
+
+
+async def plan_facets(state: State, config: RunnableConfig):
+    """Split the procurement requirement into the facets the coverage planner tracks."""
+    model = init_model(config, role="planner").with_structured_output(SearchPlan, include_raw=True)
+    p = FACET_PROMPT.format(
+        company_name=state.company_name,
+        company_info=state.company_info,
+        procurement_requirement=state.procurement_requirement,
+    )
+    result = await model.ainvoke([HumanMessage(content=p)])
+    plan = cast(Optional[SearchPlan], result["parsed"])
+    return {
+        "facets": requirement_facets(state.procurement_requirement, plan.facets if plan else []),
+        "tokens_used": usage_tokens(result["raw"]),
+        "started_at": state.started_at or time.time(),
+    }
+
+
+def _extraction_plan(configuration: Configuration, usage: State) -> Tuple[str, int]:
+    """Return the extract depth and the credits per extracted result."""
+    extract_depth = configuration.budget.extract_depth(usage)
+    return extract_depth, extract_cost(extract_depth)
 
 
 async def call_agent_model(
     state: State, *, config: Optional[RunnableConfig] = None
 ) -> Dict[str, Any]:
     """Call the agent model to generate search queries."""
-
     # Initialize the model
-    raw_model = init_model(config)
+    raw_model = init_model(config, role="planner")
     
-    # Create a model with structured output
-    structured_model = raw_model.with_structured_output(Queries)
+    # Create a model with structured output, keeping the raw message for token usage
+    structured_model = raw_model.with_structured_output(Queries, include_raw=True)
     
     # Get the configuration
     configuration = Configuration.from_runnable_config(config)
+    started_at = state.started_at or time.time()
     
-    # Format the prompt
-    p = MAIN_PROMPT.format(
-        company_name=state.company_name,
-        company_info=state.company_info,
-        procurement_requirement=state.procurement_requirement,
-        info=json.dumps(schema, indent=2),
-    )
-
     # Create the message list
-    messages = [HumanMessage(content=p)] + state.messages
+    messages = _query_messages(state, configuration)
 
     # Invoke the model with the messages
-    response = await structured_model.ainvoke(messages)
-    
+    result = await structured_model.ainvoke(messages)
+    response = cast(Optional[Queries], result["parsed"])
+    queries = [q for q in (response.queries if response else []) if q not in state.searched_queries]
+    queries = queries[: _query_limit(state, configuration)]
+    tokens_used = usage_tokens(result["raw"])
+
+    # Only issue as many queries as the remaining budget can search and extract
+    usage = replace(state, tokens_used=state.tokens_used + tokens_used, started_at=started_at)
+    per_query = TAVILY_CREDIT_COSTS["search"] + configuration.results_per_query * extract_cost(
+        configuration.budget.extract_depth(usage)
+    )
+    queries = queries[: configuration.budget.max_fanout(len(queries), usage, per_query)]
+
     # Return the queries
     return {
-        "queries": response.queries
+        "queries": queries,
+        "searched_queries": queries,
+        "search_rounds": 1,
+        # Results of earlier rounds have already been extracted
+        "extracted_urls": [r.url for r in state.search_results],
+        "tokens_used": tokens_used,
+        "started_at": started_at,
     }
 
 
-def continue_to_search(state: State):
-    """Generate Send objects for each query."""
+def continue_to_search(state: State) -> Union[List[Send], Literal["enrich_contacts"]]:
+    """Generate Send objects for each query, or move on when there is nothing to search."""
     if not state.queries:
-        return []
+        # Still enrich and re-rank, so the coverage planner gets to decide on another round
+        return "enrich_contacts"
     
     # Return a list of `Send` objects
     # Each `Send` object consists of the name of a node in the graph
@@ -66,8 +205,12 @@ def continue_to_search(state: State):
     return [Send("search_node", {"query": q}) for q in state.queries]
 
 
-async def search_node(state: SearchState):
+async def search_node(state: SearchState, config: RunnableConfig):
     """Search the web for the given query."""
+    configuration = Configuration.from_runnable_config(config)
+    store = get_configured_blob_store(configuration)
+    from tavily import TavilyClient
+
     # Use a single client instance
     tavily = TavilyClient()
     
@@ -75,102 +218,572 @@ async def search_node(state: SearchState):
     query = state.query if hasattr(state, 'query') else state.get("query")
     
     # Perform the search using asyncio.to_thread since tavily.search is a blocking call
-    results = await asyncio.to_thread(
-        lambda: tavily.search(query)
-    )
+    def call():
+        return asyncio.to_thread(lambda: tavily.search(query))
+
+    hedger = get_configured_hedger(configuration)
+    if hedger:
+        # A search still running past the observed p95 gets a duplicate; both are charged
+        results, requests = await hedger.run("search", call)
+    else:
+        results, requests = await call(), 1
+
+    # Keep compact records of the top hits; their text goes to the shared blob store
+    hits = sorted(results.get("results", []), key=lambda r: r.get("score", 0.0), reverse=True)
+    top = [hit for hit in hits if hit.get("url")][: configuration.results_per_query]
+
+    def store_texts() -> List[Optional[str]]:
+        texts = (hit.get("raw_content") or hit.get("content") for hit in top)
+        return [store.put(text) if text else None for text in texts]
+
+    # Written in one thread hop; crawl_and_extract reads the text back instead of fetching when it suffices
+    keys = await asyncio.to_thread(store_texts)
+    records = [
+        SearchResultRecord(
+            url=hit["url"], title=hit.get("title", ""), score=hit.get("score", 0.0), content_key=key
+        )
+        for hit, key in zip(top, keys)
+    ]
 
     # Return the search results
     return {
-        "search_results": [results]
+        "search_results": records,
+        "tavily_credits_used": TAVILY_CREDIT_COSTS["search"] * requests,
     }
 
 
-async def continue_to_extract(state: State):
-    """Continue to the extract node."""
-    return [Send("crawl_and_extract", {"search_result": s}) for s in state.search_results]
+def collect_search_results(state: State) -> Dict[str, Any]:
+    """Wait for every search of the round, so its results are dispatched together."""
+    return {}
 
 
-async def crawl_and_extract(state: ResultState):
-    """Crawl and extract the information from the search results."""
-    # Get the client
-    tavily = TavilyClient()
+async def continue_to_extract(
+    state: State, config: RunnableConfig
+) -> Union[List[Send], Literal["enrich_contacts"]]:
+    """Continue to the extract node, degrading extraction as the budget is consumed.
+
+    Hits are deduplicated by canonical URL. A round with nothing new to
+    extract, or no budget left to extract it, goes straight to contact
+    enrichment and ranking.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    extract_depth, per_result = _extraction_plan(configuration, state)
+    seen = {canonical_url(url) for url in state.extracted_urls}
+    results = []
+    for record in state.search_results:
+        key = canonical_url(record.url)
+        if key not in seen:
+            seen.add(key)
+            results.append(record)
+    allowed = configuration.budget.max_fanout(len(results), state, per_result)
+    if not allowed:
+        return "enrich_contacts"
+    node = (
+        "remote_extract"
+        if configuration.distributed_extract and configuration.job_broker_url
+        else "crawl_and_extract"
+    )
+    return [
+        Send(
+            node,
+            {"search_result": s, "extract_depth": extract_depth},
+        )
+        for s in results[:allowed]
+    ]
+
+
+async def crawl_and_extract(state: ResultState, config: RunnableConfig):
+    """Crawl and extract the information from the search results.
+
+    Each field of the supplier records its source (see provenance.py). A supplier
+    already extracted from the same URL is reused, and only its stale fields are
+    fetched again: stale contact details are looked up without re-extracting the
+    page, and a re-extraction keeps the cached fields that are still fresh.
+
+    An email that is not on the page is left for `enrich_contacts` to look for
+    on the supplier's own site.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    extract_depth = state.get("extract_depth", "advanced")
+    credits_used = 0
+    tokens_used = 0
 
     # Get the URL from the search result
-    url = state["search_result"]["results"][0].get("url", None)
+    url = state["search_result"].url
+
+    # Check which fields of a previously extracted supplier need fetching again
+    field_cache = get_field_cache(configuration.cache_dir)
+    cached = None
+    stale: List[str] = list(FIELD_PATHS)
+    if configuration.field_cache_ttl_hours > 0:
+        cached = await asyncio.to_thread(field_cache.get, url)
+        if cached:
+            stale = stale_fields(
+                cached,
+                configuration.field_cache_ttl_hours * 3600,
+                configuration.missing_field_ttl_hours * 3600,
+            )
 
-    if url is None:
-        return {"suppliers": []}
-    
-    # Check if this is a supplier directory or business website
-    website_type = check_for_business_website(url)
-    # print(f"Processing URL: {url} (Type: {website_type})")
-    
-    # Extract content from URL using asyncio.to_thread for blocking API call
-    extracted_info = await asyncio.to_thread(
-        lambda: tavily.extract(url, extract_depth="advanced")
-    )
+    page = None
+    if cached and set(stale) <= set(CONTACT_FIELDS):
+        # Only contact details are stale: look them up again without re-extracting the page
+        response = cached
+        for path in stale:
+            set_field(response, path, None)
+            response.provenance.pop(path, None)
+    else:
+        # Fetch content from URL, escalating to Tavily and advanced depth only when needed
+        page = await fetch_page(
+            url, configuration, extract_depth, search_content_key=state["search_result"].content_key
+        )
+        credits_used += page.credits_used
+
+        # Get the raw content from the extraction
+        content = page.content
+        if not content:
+            logger.error("Could not extract content from %s", url)
+            return {"suppliers": [], "tavily_credits_used": credits_used}
+
+        # Extract structured supplier information (large pages in chunks), escalating to the main model if the extractor falls short
+        response, extract_tokens = await extract_supplier_chunked(content, configuration)
+        tokens_used += extract_tokens
+        if response is None:
+            logger.error("Could not parse supplier from %s", url)
+            return {"suppliers": [], "tavily_credits_used": credits_used, "tokens_used": tokens_used}
+        record_fields(response, url, "llm", page.fetched_at)
+        if cached:
+            merge_supplier(response, cached, [p for p in FIELD_PATHS if p not in stale])
+
+    contact = response.contact_details
+    # A cached empty email that is not yet stale was looked for recently; don't look again
+    email_stale = "contact_details.email" in stale
+
+    # The page may already carry an address the model missed; scan it off the event loop
+    if contact.email is None and email_stale and page is not None:
+        if page.content_key:
+            pool = get_cpu_pool(configuration.cpu_workers, configuration.cpu_queue_size)
+            found = await pool.run(
+                scan_contacts_blob,
+                configuration.cache_dir,
+                configuration.blob_store_max_mb * 1024 * 1024,
+                page.content_key,
+            )
+        else:
+            found = find_contacts(page.content)
+        source = FieldSource(url=url, fetched_at=page.fetched_at, method="regex")
+        if found["email"]:
+            set_field(response, "contact_details.email", found["email"], source)
+        if found["phone"] and not contact.phone:
+            set_field(response, "contact_details.phone", found["phone"], source)
+    if contact.email is None and email_stale:
+        # Not on this page; marks the email as not looked for yet (see needs_contact_lookup)
+        response.provenance.pop("contact_details.email", None)
+
+    response.source_url = url
+    if configuration.field_cache_ttl_hours > 0 and (stale or not cached):
+        await asyncio.to_thread(field_cache.put, url, response)
+    exported = []
+    if configuration.export_jsonl_path and not needs_contact_lookup(response):
+        # Stream each supplier to disk as soon as it is complete; the rest follow contact enrichment
+        await asyncio.to_thread(append_jsonl, configuration.export_jsonl_path, [response])
+        exported.append(url)
 
-    # Get the raw content from the extraction
-    try:
-        content = extracted_info.get("results")[0]["raw_content"]
-    except (KeyError, IndexError, TypeError):
-        print(f"Error: Could not extract content from {url}")
+    # Return the extracted supplier information
+    return {
+        "suppliers": [response],
+        "exported_urls": exported,
+        "tavily_credits_used": credits_used,
+        "tokens_used": tokens_used,
+    }
+
+
+async def remote_extract(state: ResultState, config: RunnableConfig):
+    """Hand a search result to the queue workers and wait for their extracted suppliers."""
+    configuration = Configuration.from_runnable_config(config)
+    broker = get_broker(configuration.job_broker_url, configuration.job_result_ttl_hours * 3600)
+    record = state["search_result"]
+    key = extract_task_key(record.url)
+
+    # Tasks are keyed by canonical URL, so a page already queued by another run is not queued again
+    enqueued = await broker.enqueue(
+        EXTRACT_QUEUE,
+        key,
+        {
+            "search_result": asdict(record),
+            "extract_depth": state.get("extract_depth", "advanced"),
+            "configurable": asdict(configuration),
+        },
+    )
+    results = await wait_for_results(
+        broker, [key], timeout=configuration.remote_task_timeout_seconds
+    )
+    if key not in results:
+        logger.error("Timed out waiting for extraction of %s", record.url)
         return {"suppliers": []}
 
-    # Initialize the model
-    raw_model = init_model()
-    structured_model = raw_model.with_structured_output(Supplier)
-    
-    # Extract structured supplier information
-    response = await structured_model.ainvoke(content)
-    
-    # If email is missing, try to crawl for it
-    if response.contact_details.email is None:
+    result = results[key]
+    if "error" in result:
+        logger.error("Extraction of %s failed on a worker: %s", record.url, result["error"])
+        return {"suppliers": []}
+    update = {
+        "suppliers": [Supplier.model_validate(s) for s in result.get("suppliers", [])],
+        "exported_urls": result.get("exported_urls", []),
+    }
+    # Only charge this run for work it queued itself
+    if enqueued:
+        update["tokens_used"] = result.get("tokens_used", 0)
+        update["tavily_credits_used"] = result.get("tavily_credits_used", 0)
+    return update
+
+
+def _streamed_queries(message: AIMessageChunk) -> List[str]:
+    """Return the queries parsed so far from a streamed `Queries` tool call."""
+    for call in message.tool_calls:
+        queries = call["args"].get("queries")
+        if isinstance(queries, list):
+            return [q for q in queries if isinstance(q, str) and q]
+    return []
+
+
+async def pipelined_research(state: State, config: RunnableConfig):
+    """Generate queries, search and extract as one overlapping pipeline.
+
+    The query list is parsed from the model's tool call as it streams, and each
+    query is searched as soon as the model moves on to the next one. Each
+    search's hits go to extraction as soon as that search returns, so the first
+    extractions overlap with query generation and the remaining searches.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    budget = configuration.budget
+    started_at = state.started_at or time.time()
+    extract = (
+        remote_extract
+        if configuration.distributed_extract and configuration.job_broker_url
+        else crawl_and_extract
+    )
+    extract_slots = asyncio.Semaphore(configuration.scrape_concurrency)
+    query_limit = _query_limit(state, configuration)
+
+    queries: List[str] = []
+    records: List[SearchResultRecord] = []
+    suppliers: List[Supplier] = []
+    exported_urls: List[str] = []
+    seen_urls = {r.url for r in state.search_results}
+    used = {"tokens_used": 0, "tavily_credits_used": 0}
+    # Estimated credits of searches and extractions still in flight
+    reserved = 0
+    tasks: List[asyncio.Task] = []
+
+    def usage() -> State:
+        return replace(
+            state,
+            tokens_used=state.tokens_used + used["tokens_used"],
+            tavily_credits_used=state.tavily_credits_used + used["tavily_credits_used"] + reserved,
+            started_at=started_at,
+        )
+
+    def charge(update: Dict[str, Any]) -> None:
+        used["tokens_used"] += update.get("tokens_used", 0)
+        used["tavily_credits_used"] += update.get("tavily_credits_used", 0)
+
+    async def run_extract(record: SearchResultRecord, depth: str, cost: int) -> None:
+        nonlocal reserved
+        try:
+            async with extract_slots:
+                update = await extract(
+                    {"search_result": record, "extract_depth": depth},
+                    config,
+                )
+        except Exception as e:
+            logger.error("Error extracting %s: %s", record.url, e)
+            return
+        finally:
+            reserved -= cost
+        suppliers.extend(update.get("suppliers", []))
+        exported_urls.extend(update.get("exported_urls", []))
+        charge(update)
+
+    async def run_search(query: str) -> None:
+        nonlocal reserved
         try:
-            # Use asyncio.to_thread for crawling (blocking operation)
+            update = await search_node({"query": query}, config)
+        except Exception as e:
+            logger.error("Error searching for %r: %s", query, e)
+            return
+        finally:
+            reserved -= TAVILY_CREDIT_COSTS["search"]
+        charge(update)
+        for record in update["search_results"]:
+            if record.url in seen_urls:
+                continue
+            depth, cost = _extraction_plan(configuration, usage())
+            if budget.max_fanout(1, usage(), cost) < 1:
+                break
+            seen_urls.add(record.url)
+            records.append(record)
+            reserved += cost
+            spawn(run_extract(record, depth, cost))
+
+    def spawn(coro: Any) -> None:
+        tasks.append(asyncio.create_task(coro))
+
+    def dispatch(query: str) -> bool:
+        nonlocal reserved
+        per_query = TAVILY_CREDIT_COSTS["search"] + configuration.results_per_query * extract_cost(
+            budget.extract_depth(usage())
+        )
+        if query in queries or query in state.searched_queries:
+            return False
+        if len(queries) == query_limit or budget.max_fanout(1, usage(), per_query) < 1:
+            return False
+        queries.append(query)
+        reserved += TAVILY_CREDIT_COSTS["search"]
+        spawn(run_search(query))
+        return True
+
+    # Stream the query list, dispatching each query once the model has moved past it
+    model = init_model(config, role="planner").bind_tools([Queries], tool_choice="Queries")
+    message: Optional[AIMessageChunk] = None
+    dispatched = 0
+    try:
+        async for chunk in model.astream(_query_messages(state, configuration)):
+            message = chunk if message is None else message + chunk
+            streamed = _streamed_queries(message)
+            while dispatched < len(streamed) - 1:
+                dispatch(streamed[dispatched])
+                dispatched += 1
+        if message is not None:
+            used["tokens_used"] += usage_tokens(message)
+            streamed = _streamed_queries(message)
+            while dispatched < len(streamed):
+                dispatch(streamed[dispatched])
+                dispatched += 1
+
+        # Searches add extractions as they finish, so wait until nothing is left in flight
+        while pending := [t for t in tasks if not t.done()]:
+            await asyncio.wait(pending)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return {
+        "queries": queries,
+        "searched_queries": queries,
+        "search_rounds": 1,
+        "search_results": records,
+        "suppliers": suppliers,
+        "exported_urls": exported_urls,
+        "started_at": started_at,
+        **used,
+    }
+
+
+async def _look_up_contacts(
+    supplier: Supplier, configuration: Configuration, extract_depth: str
+) -> Tuple[Supplier, int, int]:
+    """Look for a supplier's missing email on its own site.
+
+    Returns:
+        An updated copy of the supplier, with found contact details merged into
+        its empty fields, and the Tavily credits and tokens used.
+    """
+    supplier = supplier.model_copy(deep=True)
+    credits_used = 0
+    tokens_used = 0
+
+    # Prefer the supplier's own site over the directory page it was found on
+    website = supplier.contact_details.website or ""
+    start_url = supplier.source_url or website
+    if website.startswith("http") and check_for_business_website(website) == "business_website":
+        start_url = website
+    # A directory's own contact and about pages list the directory's details, not the supplier's
+    on_directory = is_directory_site(start_url)
+
+    if configuration.email_crawl_engine == "local":
+        crawled = await find_contact_details(
+            start_url,
+            get_configured_fetcher(configuration),
+            max_pages=1 if on_directory else configuration.crawl_max_pages,
+            time_budget=configuration.crawl_time_budget_seconds,
+        )
+        source = FieldSource(url=crawled.source_url or start_url, fetched_at=time.time(), method="parser")
+        contact = ContactDetails(email=crawled.email, phone=crawled.phone)
+    else:
+        crawled_url = start_url
+        if not on_directory:
+            from tavily import TavilyClient
+
             crawled_response = await asyncio.to_thread(
-                lambda: tavily.crawl(url, instructions="Extract the email address of the supplier")
+                TavilyClient().crawl, start_url, instructions="Extract the email address of the supplier"
             )
-            # Get new URL from crawled response
+            credits_used += TAVILY_CREDIT_COSTS["crawl"]
             crawled_url = crawled_response.get("results")[0]["url"]
-            
-            # Extract content from new URL
-            crawled_extracted_info = await asyncio.to_thread(
-                lambda: tavily.extract(crawled_url, extract_depth="advanced")
-            )
-            
-            # Process content from crawled URL
-            crawled_content = crawled_extracted_info.get("results")[0]["raw_content"]
-            
-            # Get updated structured information
-            response = await structured_model.ainvoke(crawled_content)
-        except Exception as e:
-            print(f"Error during crawling for email: {str(e)}")
+        page = await fetch_page(crawled_url, configuration, extract_depth)
+        credits_used += page.credits_used
+        if not page.content:
+            raise ValueError(f"No content extracted from {crawled_url}")
+
+        # A regex scan usually finds the address; the model is only asked when it does not
+        found = find_contacts(page.content)
+        contact = ContactDetails(email=found["email"], phone=found["phone"])
+        method = "regex"
+        if not contact.email:
+            extracted, tokens_used = await extract_contact_details(page.content, supplier.name, configuration)
+            if extracted is not None:
+                contact = extracted.model_copy(update={"phone": extracted.phone or contact.phone})
+                method = "llm"
+        source = FieldSource(url=crawled_url, fetched_at=page.fetched_at, method=method)
+
+    if on_directory and contact.email and is_directory_site(contact.email.rpartition("@")[2]):
+        # The listing page's own footer address belongs to the directory
+        contact = contact.model_copy(update={"email": None})
+    merge_contact_details(supplier, contact, source)
+    # Recorded even when nothing was found, so the lookup is not repeated until it goes stale
+    supplier.provenance.setdefault("contact_details.email", source)
+    return supplier, credits_used, tokens_used
+
+
+async def enrich_contacts(state: State, config: RunnableConfig):
+    """Look for the missing emails of all extracted suppliers as one concurrent batch.
+
+    Runs once the primary extractions are done. Only contact details are
+    looked up, and they fill the empty fields of each supplier rather than
+    replacing it. The whole batch is skipped once the budget rules out the
+    email crawl.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    budget = configuration.budget
+    pending = [s for s in state.suppliers if s.source_url and needs_contact_lookup(s)]
+    if not pending:
+        return {}
+
+    extract_depth = budget.extract_depth(state)
+    allowed = 0
+    if budget.allow_email_crawl(state):
+        allowed = len(pending)
+        if configuration.email_crawl_engine == "tavily":
+            per_supplier = TAVILY_CREDIT_COSTS["crawl"] + extract_cost(extract_depth)
+            allowed = budget.max_fanout(len(pending), state, per_supplier)
+    slots = asyncio.Semaphore(configuration.scrape_concurrency)
+
+    async def look_up(supplier: Supplier) -> Tuple[Supplier, int, int]:
+        async with slots:
+            try:
+                return await _look_up_contacts(supplier, configuration, extract_depth)
+            except Exception as e:
+                logger.error("Error looking up contact details for %s: %s", supplier.source_url, e)
+                return supplier, 0, 0
+
+    results = await asyncio.gather(*(look_up(s) for s in pending[:allowed]))
+    enriched = [supplier for supplier, _, _ in results]
+
+    if configuration.field_cache_ttl_hours > 0:
+        field_cache = get_field_cache(configuration.cache_dir)
+        await asyncio.gather(
+            *(asyncio.to_thread(field_cache.put, s.source_url, s) for s in enriched)
+        )
+    # Suppliers left pending by the budget stay pending in later rounds; write each row once
+    exported = set(state.exported_urls)
+    rows = [s for s in enriched + pending[allowed:] if s.source_url not in exported]
+    if configuration.export_jsonl_path and rows:
+        await asyncio.to_thread(append_jsonl, configuration.export_jsonl_path, rows)
 
-    # Return the extracted supplier information
     return {
-        "suppliers": [response]
+        "suppliers": enriched,
+        "exported_urls": [s.source_url for s in rows] if configuration.export_jsonl_path else [],
+        "tavily_credits_used": sum(credits for _, credits, _ in results),
+        "tokens_used": sum(tokens for _, _, tokens in results),
     }
 
 
+def route_search(state: State, config: RunnableConfig) -> Literal["call_agent_model", "pipelined_research"]:
+    """Run the stages one after another, or overlapped when pipelining is configured."""
+    configuration = Configuration.from_runnable_config(config)
+    return "pipelined_research" if configuration.pipelined else "call_agent_model"
+
+
+def route_start(
+    state: State, config: RunnableConfig
+) -> Literal["plan_facets", "call_agent_model", "pipelined_research"]:
+    """Plan the facets first when the coverage planner is configured, then start searching."""
+    configuration = Configuration.from_runnable_config(config)
+    if configuration.query_planner == "coverage" and not state.facets:
+        return "plan_facets"
+    return route_search(state, config)
+
+
+def continue_searching(
+    state: State, config: RunnableConfig
+) -> Literal["call_agent_model", "pipelined_research", "__end__"]:
+    """Search another round while facets are short of suppliers and rounds and budget remain."""
+    configuration = Configuration.from_runnable_config(config)
+    if not _follow_up_facets(state, configuration):
+        return "__end__"
+    if state.search_rounds >= configuration.max_search_rounds:
+        return "__end__"
+    per_query = TAVILY_CREDIT_COSTS["search"] + configuration.results_per_query * extract_cost(
+        configuration.budget.extract_depth(state)
+    )
+    if configuration.budget.max_fanout(1, state, per_query) < 1:
+        return "__end__"
+    return route_search(state, config)
+
+
+async def rank_candidates(state: State, config: RunnableConfig):
+    """Deduplicate the extracted suppliers and rank them against the procurement requirement."""
+    configuration = Configuration.from_runnable_config(config)
+    # Dedup and scoring are CPU work; run them in the pool when one is configured
+    pool = get_cpu_pool(configuration.cpu_workers, configuration.cpu_queue_size)
+    ranked = await pool.run(
+        rank_suppliers, [s.model_dump() for s in state.suppliers], state.procurement_requirement
+    )
+    if configuration.export_path:
+        await asyncio.to_thread(export_suppliers, ranked, configuration.export_path)
+    return {"ranked_suppliers": ranked}
+
 
 # Create the graph
-workflow = StateGraph(State, input=InputState, output=OutputState, config_schema=Configuration)
+workflow = StateGraph(State, input=InputState, output=SearchOutputState, config_schema=Configuration)
 
+workflow.add_node(plan_facets)
 workflow.add_node(call_agent_model)
 workflow.add_node(search_node)
+workflow.add_node(collect_search_results)
 workflow.add_node(crawl_and_extract)
-workflow.add_edge("__start__", "call_agent_model")
+workflow.add_node(remote_extract)
+workflow.add_node(pipelined_research)
+workflow.add_node(enrich_contacts)
+workflow.add_node(rank_candidates)
+workflow.add_conditional_edges("__start__", route_start)
+workflow.add_conditional_edges("plan_facets", route_search)
 workflow.add_conditional_edges("call_agent_model", continue_to_search)
-workflow.add_conditional_edges("search_node", continue_to_extract)   
-workflow.add_edge("crawl_and_extract", "__end__")
+workflow.add_edge("search_node", "collect_search_results")
+workflow.add_conditional_edges("collect_search_results", continue_to_extract)
+workflow.add_edge("crawl_and_extract", "enrich_contacts")
+workflow.add_edge("remote_extract", "enrich_contacts")
+workflow.add_edge("pipelined_research", "enrich_contacts")
+workflow.add_edge("enrich_contacts", "rank_candidates")
+workflow.add_conditional_edges("rank_candidates", continue_searching)
+
+
+
+@functools.cache
+def get_graph() -> CompiledStateGraph:
+    """Compile the graph on first use and return the shared instance."""
+    compiled = workflow.compile()
+    compiled.name = "search-graph"
+    return compiled
 
-graph = workflow.compile()
+
+def __getattr__(name: str) -> Any:
+    # `graph` (the langgraph.json entry point) is compiled when first looked up
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    
-    asyncio.run(graph.ainvoke({
+    example_input = {
         "company_name": "InnoMed Devices", 
         "company_info": """Industry: Medical Device Manufacturing
 
@@ -180,11 +793,23 @@ if __name__ == "__main__":
 
                                 Annual Revenue: ₹18 crore""", 
         "procurement_requirement": "InnoMed needs to source medical-grade polymers and electronic components for their new line of portable diagnostic devices. They require suppliers who can provide materials that meet ISO 13485 and FDA compliance standards, with complete traceability documentation. The initial order will be for components to produce 10,000 units with potential for ongoing supply relationship."
-    }))
-
-graph.name = "search-graph"
-
-    
-
-
+    }
 
+    async def main() -> None:
+        """Run the example, resumably when given a thread id."""
+        try:
+            if len(sys.argv) > 1:
+                # Given a thread id, checkpoint the run locally; rerunning with the same id
+                # resumes it and only executes the branches that had not completed
+                await run_resumable(
+                    workflow,
+                    example_input,
+                    thread_id=sys.argv[1],
+                    path=os.path.join(Configuration().cache_dir, "checkpoints.sqlite"),
+                )
+            else:
+                await get_graph().ainvoke(example_input)
+        finally:
+            await close_fetcher()
+
+    asyncio.run(main())
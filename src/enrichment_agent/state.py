@@ -6,13 +6,32 @@ data model used internally by the graph.
 
 import operator
 from dataclasses import dataclass, field
-from typing import Annotated, Any, Dict, List, Optional
-from pydantic import BaseModel
+from typing import Annotated, Any, Dict, List, Literal, Optional
+
 from langchain_core.messages import BaseMessage
 from langgraph.graph import add_messages
+from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
+
+from enrichment_agent.ranking import SupplierScore
+
+
+@dataclass(frozen=True, slots=True)
+class SearchResultRecord:
+    """Compact record of a single search hit.
+
+    Holds only what downstream nodes need; the snippet text lives in the blob
+    store under `content_key` so records stay small in state, `Send` payloads
+    and checkpoints.
+    """
+    url: str
+    title: str = ""
+    score: float = 0.0
+    content_key: Optional[str] = None
+
 
-def add_results(existing_results: List[Dict[str, Any]], new_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Custom reducer for search results that only appends unique results based on URL.
+def add_results(existing_results: List[SearchResultRecord], new_results: List[SearchResultRecord]) -> List[SearchResultRecord]:
+    """Append only the search results whose URL is not already in the list.
     
     Args:
         existing_results: The existing list of search results
@@ -25,19 +44,47 @@ def add_results(existing_results: List[Dict[str, Any]], new_results: List[Dict[s
         return existing_results
 
     # Create a set of existing URLs for faster lookup
-    existing_urls = {result.get("url", "") for result in existing_results}
+    existing_urls = {result.url for result in existing_results}
     
 
     # Only append results with URLs not already in the existing results
     result = existing_results.copy()
     for item in new_results:
-        url = item.get("url", "")
-        if url and url not in existing_urls:
+        if item.url and item.url not in existing_urls:
             result.append(item)
-            existing_urls.add(url)
+            existing_urls.add(item.url)
     
     return result
 
+
+def add_suppliers(existing: List["Supplier"], new: List["Supplier"]) -> List["Supplier"]:
+    """Add suppliers, replacing an existing supplier from the same source URL.
+
+    Lets a later stage (such as contact enrichment) return an updated copy of a
+    supplier instead of appending a second one.
+
+    Args:
+        existing: The existing list of suppliers
+        new: The new list of suppliers to add
+
+    Returns:
+        A new list with updated suppliers in place and other new suppliers appended
+    """
+    if not new:
+        return existing
+
+    result = existing.copy()
+    positions = {s.source_url: i for i, s in enumerate(result) if s.source_url}
+    for item in new:
+        i = positions.get(item.source_url) if item.source_url else None
+        if i is None:
+            if item.source_url:
+                positions[item.source_url] = len(result)
+            result.append(item)
+        else:
+            result[i] = item
+    return result
+
 @dataclass(kw_only=True)
 class InputState:
     """Input state defines the interface between the graph and the user (external API)."""
@@ -45,20 +92,43 @@ class InputState:
     company_info: str
     procurement_requirement: str
 
-@dataclass(kw_only=True)
 class ContactDetails(BaseModel):
+    """How to reach a supplier."""
     email: Optional[str] = None
     phone: Optional[str] = None
     website: Optional[str] = None
     address: Optional[str] = None
 
-@dataclass(kw_only=True)
+class FieldSource(BaseModel):
+    """Where the value of a supplier field came from."""
+    url: str
+    fetched_at: float
+    method: Literal["llm", "regex", "parser"]
+
 class Supplier(BaseModel):
+    """A supplier extracted from a web page."""
     name: str
     description: str
     standards_compliance: str
     certifications: str
-    contact_details: ContactDetails = field(default_factory=ContactDetails)
+    contact_details: ContactDetails = Field(default_factory=ContactDetails)
+    # Set by the agent after extraction, so hidden from the model's schema
+    source_url: SkipJsonSchema[Optional[str]] = None
+    # Source of each field, keyed by path such as "contact_details.email"
+    provenance: SkipJsonSchema[Dict[str, FieldSource]] = Field(default_factory=dict)
+
+
+
+class Facet(BaseModel):
+    """A sub-requirement the suppliers found should cover."""
+    name: str = Field(description="A short name, e.g. 'medical-grade polymers' or 'electronic components'.")
+    keywords: List[str] = Field(
+        description="Terms whose presence in a supplier's description or certifications shows it covers this facet."
+    )
+
+class SearchPlan(BaseModel):
+    """The facets of a procurement requirement."""
+    facets: List[Facet]
 
 
 
@@ -109,16 +179,38 @@ class State(InputState):
 
     queries: Optional[List[str]] = field(default=None) 
 
-    search_results: Annotated[List[Dict[str, Any]], operator.add] = field(default_factory=list)
+    # Every query searched so far, across rounds of the coverage planner
+    searched_queries: Annotated[List[str], operator.add] = field(default_factory=list)
+
+    # Sub-requirements tracked by the coverage planner, and the rounds searched so far
+    facets: List[Facet] = field(default_factory=list)
+    search_rounds: Annotated[int, operator.add] = field(default=0)
+
+    # URLs of search results already sent to extraction in earlier rounds
+    extracted_urls: List[str] = field(default_factory=list)
+
+    search_results: Annotated[List[SearchResultRecord], add_results] = field(default_factory=list)
+
+    suppliers: Annotated[List[Supplier], add_suppliers] = field(default_factory=list)
+
+    # Source URLs of suppliers already appended to Configuration.export_jsonl_path
+    exported_urls: Annotated[List[str], operator.add] = field(default_factory=list)
 
-    suppliers: Annotated[List[Supplier], operator.add] = field(default_factory=list)
+    # Deduplicated suppliers scored against the procurement requirement, best first
+    ranked_suppliers: List[SupplierScore] = field(default_factory=list)
+
+    # Usage counters checked against Configuration.budget; parallel branches add to them
+    tokens_used: Annotated[int, operator.add] = field(default=0)
+    tavily_credits_used: Annotated[int, operator.add] = field(default=0)
+    started_at: Optional[float] = field(default=None)
     # Feel free to add additional attributes to your state as needed.
     # Common examples include retrieved documents, extracted entities, API connections, etc.
 
 @dataclass(kw_only=True)
 class ResultState(BaseModel):
     """A search result."""
-    search_result: Dict[str, Any]
+    search_result: SearchResultRecord
+    extract_depth: str = "advanced"
 
 @dataclass(kw_only=True)
 class Queries(BaseModel):
@@ -127,7 +219,7 @@ class Queries(BaseModel):
 
 @dataclass(kw_only=True)
 class SearchState(BaseModel):
-    """A search query"""
+    """A search query."""
     query: str
 
 
@@ -146,3 +238,23 @@ class OutputState:
     based on the user's query and the graph's execution.
     This is the primary output of the enrichment process.
     """
+
+
+class SearchOutputState:
+    """The response object of the supplier search graph.
+
+    The search graph reports the suppliers it found rather than a single
+    `info` dict.
+    """
+
+    suppliers: List[Supplier]
+    """Every supplier extracted during the run, with its contact details enriched."""
+
+    ranked_suppliers: List[SupplierScore]
+    """The deduplicated suppliers scored against the procurement requirement, best first."""
+
+    tokens_used: int
+    """LLM tokens spent by the run."""
+
+    tavily_credits_used: int
+    """Tavily credits spent by the run."""
@@ -5,43 +5,60 @@ These tools can be used for tasks such as web searching and scraping.
 Users can edit and extend these tools as needed.
 """
 
+import asyncio
 import json
-from typing import Any, Dict, Optional, cast
+from typing import Any, Dict, List, Optional, Tuple
 
-import aiohttp
-from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.messages import ToolMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_core.tools import InjectedToolArg
+from langchain_core.tools import InjectedToolArg, InjectedToolCallId
 from langgraph.prebuilt import InjectedState
+from langgraph.types import Command
 from typing_extensions import Annotated
-from tavily import TavilyClient
-import asyncio
 
-from enrichment_agent.schema import schema
+from enrichment_agent.budget import TAVILY_CREDIT_COSTS, UsageSnapshot
 from enrichment_agent.configuration import Configuration
-from enrichment_agent.state import State, Supplier
-from enrichment_agent.utils import init_model, check_for_business_website
+from enrichment_agent.extraction import Depth, fetch_page
+from enrichment_agent.schema import schema
+from enrichment_agent.utils import extract_supplier
+
+
+def _tool_result(
+    name: str, tool_call_id: str, content: Any, tokens_used: int = 0, tavily_credits_used: int = 0
+) -> Command[Any]:
+    """Return a tool's result message together with the usage it adds to the run's budget."""
+    return Command(
+        update={
+            "messages": [
+                ToolMessage(
+                    content=json.dumps(content, ensure_ascii=False),
+                    name=name,
+                    tool_call_id=tool_call_id,
+                )
+            ],
+            "tokens_used": tokens_used,
+            "tavily_credits_used": tavily_credits_used,
+        }
+    )
 
 
 async def search(
-    query: str, *, config: Annotated[RunnableConfig, InjectedToolArg]
-) -> Optional[list[dict[str, Any]]]:
+    query: str,
+    *,
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    config: Annotated[RunnableConfig, InjectedToolArg],
+) -> Command[Any]:
     """Query a search engine.
 
     This function queries the web to fetch comprehensive, accurate, and trusted results. It's particularly useful
     for answering questions about current events. Provide as much context in the query as needed to ensure high recall.
     """
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
     configuration = Configuration.from_runnable_config(config)
     wrapped = TavilySearchResults(max_results=configuration.max_search_results)
     result = await wrapped.ainvoke({"query": query})
-    return cast(list[dict[str, Any]], result)
-
-
-async def _extract_url_async(url: str, extract_depth: str = "advanced") -> Dict[str, Any]:
-    """Asynchronous wrapper for TavilyClient.extract."""
-    return await asyncio.to_thread(
-        lambda: TavilyClient().extract(url, extract_depth=extract_depth)
-    )
+    return _tool_result("search", tool_call_id, result, tavily_credits_used=TAVILY_CREDIT_COSTS["search"])
 
 
 _INFO_PROMPT = """You are doing web research on behalf of a user. You are trying to find out this information:
@@ -65,63 +82,114 @@ Based on the website content below, extract the suppliers information including:
 
 Format the contact details as a structured object with email, phone, website, and address fields."""
 
-# async def scrape_contact_details(supplier: Supplier) -> ContactDetails:
-#     """Scrape the contact details of a supplier."""
+async def _scrape_one(
+    url: str,
+    semaphore: asyncio.Semaphore,
+    extract_depth: Depth,
+    configuration: Configuration,
+) -> Tuple[Dict[str, Any], int, int]:
+    """Fetch a single URL and extract a supplier from it, bounded by `semaphore`.
 
-#     tavily_client = TavilyClient()
-#     result = tavily
+    Returns:
+        The entry for the URL, and the tokens and Tavily credits used.
+    """
+    credits_used = 0
+    async with semaphore:
+        try:
+            page = await fetch_page(url, configuration, extract_depth)
+        except Exception as e:
+            return {"url": url, "error": str(e)}, 0, 0
+        credits_used = page.credits_used
+        content = page.content
+        if not content:
+            return {"url": url, "error": "No content could be extracted"}, 0, credits_used
+
+        p = _INFO_PROMPT.format(
+            info=json.dumps(schema, indent=2),
+            url=url,
+            content=content[: configuration.max_scrape_chars],
+        )
+        try:
+            supplier, tokens_used = await extract_supplier(p, configuration, content)
+        except Exception as e:
+            return {"url": url, "error": str(e)}, 0, credits_used
+        if supplier is None:
+            return {"url": url, "error": "No supplier could be extracted"}, tokens_used, credits_used
+    supplier.source_url = url
+    return {"url": url, "supplier": supplier.model_dump()}, tokens_used, credits_used
+
+
+async def _scrape_all(
+    urls: list[str], usage: UsageSnapshot, configuration: Configuration
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Fetch and extract all URLs concurrently.
 
-        
+    Returns:
+        One entry per URL in input order, and the total tokens and Tavily credits used.
+    """
+    semaphore = asyncio.Semaphore(max(1, configuration.scrape_concurrency))
+    extract_depth = configuration.budget.extract_depth(usage)
+    # gather preserves input order regardless of completion order
+    scraped = await asyncio.gather(
+        *(
+            _scrape_one(url, semaphore, extract_depth, configuration)
+            for url in urls
+        )
+    )
+    return (
+        [entry for entry, _, _ in scraped],
+        sum(tokens for _, tokens, _ in scraped),
+        sum(credits for _, _, credits in scraped),
+    )
+
+
+# Tools are injected with the usage counters they need rather than the whole
+# `State`: an injected value is validated on every call, and the state's
+# messages and search results grow with the run. They return a `Command` so
+# the tokens and credits they spend are added to those counters.
 async def scrape_websites(
     urls: list[str],
     *,
-    state: Annotated[State, InjectedState],
+    tokens_used: Annotated[int, InjectedState("tokens_used")],
+    tavily_credits_used: Annotated[int, InjectedState("tavily_credits_used")],
+    started_at: Annotated[Optional[float], InjectedState("started_at")],
+    tool_call_id: Annotated[str, InjectedToolCallId],
     config: Annotated[RunnableConfig, InjectedToolArg],
-) -> Optional[list[Supplier]]:
+) -> Command[Any]:
     """Scrape and summarize content of all the given URLs.
 
+    All URLs are fetched and extracted concurrently.
+
     Returns:
-        list[Supplier]: A list of supplier information extracted from the scraped content.
+        list[dict]: One entry per URL, in the order given, holding either the extracted
+        "supplier" or an "error" message.
     """
-    suppliers = []
-    urls_to_crawl = []
-    # Create a client session for aiohttp
-    async with aiohttp.ClientSession() as session:
-
-        for url in urls:
-            
-            if check_for_business_website(url) == "supplier_directory":
-                urls_to_crawl.append(url)
-            else:
-                result = await _extract_url_async(url)
-                
-            # Extract content from the first result
-            if result and "results" in result and len(result["results"]) > 0:
-                content = result["results"][0]["raw_content"]
-
-                p = _INFO_PROMPT.format(
-                    info=json.dumps(schema, indent=2),
-                    url=url,
-                    content=content,
-                )
-
-                raw_model = init_model(config)
-                supplier = await raw_model.with_structured_output(Supplier).ainvoke(p)
-
-                suppliers.append(supplier)
+    usage = UsageSnapshot(tokens_used, tavily_credits_used, started_at)
+    results, tokens, credits = await _scrape_all(
+        urls, usage, Configuration.from_runnable_config(config)
+    )
+    return _tool_result("scrape_websites", tool_call_id, results, tokens, credits)
 
-    return suppliers
 
-def scrape_website(
+async def scrape_website(
     urls: list[str],
     *,
-    state: Annotated[State, InjectedState],
+    tokens_used: Annotated[int, InjectedState("tokens_used")],
+    tavily_credits_used: Annotated[int, InjectedState("tavily_credits_used")],
+    started_at: Annotated[Optional[float], InjectedState("started_at")],
+    tool_call_id: Annotated[str, InjectedToolCallId],
     config: Annotated[RunnableConfig, InjectedToolArg],
-) -> Optional[list[Supplier]]:
+) -> Command[Any]:
     """Scrape and summarize content of all the given URLs.
 
+    All URLs are fetched and extracted concurrently; URLs that fail are skipped.
+
     Returns:
         list[Supplier]: A list of supplier information extracted from the scraped content.
     """
-
-    pass
+    usage = UsageSnapshot(tokens_used, tavily_credits_used, started_at)
+    results, tokens, credits = await _scrape_all(
+        urls, usage, Configuration.from_runnable_config(config)
+    )
+    suppliers = [r["supplier"] for r in results if "supplier" in r]
+    return _tool_result("scrape_website", tool_call_id, suppliers, tokens, credits)
@@ -1,29 +1,73 @@
 """Utility functions used in our graph."""
 
-from typing import Literal, Optional
+import json
+from typing import Any, Dict, Literal, Optional, Sequence, Tuple, cast
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-from langchain.chat_models import init_chat_model
 from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import AnyMessage
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 
-from enrichment_agent.configuration import Configuration
-from tavily import TavilyClient
+from enrichment_agent.budget import usage_tokens
+from enrichment_agent.chunking import estimate_tokens, iter_chunks, unfilled_fields
+from enrichment_agent.configuration import Configuration, ModelRole
+from enrichment_agent.contacts import is_directory_site, normalize_name, website_domain
+from enrichment_agent.prompts import CONTACT_PROMPT
+from enrichment_agent.provenance import merge_supplier
+from enrichment_agent.quality import supplier_confidence
+from enrichment_agent.state import ContactDetails, Supplier
 
-from typing import List
+_TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref", "srsltid"}
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so trivially different links to the same page compare equal.
+
+    Lowercases the scheme and host, drops "www.", default ports, fragments,
+    tracking parameters and trailing slashes, and sorts the query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(
+        sorted(
+            (k, v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+        )
+    )
+    path = parts.path.rstrip("/") or "/"
+    # Scheme is folded too: http and https copies of a page are the same task
+    return urlunsplit(("https" if scheme in ("http", "https") else scheme, host, path, query, ""))
 
 
 def check_for_business_website(url: str) -> Literal["business_website", "supplier_directory"]:
     """Check if the given URL is a business website."""
-    supplier_directories = ["indiamart", "tradeindia", "justdial", "yellowpages"]
-    
     # Check if any of the supplier directory names are in the URL
-    if any(directory in url.lower() for directory in supplier_directories):
+    if is_directory_site(url):
         return "supplier_directory"
     else:
         return "business_website"
 
 
+def same_supplier(a: Supplier, b: Supplier) -> bool:
+    """Return whether two extracted suppliers describe the same company.
+
+    They match when their normalized names are equal, or when they share a
+    website domain that is not a supplier directory (directory listings share
+    the directory's domain across many companies).
+    """
+    name = normalize_name(a.name)
+    if name and name == normalize_name(b.name):
+        return True
+    domain = website_domain(a.contact_details.website)
+    return bool(domain) and domain == website_domain(b.contact_details.website) and not is_directory_site(domain)
+
+
 def get_message_text(msg: AnyMessage) -> str:
     """Get the text content of a message."""
     content = msg.content
@@ -36,10 +80,73 @@ def get_message_text(msg: AnyMessage) -> str:
         return "".join(txts).strip()
 
 
-def init_model(config: Optional[RunnableConfig] = None) -> BaseChatModel:
-    """Initialize the configured chat model."""
+def digest_tool_message(msg: ToolMessage, max_chars: int) -> ToolMessage:
+    """Replace a tool message's payload with a compact digest.
+
+    Search results (a JSON list of objects with a "url") are reduced to one
+    "title (url)" line per hit; any other payload is truncated to `max_chars`.
+    The tool call id is preserved so the message still pairs with its AIMessage.
+    """
+    text = get_message_text(msg)
+    if len(text) <= max_chars:
+        return msg
+    digest = None
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        payload = None
+    if isinstance(payload, list) and all(isinstance(p, dict) for p in payload):
+        lines = [
+            f"- {p.get('title') or p.get('name') or ''} ({p.get('url') or p.get('website') or ''})"
+            for p in payload
+        ]
+        digest = "\n".join(lines)
+    if digest is None or len(digest) > max_chars:
+        digest = (digest or text)[:max_chars]
+    return ToolMessage(
+        content=f"[digest of {len(text)} chars already reviewed]\n{digest}",
+        tool_call_id=msg.tool_call_id,
+        name=msg.name,
+        id=msg.id,
+        status=msg.status,
+    )
+
+
+def compact_messages(
+    messages: Sequence[AnyMessage], max_chars: int
+) -> list[AnyMessage]:
+    """Digest every tool message the model has already consumed.
+
+    Tool messages that precede the last AIMessage were part of an earlier
+    model call, so only a digest of them is kept. Tool messages after the last
+    AIMessage are fresh results and are passed through untouched.
+    """
+    last_ai = max(
+        (i for i, m in enumerate(messages) if isinstance(m, AIMessage)), default=-1
+    )
+    return [
+        digest_tool_message(m, max_chars)
+        if i < last_ai and isinstance(m, ToolMessage)
+        else m
+        for i, m in enumerate(messages)
+    ]
+
+
+def prepare_context(
+    messages: Sequence[AnyMessage], config: Optional[RunnableConfig] = None
+) -> list[AnyMessage]:
+    """Return the message history to send to the model for the configured context mode."""
     configuration = Configuration.from_runnable_config(config)
-    fully_specified_name = configuration.model
+    if configuration.context_mode == "compact":
+        return compact_messages(messages, configuration.context_digest_chars)
+    return list(messages)
+
+
+def load_chat_model(fully_specified_name: str) -> BaseChatModel:
+    """Load a chat model from a fully specified name in the form provider/model."""
+    # Imported here: loading the provider integrations dominates import time
+    from langchain.chat_models import init_chat_model
+
     if "/" in fully_specified_name:
         provider, model = fully_specified_name.split("/", maxsplit=1)
     else:
@@ -47,6 +154,121 @@ def init_model(config: Optional[RunnableConfig] = None) -> BaseChatModel:
         model = fully_specified_name
     return init_chat_model(model, model_provider=provider)
 
+
+def init_model(
+    config: Optional[RunnableConfig] = None, role: Optional[ModelRole] = None
+) -> BaseChatModel:
+    """Initialize the chat model configured for `role`, or the default model."""
+    configuration = Configuration.from_runnable_config(config)
+    return load_chat_model(configuration.model_for(role))
+
+
+async def extract_supplier(
+    prompt: str, configuration: Configuration, content: Optional[str] = None
+) -> Tuple[Optional[Supplier], int]:
+    """Extract a supplier with the extractor model, escalating to the default model if needed.
+
+    The extractor model's output is retried on `Configuration.model` when it
+    fails `Supplier` validation or its confidence against the page `content`
+    is below `min_extraction_confidence`. Escalation is skipped when both
+    roles use the same model.
+
+    Returns:
+        The most confident supplier (or None if no model produced a valid one)
+        and the tokens used.
+    """
+    names = [configuration.model_for("extractor")]
+    if configuration.extraction_escalation and configuration.model not in names:
+        names.append(configuration.model)
+
+    best: Optional[Supplier] = None
+    best_confidence = -1.0
+    tokens_used = 0
+    for name in names:
+        model = load_chat_model(name).with_structured_output(Supplier, include_raw=True)
+        result = cast(Dict[str, Any], await model.ainvoke(prompt))
+        tokens_used += usage_tokens(result["raw"])
+        supplier = cast(Optional[Supplier], result["parsed"])
+        if supplier is None:
+            continue
+        confidence = supplier_confidence(supplier, content if content is not None else prompt)
+        if confidence > best_confidence:
+            best, best_confidence = supplier, confidence
+        if confidence >= configuration.min_extraction_confidence:
+            break
+    return best, tokens_used
+
+
+async def extract_supplier_chunked(
+    content: str, configuration: Configuration
+) -> Tuple[Optional[Supplier], int]:
+    """Extract a supplier from page content, chunk by chunk when the page is large.
+
+    Content within `extraction_chunk_tokens` is extracted in one call. Longer
+    content is split into chunks of that size and each is extracted with
+    `extract_supplier`. The first supplier found is the page's supplier; a
+    later chunk fills its empty fields only when it found the same company
+    (see `same_supplier`), so other companies listed on a catalogue or
+    directory page are not merged into it. Extraction stops once the
+    required fields are filled or after `max_extraction_chunks` chunks.
+
+    Returns:
+        The page's supplier (or None if no chunk produced one) and the tokens used.
+    """
+    if estimate_tokens(content) <= configuration.extraction_chunk_tokens:
+        return await extract_supplier(content, configuration)
+
+    merged: Optional[Supplier] = None
+    tokens_used = 0
+    chunks = iter_chunks(content, configuration.extraction_chunk_tokens)
+    for _, chunk in zip(range(configuration.max_extraction_chunks), chunks):
+        supplier, chunk_tokens = await extract_supplier(chunk, configuration)
+        tokens_used += chunk_tokens
+        if supplier is None:
+            pass
+        elif merged is None:
+            merged = supplier
+        elif same_supplier(merged, supplier):
+            merge_supplier(merged, supplier)
+        if merged is not None and not unfilled_fields(merged):
+            break
+    return merged, tokens_used
+
+
+async def extract_contact_details(
+    content: str, supplier_name: str, configuration: Configuration
+) -> Tuple[Optional[ContactDetails], int]:
+    """Extract only the contact details of a known supplier from a page.
+
+    Uses the extractor model with the small `ContactDetails` schema rather than
+    re-extracting a whole `Supplier`. Large pages are sent in chunks of
+    `extraction_chunk_tokens`, stopping at the first chunk with an email.
+
+    Returns:
+        The contact details (or None if the output did not validate) and the tokens used.
+    """
+    model = load_chat_model(configuration.model_for("extractor")).with_structured_output(
+        ContactDetails, include_raw=True
+    )
+    found: Optional[ContactDetails] = None
+    tokens_used = 0
+    # Large pages are read chunk by chunk until an email turns up
+    chunks = iter_chunks(content, configuration.extraction_chunk_tokens)
+    for _, chunk in zip(range(configuration.max_extraction_chunks), chunks):
+        result = cast(
+            Dict[str, Any],
+            await model.ainvoke(CONTACT_PROMPT.format(supplier_name=supplier_name, content=chunk)),
+        )
+        tokens_used += usage_tokens(result["raw"])
+        contact = cast(Optional[ContactDetails], result["parsed"])
+        if contact is not None:
+            found = contact if found is None else found.model_copy(
+                update={k: v for k, v in contact.model_dump().items() if v and not getattr(found, k)}
+            )
+        if found is not None and found.email:
+            break
+    return found, tokens_used
+
 def get_supplier_directory_info(url: str) -> str:
     """Get the supplier directory info from the URL."""
     if "indiamart" in url:
@@ -0,0 +1,218 @@
+"""Queue worker for research runs and extraction tasks.
+
+Run one or more workers per node against a shared broker:
+
+    python -m enrichment_agent.worker sqlite:///.cache/enrichment_agent/jobs.sqlite
+    python -m enrichment_agent.worker redis://queue-host:6379/0 --concurrency 8
+
+Workers pull from two queues:
+
+- "research": a whole search-graph run for one `InputState`, submitted with
+  `submit_research`. The run's suppliers are stored under the job key.
+- "extract": a single `crawl_and_extract` task, enqueued by the search graph
+  when `Configuration.distributed_extract` is on. Its suppliers are stored
+  under the task key and folded back into the originating run's `suppliers`.
+
+Delivery is at-least-once: a job is acknowledged only after its result is
+stored, so a worker that dies mid-job leaves it to be re-delivered. While a
+job runs, its worker extends the lease every third of the visibility timeout,
+so jobs may run longer than the timeout without being handed out twice. A job that
+fails `max_attempts` times stores an error result for the runs waiting on it
+and is then released, so the same work can be queued again later.
+
+Research runs that distribute their extraction wait on "extract" jobs, so
+keep some workers consuming only that queue (`--queues extract`) to make sure
+those jobs never sit behind the runs waiting for them.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from enrichment_agent.fetcher import close_fetcher
+from enrichment_agent.jobqueue import Broker, Job, connect_broker
+from enrichment_agent.utils import canonical_url
+
+logger = logging.getLogger(__name__)
+
+RESEARCH_QUEUE = "research"
+EXTRACT_QUEUE = "extract"
+
+
+def extract_task_key(url: str) -> str:
+    """Return the idempotent key of the extraction task for `url`."""
+    return f"extract:{canonical_url(url)}"
+
+
+def research_job_key(input: Dict[str, Any]) -> str:
+    """Return the idempotent key of a research job for `input`."""
+    digest = hashlib.sha256(json.dumps(input, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"research:{digest}"
+
+
+async def submit_research(
+    broker: Broker,
+    input: Dict[str, Any],
+    *,
+    configurable: Optional[Dict[str, Any]] = None,
+    key: Optional[str] = None,
+) -> str:
+    """Queue a research run and return its job key."""
+    key = key or research_job_key(input)
+    await broker.enqueue(
+        RESEARCH_QUEUE, key, {"input": input, "configurable": configurable or {}}
+    )
+    return key
+
+
+_search_graph: Optional[ModuleType] = None
+
+
+def load_search_graph() -> ModuleType:
+    """Import search-graph.py, whose file name is not a valid module name."""
+    global _search_graph
+    if _search_graph is None:
+        path = Path(__file__).with_name("search-graph.py")
+        spec = importlib.util.spec_from_file_location("enrichment_agent.search_graph", path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Cannot load {path}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        _search_graph = module
+    return _search_graph
+
+
+async def _run_research(payload: Dict[str, Any]) -> Dict[str, Any]:
+    module = load_search_graph()
+    values = await module.graph.ainvoke(
+        payload["input"], {"configurable": payload.get("configurable", {})}
+    )
+    return {
+        "suppliers": [s.model_dump() for s in values.get("suppliers", [])],
+        "ranked_suppliers": [asdict(r) for r in values.get("ranked_suppliers", [])],
+        "tokens_used": values.get("tokens_used", 0),
+        "tavily_credits_used": values.get("tavily_credits_used", 0),
+    }
+
+
+async def _run_extract(payload: Dict[str, Any]) -> Dict[str, Any]:
+    module = load_search_graph()
+    # Run the task here rather than handing it back to the queue
+    config = {"configurable": {**payload.get("configurable", {}), "distributed_extract": False}}
+    update = await module.crawl_and_extract(
+        {
+            "search_result": module.SearchResultRecord(**payload["search_result"]),
+            "extract_depth": payload.get("extract_depth", "advanced"),
+        },
+        config,
+    )
+    return {
+        "suppliers": [s.model_dump() for s in update.get("suppliers", [])],
+        "exported_urls": update.get("exported_urls", []),
+        "tokens_used": update.get("tokens_used", 0),
+        "tavily_credits_used": update.get("tavily_credits_used", 0),
+    }
+
+
+_HANDLERS = {RESEARCH_QUEUE: _run_research, EXTRACT_QUEUE: _run_extract}
+
+
+async def _keep_leased(broker: Broker, job: Job, visibility_timeout: float) -> None:
+    while True:
+        await asyncio.sleep(visibility_timeout / 3)
+        try:
+            if not await broker.extend(job, visibility_timeout):
+                logger.warning("Lost the lease on %s job %s; it may run twice", job.queue, job.key)
+                return
+        except Exception as e:
+            logger.warning("Error extending the lease on %s job %s: %s", job.queue, job.key, e)
+
+
+async def _handle(
+    broker: Broker, job: Job, max_attempts: int, visibility_timeout: float = 600.0
+) -> None:
+    heartbeat = asyncio.create_task(_keep_leased(broker, job, visibility_timeout))
+    try:
+        result = await _HANDLERS[job.queue](job.payload)
+    except Exception as e:
+        logger.error("Error running %s job %s (attempt %d): %s", job.queue, job.key, job.attempts, e)
+        if job.attempts < max_attempts:
+            return  # left unacknowledged: re-delivered after the visibility timeout
+        await broker.put_result(job.key, {"error": str(e), "suppliers": []})
+        await broker.release(job)
+        return
+    finally:
+        heartbeat.cancel()
+    await broker.put_result(job.key, result)
+    await broker.ack(job)
+
+
+async def run_worker(
+    broker: Broker,
+    *,
+    queues: List[str],
+    concurrency: int = 4,
+    visibility_timeout: float = 600.0,
+    max_attempts: int = 3,
+    poll_interval: float = 1.0,
+) -> None:
+    """Process jobs from `queues` forever with `concurrency` jobs in flight."""
+
+    async def consume() -> None:
+        while True:
+            job = None
+            try:
+                for queue in queues:
+                    job = await broker.reserve(queue, visibility_timeout)
+                    if job is not None:
+                        break
+                if job is not None:
+                    await _handle(broker, job, max_attempts, visibility_timeout)
+                    continue
+            except Exception as e:
+                # A broker error fails this job (it is re-delivered), not the worker
+                name = f"{job.queue} job {job.key}" if job else "the next job"
+                logger.error("Broker error handling %s: %s", name, e)
+            await asyncio.sleep(poll_interval)
+
+    try:
+        await asyncio.gather(*(consume() for _ in range(concurrency)))
+    finally:
+        await close_fetcher()
+
+
+def main() -> None:
+    """Run a worker from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("broker", help='Broker URL, e.g. "sqlite:///jobs.sqlite" or "redis://host:6379/0"')
+    parser.add_argument("--queues", nargs="+", default=[EXTRACT_QUEUE, RESEARCH_QUEUE])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--visibility-timeout", type=float, default=600.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument(
+        "--result-ttl-hours", type=float, default=24.0, help="How long job keys and results are kept"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(
+        run_worker(
+            connect_broker(args.broker, args.result_ttl_hours * 3600),
+            queues=args.queues,
+            concurrency=args.concurrency,
+            visibility_timeout=args.visibility_timeout,
+            max_attempts=args.max_attempts,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
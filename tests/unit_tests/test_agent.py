@@ -0,0 +1,10 @@
+from langgraph.graph.state import CompiledStateGraph
+
+import enrichment_agent.agent
+
+
+def test_package_graph_is_the_compiled_graph_after_importing_the_submodule() -> None:
+    from enrichment_agent import graph
+
+    assert isinstance(graph, CompiledStateGraph)
+    assert graph is enrichment_agent.agent.get_graph()
@@ -0,0 +1,57 @@
+import os
+
+from enrichment_agent.blobs import DiskBlobStore, content_key
+
+
+def test_put_is_content_addressed_and_survives_reopen(tmp_path) -> None:
+    store = DiskBlobStore(tmp_path)
+    text = "Acme Polymers — ISO 13485 certified medical-grade polymers. " * 50
+
+    key = store.put(text)
+
+    assert key == content_key(text)
+    assert store.put(text) == key
+    assert DiskBlobStore(tmp_path).get(key) == text
+
+
+def test_url_index_respects_max_age(tmp_path) -> None:
+    store = DiskBlobStore(tmp_path)
+    store.put_url("https://acme.in/", "page text")
+
+    assert store.get_url("https://acme.in/") == "page text"
+    assert store.get_url("https://acme.in/", max_age=-1) is None
+    assert store.get_url("https://other.in/") is None
+
+
+def test_least_recently_used_blobs_are_evicted(tmp_path) -> None:
+    store = DiskBlobStore(tmp_path, max_bytes=2048)
+    keys = []
+    for i in range(3):
+        keys.append(store.put(os.urandom(600).hex()))
+        os.utime(store._blob_path(keys[-1]), (i, i))
+
+    store.get(keys[0])  # touching the oldest blob protects it
+    keys.append(store.put(os.urandom(600).hex()))
+
+    assert keys[0] in store
+    assert keys[1] not in store
+    assert store.get(keys[1]) is None
+
+
+def test_stores_sharing_a_directory_see_each_others_blobs(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(DiskBlobStore, "_RESCAN_INTERVAL", 0.0)
+    mine, theirs = DiskBlobStore(tmp_path, max_bytes=2048), DiskBlobStore(tmp_path, max_bytes=2048)
+    theirs.put_url("https://acme.in/", "page text")
+    key = content_key("page text")
+
+    assert key in mine
+    assert mine.lookup_url("https://acme.in/")[0] == key
+
+    # Blobs written by the other store count towards this store's bound
+    for i in range(2):
+        os.utime(theirs._blob_path(theirs.put(os.urandom(600).hex())), (i, i))
+    mine.put(os.urandom(600).hex())
+    mine.put(os.urandom(600).hex())
+
+    on_disk = sum(p.stat().st_size for p in (tmp_path / "blobs").glob("*/*"))
+    assert on_disk <= 2048
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from enrichment_agent.budget import Budget
+
+
+def _usage(tokens: int = 0, credits: int = 0, started_at=None):
+    return SimpleNamespace(tokens_used=tokens, tavily_credits_used=credits, started_at=started_at)
+
+
+def test_unbounded_budget_never_degrades() -> None:
+    budget = Budget()
+    usage = _usage(tokens=10**9, credits=10**6)
+    assert budget.extract_depth(usage) == "advanced"
+    assert budget.allow_email_crawl(usage)
+    assert budget.max_fanout(12, usage, credits_per_item=3) == 12
+
+
+def test_budget_degrades_then_stops() -> None:
+    budget = Budget(max_tavily_credits=100)
+    assert budget.max_fanout(20, _usage(credits=10), credits_per_item=3) == 20
+
+    degraded = _usage(credits=60)
+    assert budget.extract_depth(degraded) == "basic"
+    assert budget.allow_email_crawl(degraded)
+    assert budget.max_fanout(20, degraded, credits_per_item=3) == 8
+
+    assert not budget.allow_email_crawl(_usage(credits=75))
+    assert budget.exhausted(_usage(credits=100))
+    assert budget.max_fanout(20, _usage(credits=100), credits_per_item=3) == 0
+
+
+def test_wall_time_counts_towards_budget() -> None:
+    budget = Budget(max_wall_seconds=10)
+    assert budget.consumed(_usage(started_at=100.0), now=105.0) == 0.5
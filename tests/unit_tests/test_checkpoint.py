@@ -0,0 +1,126 @@
+import operator
+import time
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import StateGraph
+from langgraph.types import Send
+
+from enrichment_agent.checkpoint import run_resumable
+
+
+class _State(TypedDict):
+    urls: List[str]
+    pages: Annotated[List[str], operator.add]
+    history: Annotated[List[str], operator.add]
+
+
+class _Output(TypedDict):
+    pages: List[str]
+
+
+def _workflow(calls: List[str], failing: set) -> StateGraph:
+    def plan(state):
+        return {"history": ["x" * 10_000]}
+
+    def fan_out(state):
+        return [Send("extract", {"url": u}) for u in state["urls"]]
+
+    def extract(state):
+        calls.append(state["url"])
+        if state["url"] in failing:
+            failing.discard(state["url"])
+            # Fail after the sibling branches have finished, so their writes are saved
+            time.sleep(0.1)
+            raise RuntimeError("connection reset")
+        return {"pages": [state["url"]]}
+
+    workflow = StateGraph(_State, output_schema=_Output)
+    workflow.add_node("plan", plan)
+    workflow.add_node("extract", extract)
+    workflow.add_edge("__start__", "plan")
+    workflow.add_conditional_edges("plan", fan_out)
+    return workflow
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_only_unfinished_branches(tmp_path) -> None:
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    calls: List[str] = []
+    workflow = _workflow(calls, failing={"b"})
+    input = {"urls": ["a", "b", "c"], "pages": [], "history": []}
+    path = str(tmp_path / "runs.sqlite")
+
+    with pytest.raises(RuntimeError):
+        await run_resumable(workflow, input, thread_id="t1", path=path)
+    resumed = await run_resumable(workflow, input, thread_id="t1", path=path)
+    finished = await run_resumable(workflow, input, thread_id="t1", path=path)
+
+    assert sorted(calls) == ["a", "b", "b", "c"]
+    assert sorted(resumed["pages"]) == ["a", "b", "c"]
+    # A finished thread returns the same output shape without running anything
+    assert finished == resumed
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_unchanged_channels_are_stored_once(tmp_path) -> None:
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    import sqlite3
+
+    path = str(tmp_path / "runs.sqlite")
+    await run_resumable(
+        _workflow([], failing=set()),
+        {"urls": ["a", "b"], "pages": [], "history": []},
+        thread_id="t1",
+        path=path,
+    )
+
+    with sqlite3.connect(path) as conn:
+        histories = conn.execute(
+            "SELECT COUNT(*) FROM checkpoint_blobs WHERE channel = 'history'"
+        ).fetchone()[0]
+        checkpoints = conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+    assert checkpoints >= 3
+    # Written when the input set it and when "plan" appended to it, not at every step
+    assert histories == 2
+
+
+@pytest.mark.asyncio
+async def test_blobs_are_rolled_back_when_the_checkpoint_row_fails(tmp_path) -> None:
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    import sqlite3
+
+    from langgraph.checkpoint.base import empty_checkpoint
+
+    from enrichment_agent.checkpoint import sqlite_checkpointer
+
+    path = str(tmp_path / "runs.sqlite")
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"pages": ["a"]}
+    checkpoint["channel_versions"] = {"pages": 1}
+    config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+
+    async with sqlite_checkpointer(path) as saver:
+        execute = saver.conn.execute
+
+        def execute_failing_on_checkpoints(sql, *args):
+            if sql.startswith("INSERT OR REPLACE INTO checkpoints"):
+                raise sqlite3.OperationalError("disk I/O error")
+            return execute(sql, *args)
+
+        saver.conn.execute = execute_failing_on_checkpoints
+        with pytest.raises(sqlite3.OperationalError):
+            await saver.aput(config, checkpoint, {}, {"pages": 1})
+        saver.conn.execute = execute
+        # Any later write (e.g. a task's pending writes) commits whatever the failed put left open
+        await saver.conn.commit()
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM checkpoint_blobs").fetchone()[0] == 0
+
+        await saver.aput(config, checkpoint, {}, {"pages": 1})
+        saved = await saver.aget_tuple(config)
+
+    assert saved.checkpoint["channel_values"] == {"pages": ["a"]}
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM checkpoint_blobs").fetchone()[0] == 1
@@ -0,0 +1,90 @@
+import pytest
+from langchain_core.messages import AIMessage
+
+from enrichment_agent import utils
+from enrichment_agent.chunking import CHARS_PER_TOKEN, iter_chunks
+from enrichment_agent.configuration import Configuration
+from enrichment_agent.state import ContactDetails, Supplier
+
+
+def test_chunks_are_bounded_and_break_between_paragraphs() -> None:
+    text = "\n\n".join(f"Product {i}: medical-grade polymer resin, ISO 13485." for i in range(200))
+
+    chunks = list(iter_chunks(text, max_tokens=100))
+
+    assert "".join(chunks) == text
+    assert all(len(c) <= 100 * CHARS_PER_TOKEN for c in chunks)
+    assert all(c.endswith("\n\n") for c in chunks[:-1])
+
+
+class _FakeExtractor:
+    """Returns one partial supplier per chunk, in order."""
+
+    def __init__(self, suppliers):
+        self.suppliers = list(suppliers)
+        self.calls = 0
+
+    def with_structured_output(self, schema, include_raw=False):
+        return self
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        return {"raw": AIMessage(content=""), "parsed": self.suppliers.pop(0)}
+
+
+@pytest.mark.asyncio
+async def test_chunked_extraction_merges_the_same_supplier_and_stops_once_fields_are_filled(
+    monkeypatch,
+) -> None:
+    partial = Supplier(
+        name="Acme Polymers",
+        description="Medical-grade polymer compounds",
+        standards_compliance="ISO 13485",
+        certifications="",
+        contact_details=ContactDetails(phone="+91 20 1234 5678", website="https://acme.in"),
+    )
+    other = Supplier(
+        name="Beta Plastics",
+        description="",
+        standards_compliance="",
+        certifications="CE marked",
+        contact_details=ContactDetails(email="info@beta.example", website="https://beta.example"),
+    )
+    rest = Supplier(
+        name="Acme Polymers Pvt. Ltd.",
+        description="",
+        standards_compliance="",
+        certifications="FDA registered",
+        contact_details=ContactDetails(email="sales@acme.in"),
+    )
+    fake = _FakeExtractor([partial, other, rest, rest])
+    monkeypatch.setattr(utils, "load_chat_model", lambda name: fake)
+    configuration = Configuration(
+        extraction_chunk_tokens=100, min_extraction_confidence=0.0, extraction_escalation=False
+    )
+
+    supplier, _ = await utils.extract_supplier_chunked("catalogue entry. " * 200, configuration)
+
+    assert fake.calls == 3
+    assert supplier.name == "Acme Polymers"
+    assert supplier.certifications == "FDA registered"
+    assert supplier.contact_details.email == "sales@acme.in"
+    assert supplier.contact_details.phone == "+91 20 1234 5678"
+
+
+def test_same_supplier_matches_name_or_business_domain() -> None:
+    def supplier(name, website=None):
+        return Supplier(
+            name=name,
+            description="",
+            standards_compliance="",
+            certifications="",
+            contact_details=ContactDetails(website=website),
+        )
+
+    assert utils.same_supplier(supplier("Acme Polymers"), supplier("ACME Polymers Ltd"))
+    assert utils.same_supplier(supplier("Acme", "https://acme.in"), supplier("Acme Polymers", "www.acme.in/about"))
+    assert not utils.same_supplier(supplier("Acme"), supplier("Beta Plastics"))
+    assert not utils.same_supplier(
+        supplier("Acme", "https://www.indiamart.com/acme"), supplier("Beta", "https://indiamart.com/beta")
+    )
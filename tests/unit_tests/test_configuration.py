@@ -3,3 +3,17 @@ from enrichment_agent.configuration import Configuration
 
 def test_configuration_from_none() -> None:
     Configuration.from_runnable_config()
+
+
+def test_budget_from_runnable_config_dict() -> None:
+    config = Configuration.from_runnable_config(
+        {"configurable": {"budget": {"max_tavily_credits": 40}}}
+    )
+    assert config.budget.max_tavily_credits == 40
+
+
+def test_model_for_role_falls_back_to_model() -> None:
+    config = Configuration(model="openai/gpt-4o", extractor_model="openai/gpt-4o-mini")
+    assert config.model_for("extractor") == "openai/gpt-4o-mini"
+    assert config.model_for("planner") == "openai/gpt-4o"
+    assert config.model_for() == "openai/gpt-4o"
@@ -0,0 +1,69 @@
+from enrichment_agent.coverage import (
+    facet_coverage,
+    facet_matches,
+    requirement_facets,
+    under_covered,
+)
+from enrichment_agent.ranking import rank_suppliers
+from enrichment_agent.state import Facet
+
+REQUIREMENT = (
+    "Medical-grade polymers and electronic components for portable diagnostic "
+    "devices from suppliers meeting ISO 13485 and FDA compliance standards."
+)
+PLANNED = [
+    Facet(name="medical-grade polymers", keywords=["polymer", "resin"]),
+    Facet(name="electronic components", keywords=["electronic", "pcb"]),
+]
+
+
+def _supplier(name: str, description: str, certifications: str = "") -> dict:
+    return {
+        "name": name,
+        "description": description,
+        "standards_compliance": "",
+        "certifications": certifications,
+        "contact_details": {},
+    }
+
+
+def test_required_certifications_become_facets() -> None:
+    facets = requirement_facets(REQUIREMENT, PLANNED)
+
+    assert [f.name for f in facets] == [
+        "medical-grade polymers",
+        "electronic components",
+        "FDA",
+        "ISO 13485",
+    ]
+    # A requirement with nothing to split still stops once enough suppliers are found
+    assert requirement_facets("Office chairs") == [Facet(name="procurement requirement", keywords=[])]
+
+
+def test_certification_facets_match_normalized_certifications() -> None:
+    iso = Facet(name="ISO 13485", keywords=["ISO 13485"])
+
+    assert facet_matches(_supplier("Acme", "Resins", "ISO13485:2016"), iso)
+    assert not facet_matches(_supplier("Acme", "Mentions ISO 13485 customers", "ISO 9001"), iso)
+    assert facet_matches(_supplier("Beta", "Medical PCB assembly"), PLANNED[1])
+
+
+def test_under_covered_facets_are_counted_on_distinct_suppliers() -> None:
+    ranked = rank_suppliers(
+        [
+            _supplier("Acme Polymers", "Medical polymer compounds", "ISO 13485, FDA"),
+            _supplier("Acme Polymers", "Medical polymer compounds", "ISO 13485, FDA"),
+            _supplier("Beta Resins", "Medical-grade resin", "ISO 13485"),
+            _supplier("Gamma Circuits", "Electronic components"),
+        ],
+        REQUIREMENT,
+    )
+    coverage = facet_coverage(ranked, requirement_facets(REQUIREMENT, PLANNED))
+
+    assert coverage == {
+        "medical-grade polymers": 2,
+        "electronic components": 1,
+        "FDA": 1,
+        "ISO 13485": 2,
+    }
+    assert under_covered(coverage, target=2) == ["electronic components", "FDA"]
@@ -0,0 +1,69 @@
+import pytest
+
+from enrichment_agent.blobs import DiskBlobStore
+from enrichment_agent.cpu_pool import (
+    CpuPool,
+    dedupe_suppliers,
+    scan_contacts_blob,
+    shutdown_executors,
+)
+from enrichment_agent.fetcher import parse_html
+from enrichment_agent.ranking import rank_suppliers
+
+
+def test_dedupe_merges_by_website_and_fills_gaps() -> None:
+    suppliers = [
+        {"name": "Acme Polymers Pvt Ltd", "certifications": "", "contact_details": {"website": "https://www.acme.in/"}},
+        {"name": "ACME Polymers", "certifications": "ISO 13485", "contact_details": {"website": "acme.in/products", "email": "sales@acme.in"}},
+        {"name": "Beta Electronics", "certifications": "CE", "contact_details": {}},
+    ]
+
+    merged = dedupe_suppliers(suppliers)
+
+    assert [s["name"] for s in merged] == ["Acme Polymers Pvt Ltd", "Beta Electronics"]
+    assert merged[0]["certifications"] == "ISO 13485"
+    assert merged[0]["contact_details"]["email"] == "sales@acme.in"
+
+
+def test_dedupe_keeps_directory_listings_and_blank_names_apart() -> None:
+    suppliers = [
+        {"name": "Acme Polymers", "contact_details": {"website": "https://www.indiamart.com/acme"}},
+        {"name": "Beta Plastics", "contact_details": {"website": "https://www.indiamart.com/beta"}},
+        {"name": "ACME Polymers Ltd", "contact_details": {"website": "indiamart.com/acme-polymers", "email": "a@acme.in"}},
+        {"name": "", "contact_details": {}},
+        {"name": "", "contact_details": {"phone": "+91 20 5555 0101"}},
+    ]
+
+    merged = dedupe_suppliers(suppliers)
+
+    assert [s["name"] for s in merged] == ["Acme Polymers", "Beta Plastics", "", ""]
+    assert merged[0]["contact_details"]["email"] == "a@acme.in"
+
+
+@pytest.mark.asyncio
+async def test_pool_scans_blob_by_key(tmp_path) -> None:
+    key = DiskBlobStore(tmp_path).put("Reach us at info@acme.in or +91 20 5555 0101")
+
+    found = await CpuPool(workers=1, queue_size=2).run(scan_contacts_blob, str(tmp_path), 1024 * 1024, key)
+
+    assert found == {"email": "info@acme.in", "phone": "+91 20 5555 0101"}
+
+
+@pytest.mark.asyncio
+async def test_pool_parses_html_and_ranks_out_of_process() -> None:
+    pool = CpuPool(workers=1, queue_size=2)
+    try:
+        text, links = await pool.run(
+            parse_html, '<p>Acme Polymers</p><a href="/contact">Contact</a>', "https://acme.in/"
+        )
+        ranked = await pool.run(
+            rank_suppliers,
+            [{"name": "Acme Polymers", "certifications": "ISO 13485", "contact_details": {}}],
+            "ISO 13485 certified polymers",
+        )
+    finally:
+        shutdown_executors()
+
+    assert text == "Acme Polymers\nContact"
+    assert links == [("https://acme.in/contact", "Contact")]
+    assert ranked[0].missing_required == []
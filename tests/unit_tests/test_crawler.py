@@ -0,0 +1,52 @@
+from typing import Dict, Optional
+
+import pytest
+
+from enrichment_agent.contacts import find_contacts
+from enrichment_agent.crawler import find_contact_details, link_priority
+from enrichment_agent.fetcher import FetchedPage
+
+
+class FakeFetcher:
+    def __init__(self, pages: Dict[str, FetchedPage]) -> None:
+        self.pages = pages
+        self.fetched: list = []
+
+    async def fetch(self, url: str) -> Optional[FetchedPage]:
+        self.fetched.append(url)
+        return self.pages.get(url)
+
+
+def test_find_contacts_prefers_mailto_links_and_skips_assets() -> None:
+    found = find_contacts(
+        "Logo: logo@2x.png Call +91 98765 43210",
+        [("mailto:Sales@Acme.in?subject=Quote", "Email us")],
+    )
+    assert found == {"email": "sales@acme.in", "phone": "+91 98765 43210"}
+
+
+def test_contact_links_rank_first() -> None:
+    assert link_priority("https://acme.in/contact-us", "") < link_priority("https://acme.in/about", "")
+    assert link_priority("https://acme.in/about", "") < link_priority("https://acme.in/products/tubing", "")
+
+
+@pytest.mark.asyncio
+async def test_crawl_stops_at_first_email_on_contact_page() -> None:
+    home = FetchedPage(
+        url="https://acme.in/",
+        status=200,
+        text="Acme Polymers",
+        links=[
+            ("https://acme.in/products", "Products"),
+            ("https://acme.in/contact", "Contact"),
+            ("https://other.com/contact", "Partner"),
+        ],
+    )
+    contact = FetchedPage(url="https://acme.in/contact", status=200, text="Write to info@acme.in")
+    fetcher = FakeFetcher({"https://acme.in/": home, "https://acme.in/contact": contact})
+
+    result = await find_contact_details("https://acme.in/", fetcher)  # type: ignore[arg-type]
+
+    assert result.email == "info@acme.in"
+    assert result.source_url == "https://acme.in/contact"
+    assert fetcher.fetched == ["https://acme.in/", "https://acme.in/contact"]
@@ -0,0 +1,54 @@
+import csv
+
+import pytest
+
+from enrichment_agent.export import (
+    append_jsonl,
+    export_suppliers,
+    flatten_supplier,
+    read_jsonl,
+)
+from enrichment_agent.ranking import SupplierScore
+
+SUPPLIER = {
+    "name": "Acme Polymers",
+    "description": "Medical-grade polymer compounds",
+    "standards_compliance": "ISO 13485",
+    "certifications": "ISO 13485, FDA registered",
+    "contact_details": {"email": "sales@acme.in", "phone": None, "website": "https://acme.in", "address": None},
+    "source_url": "https://acme.in/products",
+}
+
+
+def test_flatten_spreads_contacts_and_ranking() -> None:
+    row = flatten_supplier(
+        SupplierScore(supplier=SUPPLIER, score=0.75, certifications=["FDA", "ISO 13485"], missing_required=[])
+    )
+
+    assert row["email"] == "sales@acme.in"
+    assert row["source_url"] == "https://acme.in/products"
+    assert row["score"] == 0.75
+    assert row["normalized_certifications"] == "FDA; ISO 13485"
+    assert "contact_details" not in row
+
+
+def test_jsonl_stream_converts_to_csv(tmp_path) -> None:
+    jsonl = tmp_path / "suppliers.jsonl"
+    append_jsonl(jsonl, [SUPPLIER])
+    append_jsonl(jsonl, [{**SUPPLIER, "name": "Beta Electronics"}])
+
+    assert export_suppliers(read_jsonl(jsonl), tmp_path / "suppliers.csv") == 2
+    with open(tmp_path / "suppliers.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["name"] for r in rows] == ["Acme Polymers", "Beta Electronics"]
+    assert rows[0]["website"] == "https://acme.in"
+
+
+def test_parquet_round_trip(tmp_path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    export_suppliers([SUPPLIER] * 3, tmp_path / "suppliers.parquet")
+
+    table = pq.read_table(tmp_path / "suppliers.parquet")
+    assert table.num_rows == 3
+    assert table.column("email").to_pylist() == ["sales@acme.in"] * 3
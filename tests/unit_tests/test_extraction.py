@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from enrichment_agent.extraction import DomainDepthHints, assess_content, tavily_extract
+from enrichment_agent.fetcher import domain_of
+from enrichment_agent.hedging import Hedger
+from enrichment_agent.scheduler import HostScheduler
+
+
+def test_assess_content_requires_length_and_signals() -> None:
+    page = "Acme Polymers is ISO 13485 certified. " * 20
+    assert assess_content(page).sufficient(min_chars=500)
+    assert not assess_content("Loading...").sufficient(min_chars=500)
+    assert not assess_content("lorem ipsum " * 100).sufficient(min_chars=500)
+
+
+def test_domain_hints_persist_across_instances(tmp_path) -> None:
+    path = tmp_path / "hints.json"
+    hints = DomainDepthHints(path)
+    domain = domain_of("https://www.indiamart.com/acme/")
+    assert domain == "indiamart.com"
+    assert hints.preferred_depth(domain) == "basic"
+
+    hints.record(domain, "advanced")
+
+    assert DomainDepthHints(path).preferred_depth(domain) == "advanced"
+
+
+@pytest.mark.asyncio
+async def test_domain_hints_batch_writes_into_a_fresh_temp_file(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "hints.json"
+    hints = DomainDepthHints(path, flush_delay=0.05)
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(
+        "enrichment_agent.extraction.os.replace",
+        lambda src, dst: replaced.append(src) or real_replace(src, dst),
+    )
+
+    for _ in range(20):
+        hints.record("acme.in", "advanced")
+    assert not path.exists()
+    await asyncio.sleep(0.2)
+
+    assert len(replaced) == 1 and not replaced[0].endswith(".tmp")
+    assert DomainDepthHints(path).preferred_depth("acme.in") == "advanced"
+    assert [p.name for p in tmp_path.iterdir()] == ["hints.json"]
+
+    hints.record("beta.example", "basic")
+    await hints.flush()
+    assert "beta.example" in DomainDepthHints(path)._hints
+    assert len(replaced) == 2
+
+
+@pytest.mark.asyncio
+async def test_domain_hints_are_serialized_on_the_event_loop_thread(tmp_path, monkeypatch) -> None:
+    hints = DomainDepthHints(tmp_path / "hints.json", flush_delay=0)
+    threads = []
+    real_dumps = json.dumps
+    monkeypatch.setattr(
+        "enrichment_agent.extraction.json.dumps",
+        lambda obj: threads.append(threading.current_thread()) or real_dumps(obj),
+    )
+
+    async def record_while_writing():
+        for i in range(200):
+            hints.record(f"s{i}.example", "basic")
+            await asyncio.sleep(0)
+
+    await record_while_writing()
+    await hints.flush()
+
+    assert threads and set(threads) == {threading.main_thread()}
+    assert len(DomainDepthHints(tmp_path / "hints.json")._hints) == 200
+
+
+@pytest.mark.asyncio
+async def test_hedged_extract_respects_the_host_limit(monkeypatch) -> None:
+    import tavily
+
+    lock = threading.Lock()
+    active, peak = 0, 0
+
+    class _SlowTavily:
+        def extract(self, url, extract_depth):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.2)
+            with lock:
+                active -= 1
+            return {"results": [{"raw_content": "page"}]}
+
+    monkeypatch.setattr(tavily, "TavilyClient", _SlowTavily)
+    hedger = Hedger(min_samples=5, max_hedge_rate=1.0, min_delay=0.01)
+
+    async def fast():
+        return None
+
+    for _ in range(5):
+        await hedger.run("extract:basic", fast)
+    scheduler = HostScheduler(per_host_concurrency=1, min_delay=0)
+
+    content, credits = await tavily_extract("https://acme.in/a", "basic", scheduler, hedger)
+
+    assert content == "page"
+    assert hedger.stats()["extract:basic"]["hedged"] == 1
+    # The hedge never got a slot, so it was neither sent nor charged
+    assert peak == 1 and credits == 1
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from enrichment_agent.fetcher import Fetcher, HTMLTextExtractor, html_to_text
+from enrichment_agent.scheduler import HostScheduler
+
+HTML = """<html><head><style>body {color: red}</style><script>var x = 1;</script></head>
+<body><h1>Acme&nbsp;Polymers</h1><p>ISO 13485 certified.</p>
+<a href="/contact-us">Contact us</a> <a href="mailto:sales@acme.in">Email</a></body></html>"""
+
+
+def test_html_to_text_drops_scripts_and_breaks_blocks() -> None:
+    assert html_to_text(HTML) == "Acme Polymers\nISO 13485 certified.\nContact us Email"
+
+
+def test_extractor_accepts_chunks_and_collects_links() -> None:
+    parser = HTMLTextExtractor("https://acme.in/products/")
+    for i in range(0, len(HTML), 7):
+        parser.feed(HTML[i : i + 7])
+    parser.close()
+    assert "ISO 13485 certified." in parser.text()
+    assert parser.links == [
+        ("https://acme.in/contact-us", "Contact us"),
+        ("mailto:sales@acme.in", "Email"),
+    ]
+
+
+@pytest_asyncio.fixture
+async def serve():
+    """Start a local HTTP server with the given routes; yield its base URL."""
+    from aiohttp import web
+
+    runners = []
+
+    async def start(routes):
+        app = web.Application()
+        for path, handler in routes.items():
+            app.router.add_get(path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        runners.append(runner)
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    yield start
+    for runner in runners:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_fetch_stops_reading_once_max_chars_of_text_are_collected(serve) -> None:
+    from aiohttp import web
+
+    async def catalogue(request):
+        resp = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await resp.prepare(request)
+        try:
+            for i in range(2000):
+                await resp.write(f"<p>Product {i}: medical-grade polymer resin.</p>".encode() * 50)
+        except (ConnectionResetError, RuntimeError):
+            pass
+        return resp
+
+    base = await serve({"/catalogue": catalogue})
+    async with Fetcher(respect_robots=False, max_chars=10_000) as fetcher:
+        page = await fetcher.fetch(f"{base}/catalogue")
+
+    assert page is not None and page.truncated
+    assert 0 < len(page.text) <= 10_000
+
+
+@pytest.mark.asyncio
+async def test_robots_txt_is_loaded_once_and_its_crawl_delay_paces_the_host(serve) -> None:
+    from aiohttp import web
+
+    robots_hits = 0
+
+    async def robots(request):
+        nonlocal robots_hits
+        robots_hits += 1
+        await asyncio.sleep(0.05)
+        return web.Response(text="User-agent: *\nDisallow: /private\nCrawl-delay: 3\n")
+
+    async def page(request):
+        return web.Response(text="<p>Acme</p>", content_type="text/html")
+
+    base = await serve({"/robots.txt": robots, "/private": page, "/public": page})
+    async with Fetcher(scheduler=HostScheduler(min_delay=0)) as fetcher:
+        allowed = await asyncio.gather(
+            *(fetcher.allowed(f"{base}/{path}") for path in ["private", "public"] * 5)
+        )
+
+        assert robots_hits == 1
+        assert allowed == [False, True] * 5
+        assert fetcher.scheduler._host_delays == {"127.0.0.1": 3.0}
+    assert fetcher._session is None
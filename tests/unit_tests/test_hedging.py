@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from enrichment_agent.hedging import Hedger
+
+
+def _responder(latencies):
+    """Return a call whose n-th invocation takes latencies[n] seconds and returns n."""
+    count = 0
+
+    async def call():
+        nonlocal count
+        n = count
+        count += 1
+        await asyncio.sleep(latencies[n])
+        return n
+
+    return call
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_hedge_wins() -> None:
+    hedger = Hedger(min_samples=5, max_hedge_rate=0.5, min_delay=0.01)
+    for _ in range(5):
+        assert await hedger.run("search", _responder([0.01])) == (0, 1)
+
+    result, requests = await hedger.run("search", _responder([1.0, 0.01]))
+
+    assert (result, requests) == (1, 2)
+    stats = hedger.stats()["search"]
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_is_capped() -> None:
+    hedger = Hedger(min_samples=5, max_hedge_rate=0.1, min_delay=0.01)
+    for _ in range(5):
+        await hedger.run("search", _responder([0.01]))
+
+    # 6 calls so far allow no hedge at a 10% cap
+    assert await hedger.run("search", _responder([0.05, 0.0])) == (0, 1)
+    assert hedger.stats()["search"]["hedged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_falls_back_to_hedge() -> None:
+    hedger = Hedger(min_samples=1, max_hedge_rate=1.0, min_delay=0.01)
+    await hedger.run("extract", _responder([0.01]))
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("upstream timeout")
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    assert await hedger.run("extract", flaky) == ("ok", 2)
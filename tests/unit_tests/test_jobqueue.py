@@ -0,0 +1,169 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+
+from enrichment_agent import worker
+from enrichment_agent.jobqueue import RedisBroker, SqliteBroker, wait_for_results
+
+
+@pytest.mark.asyncio
+async def test_enqueue_is_idempotent_by_key(tmp_path) -> None:
+    broker = SqliteBroker(str(tmp_path / "jobs.sqlite"))
+
+    assert await broker.enqueue("extract", "k1", {"n": 1})
+    assert not await broker.enqueue("extract", "k1", {"n": 2})
+
+    job = await broker.reserve("extract", visibility_timeout=60)
+    assert job is not None and job.payload == {"n": 1}
+    assert await broker.reserve("extract", visibility_timeout=60) is None
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_job_is_redelivered(tmp_path) -> None:
+    broker = SqliteBroker(str(tmp_path / "jobs.sqlite"))
+    await broker.enqueue("extract", "k1", {})
+
+    first = await broker.reserve("extract", visibility_timeout=0)
+    second = await broker.reserve("extract", visibility_timeout=60)
+    assert first is not None and second is not None
+    assert second.attempts == 2
+
+    # The stale delivery cannot acknowledge the job
+    await broker.ack(first)
+    await broker.put_result("k1", {"suppliers": []})
+    await broker.ack(second)
+
+    assert await broker.reserve("extract", visibility_timeout=0) is None
+    assert await wait_for_results(broker, ["k1", "k2"], timeout=0) == {"k1": {"suppliers": []}}
+
+
+@pytest.mark.asyncio
+async def test_finished_job_key_and_result_expire(tmp_path, monkeypatch) -> None:
+    broker = SqliteBroker(str(tmp_path / "jobs.sqlite"), result_ttl=60)
+    await broker.enqueue("research", "k1", {"n": 1})
+    job = await broker.reserve("research", visibility_timeout=60)
+    await broker.put_result("k1", {"suppliers": [1]})
+    await broker.ack(job)
+
+    assert not await broker.enqueue("research", "k1", {"n": 2})
+    assert await broker.get_results(["k1"]) == {"k1": {"suppliers": [1]}}
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert await broker.get_results(["k1"]) == {}
+    assert await broker.enqueue("research", "k1", {"n": 2})
+    job = await broker.reserve("research", visibility_timeout=60)
+    assert job is not None and job.payload == {"n": 2} and job.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_released_job_can_be_queued_again_without_its_error(tmp_path) -> None:
+    broker = SqliteBroker(str(tmp_path / "jobs.sqlite"))
+    await broker.enqueue("extract", "k1", {})
+    job = await broker.reserve("extract", visibility_timeout=60)
+    await broker.put_result("k1", {"error": "boom", "suppliers": []})
+    await broker.release(job)
+
+    # Runs already waiting see the error; a new run queues the work afresh
+    assert await broker.get_results(["k1"]) == {"k1": {"error": "boom", "suppliers": []}}
+    assert await broker.enqueue("extract", "k1", {})
+    assert await broker.get_results(["k1"]) == {}
+
+
+@pytest.fixture
+def redis_broker(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from redis import asyncio as aioredis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        aioredis, "from_url", lambda url, **kw: fakeredis.FakeAsyncRedis(server=server, **kw)
+    )
+    return RedisBroker("redis://fake", prefix="test", result_ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_redis_broker_expires_and_releases_keys(redis_broker) -> None:
+    broker = redis_broker
+
+    assert await broker.enqueue("extract", "k1", {"n": 1})
+    assert not await broker.enqueue("extract", "k1", {"n": 2})
+    job = await broker.reserve("extract", visibility_timeout=60)
+    assert job is not None and job.payload == {"n": 1}
+    await broker.put_result("k1", {"error": "boom", "suppliers": []})
+    await broker.release(job)
+
+    assert await broker.enqueue("extract", "k1", {"n": 3})
+    assert await broker.get_results(["k1"]) == {}
+    job = await broker.reserve("extract", visibility_timeout=60)
+    await broker.put_result("k1", {"suppliers": []})
+    await broker.ack(job)
+    assert 0 < await broker._redis.ttl("test:job:extract:k1") <= 60
+    assert 0 < await broker._redis.ttl("test:result:k1") <= 60
+
+
+
+@pytest.mark.asyncio
+async def test_redis_reserve_redelivers_expired_leases_and_honours_extend(redis_broker) -> None:
+    broker = redis_broker
+    await broker.enqueue("extract", "k1", {"n": 1})
+
+    first = await broker.reserve("extract", visibility_timeout=0)
+    second = await broker.reserve("extract", visibility_timeout=60)
+    assert first is not None and second is not None and second.attempts == 2
+    assert not await broker.extend(first, 60)
+    assert await broker.extend(second, 60)
+    assert await broker.reserve("extract", visibility_timeout=60) is None
+
+
+@pytest.mark.asyncio
+async def test_worker_extends_the_lease_of_a_long_job(tmp_path, monkeypatch) -> None:
+    broker = SqliteBroker(str(tmp_path / "jobs.sqlite"))
+    await broker.enqueue("extract", "k1", {})
+    job = await broker.reserve("extract", visibility_timeout=0.3)
+
+    async def slow(payload):
+        await asyncio.sleep(0.6)
+        return {"suppliers": []}
+
+    monkeypatch.setitem(worker._HANDLERS, "extract", slow)
+    handling = asyncio.create_task(worker._handle(broker, job, max_attempts=1, visibility_timeout=0.3))
+    await asyncio.sleep(0.45)
+    # Past the original timeout, the job is still leased to the running worker
+    assert await broker.reserve("extract", visibility_timeout=60) is None
+    await handling
+    assert await broker.get_results(["k1"]) == {"k1": {"suppliers": []}}
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_a_broker_error_while_storing_a_result(tmp_path, monkeypatch) -> None:
+    broker = SqliteBroker(str(tmp_path / "jobs.sqlite"))
+    await broker.enqueue("extract", "k1", {})
+    await broker.enqueue("extract", "k2", {})
+    put_result = broker.put_result
+    failures = []
+
+    async def flaky_put_result(key, result):
+        if not failures:
+            failures.append(key)
+            raise ConnectionError("broker went away")
+        await put_result(key, result)
+
+    async def handler(payload):
+        return {"suppliers": []}
+
+    monkeypatch.setattr(broker, "put_result", flaky_put_result)
+    monkeypatch.setitem(worker._HANDLERS, "extract", handler)
+    running = asyncio.create_task(
+        worker.run_worker(broker, queues=["extract"], concurrency=1, visibility_timeout=0.2, poll_interval=0.05)
+    )
+    await asyncio.sleep(0.6)
+    running.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await running
+
+    # The job whose result failed to store is re-delivered after its lease, and the worker carries on
+    assert await broker.get_results(["k1", "k2"]) == {"k1": {"suppliers": []}, "k2": {"suppliers": []}}
+    assert failures == ["k1"]
@@ -0,0 +1,90 @@
+from enrichment_agent.provenance import (
+    CONTACT_FIELDS,
+    SupplierFieldCache,
+    merge_contact_details,
+    merge_supplier,
+    needs_contact_lookup,
+    record_fields,
+    stale_fields,
+)
+from enrichment_agent.state import ContactDetails, FieldSource, Supplier, add_suppliers
+
+
+def _supplier(**contact):
+    return Supplier(
+        name="Acme Polymers",
+        description="Medical-grade polymer compounds",
+        standards_compliance="ISO 13485",
+        certifications="FDA registered",
+        contact_details=ContactDetails(**contact),
+    )
+
+
+def test_merge_fills_gaps_and_keeps_sources() -> None:
+    base = _supplier(website="https://acme.in")
+    record_fields(base, "https://directory.in/acme", "llm", fetched_at=100.0)
+    update = _supplier(email="sales@acme.in", website="https://other.in")
+    update.name = "Acme"
+    record_fields(update, "https://acme.in/contact", "llm", fetched_at=200.0)
+
+    merge_supplier(base, update)
+
+    assert base.name == "Acme Polymers"
+    assert base.contact_details.website == "https://acme.in"
+    assert base.contact_details.email == "sales@acme.in"
+    assert base.provenance["contact_details.email"].url == "https://acme.in/contact"
+    assert base.provenance["name"].url == "https://directory.in/acme"
+
+
+def test_missing_fields_go_stale_sooner() -> None:
+    supplier = _supplier(website="https://acme.in")
+    record_fields(supplier, "https://acme.in", "llm", fetched_at=1000.0)
+
+    assert stale_fields(supplier, max_age=500, missing_max_age=100, now=1050.0) == []
+    assert stale_fields(supplier, max_age=500, missing_max_age=100, now=1200.0) == [
+        p for p in CONTACT_FIELDS if p != "contact_details.website"
+    ]
+
+
+def test_field_cache_round_trips_by_canonical_url(tmp_path) -> None:
+    cache = SupplierFieldCache(tmp_path)
+    supplier = _supplier(email="sales@acme.in")
+    record_fields(supplier, "https://acme.in/", "llm", fetched_at=100.0)
+
+    cache.put("https://www.acme.in/", supplier)
+    cached = cache.get("https://acme.in")
+
+    assert cached is not None
+    assert cached.contact_details.email == "sales@acme.in"
+    assert cached.provenance["name"].fetched_at == 100.0
+
+
+def test_contact_merge_only_fills_empty_contact_fields() -> None:
+    supplier = _supplier(phone="+91 20 1234 5678")
+    record_fields(supplier, "https://directory.in/acme", "llm", fetched_at=100.0)
+    supplier.provenance.pop("contact_details.email")
+    assert needs_contact_lookup(supplier)
+
+    source = FieldSource(url="https://acme.in/contact", fetched_at=200.0, method="llm")
+    merge_contact_details(
+        supplier, ContactDetails(email="sales@acme.in", phone="+1 555 0100"), source
+    )
+
+    assert supplier.name == "Acme Polymers"
+    assert supplier.contact_details.email == "sales@acme.in"
+    assert supplier.contact_details.phone == "+91 20 1234 5678"
+    assert supplier.provenance["contact_details.email"] == source
+    assert supplier.provenance["contact_details.phone"].url == "https://directory.in/acme"
+    assert not needs_contact_lookup(supplier)
+
+
+def test_add_suppliers_replaces_by_source_url() -> None:
+    first = _supplier()
+    first.source_url = "https://acme.in"
+    other = _supplier()
+    enriched = _supplier(email="sales@acme.in")
+    enriched.source_url = "https://acme.in"
+
+    merged = add_suppliers([first, other], [enriched])
+
+    assert merged == [enriched, other]
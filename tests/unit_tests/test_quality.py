@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from enrichment_agent.quality import score_completeness, supplier_confidence
+from enrichment_agent.schema import schema
+
+
+def _supplier(**overrides):
+    supplier = {
+        "name": "Acme Polymers",
+        "description": "Medical-grade polymer compounds",
+        "standards_compliance": "ISO 13485",
+        "certifications": "ISO 13485, FDA registered",
+        "contact_details": {
+            "email": "sales@acme.in",
+            "phone": "+91 20 5555 0000",
+            "website": "https://acme.in",
+        },
+    }
+    supplier.update(overrides)
+    return supplier
+
+
+def test_complete_info_is_accepted() -> None:
+    report = score_completeness({"suppliers": [_supplier()] * 3}, schema, min_items=3)
+    assert report.score == 1.0
+    assert report.verdict(0.9, 0.5) == "accept"
+
+
+def test_missing_contacts_and_too_few_suppliers_are_reported() -> None:
+    info = {"suppliers": [_supplier(contact_details={"website": "https://acme.in"})]}
+    report = score_completeness(info, schema, min_items=3)
+    assert report.score < 0.5
+    assert "info.suppliers[0].contact_details.email is missing" in report.issues
+    assert any("expected at least 3" in issue for issue in report.issues)
+    assert report.verdict(0.9, 0.5) == "reject"
+
+
+def test_empty_info_is_rejected() -> None:
+    assert score_completeness({}, schema).verdict(0.9, 0.5) == "reject"
+
+
+PAGE = """Acme Polymers Pvt Ltd supplies medical-grade polymer compounds.
+ISO 13485 certified. Contact: sales@acme.in, +91 20 5555 0101"""
+
+
+def _extracted(email="sales@acme.in", name="Acme Polymers"):
+    return SimpleNamespace(
+        name=name,
+        description="Medical-grade polymer compounds for devices",
+        standards_compliance="ISO 13485",
+        certifications="",
+        contact_details=SimpleNamespace(email=email, phone="+91 20 5555 0101", website=None),
+    )
+
+
+def test_supplier_confidence_rewards_grounded_output() -> None:
+    assert supplier_confidence(_extracted(), PAGE) == 1.0
+
+
+def test_supplier_confidence_penalizes_ungrounded_fields() -> None:
+    assert supplier_confidence(_extracted(email="info@made-up.com"), PAGE) == 0.8
+    assert supplier_confidence(_extracted(name="Globex Industries"), PAGE) == 0.6
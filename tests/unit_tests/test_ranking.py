@@ -0,0 +1,40 @@
+from enrichment_agent.ranking import criteria_for, parse_certifications, rank_suppliers
+
+REQUIREMENT = (
+    "Medical-grade polymers for portable diagnostic devices from suppliers "
+    "meeting ISO 13485 and FDA compliance standards."
+)
+
+
+def test_parse_certifications_normalizes_free_text() -> None:
+    assert parse_certifications("ISO13485:2016 certified, US FDA registered", "CE marked; RoHS") == {
+        "ISO 13485",
+        "FDA",
+        "CE",
+        "RoHS",
+    }
+    # Lower-case words that happen to spell acronyms are not certifications
+    assert parse_certifications("products within reach of every clinic") == frozenset()
+
+
+def test_criteria_require_what_the_requirement_names() -> None:
+    criteria = {c.name: c for c in criteria_for(REQUIREMENT)}
+
+    assert criteria["ISO 13485"].required and criteria["FDA"].required
+    assert not criteria["CE"].required  # from the medical device guidance
+    assert "ISO 9001" in criteria and "contact:email" in criteria
+
+
+def test_rank_puts_suppliers_meeting_requirements_first() -> None:
+    suppliers = [
+        {"name": "Gamma", "certifications": "ISO 9001", "standards_compliance": "", "contact_details": {"email": "a@gamma.in", "phone": "1", "website": "gamma.in"}},
+        {"name": "Acme", "certifications": "ISO 13485, FDA 510(k)", "standards_compliance": "", "contact_details": {}},
+        {"name": "Beta", "certifications": "ISO 13485", "standards_compliance": "FDA registered, CE", "contact_details": {"website": "beta.in"}},
+    ]
+
+    ranked = rank_suppliers(suppliers, REQUIREMENT)
+
+    assert [r.supplier["name"] for r in ranked] == ["Beta", "Acme", "Gamma"]
+    assert ranked[0].missing_required == []
+    assert ranked[2].missing_required == ["FDA", "ISO 13485"]
+    assert 0 < ranked[2].score < ranked[1].score < ranked[0].score <= 1
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from enrichment_agent.scheduler import HostScheduler
+
+
+@pytest.mark.asyncio
+async def test_per_host_limit_and_fair_rotation() -> None:
+    scheduler = HostScheduler(max_concurrency=2, per_host_concurrency=1, min_delay=0)
+    order = []
+
+    async def fetch(host: str, i: int) -> None:
+        async with scheduler.slot(host):
+            order.append((host, i))
+            await asyncio.sleep(0.01)
+
+    tasks = [asyncio.create_task(fetch("indiamart.com", i)) for i in range(3)]
+    tasks.append(asyncio.create_task(fetch("acme.in", 0)))
+    await asyncio.sleep(0)
+    assert scheduler.stats() == {
+        "acme.in": {"queued": 0, "active": 1},
+        "indiamart.com": {"queued": 2, "active": 1},
+    }
+    await asyncio.gather(*tasks)
+
+    # The single acme.in request is not stuck behind the indiamart.com backlog
+    assert order.index(("acme.in", 0)) < order.index(("indiamart.com", 1))
+    assert scheduler.queue_depths() == {}
+
+
+@pytest.mark.asyncio
+async def test_min_delay_spaces_requests_to_a_host() -> None:
+    scheduler = HostScheduler(per_host_concurrency=4, min_delay=0.05)
+    starts = []
+
+    async def fetch() -> None:
+        async with scheduler.slot("tradeindia.com"):
+            starts.append(asyncio.get_running_loop().time())
+
+    await asyncio.gather(*(fetch() for _ in range(3)))
+
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
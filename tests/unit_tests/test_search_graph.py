@@ -0,0 +1,277 @@
+import asyncio
+import dataclasses
+import json
+import sys
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from enrichment_agent.budget import extract_cost
+from enrichment_agent.configuration import Configuration
+from enrichment_agent.extraction import fetch_page, get_configured_blob_store
+from enrichment_agent.state import SearchResultRecord, State, Supplier
+from enrichment_agent.worker import load_search_graph
+
+PAGE = "Acme Polymers makes medical-grade resins, ISO 13485 certified. Contact us: sales@acme.in. " * 20
+
+
+class _FakeTavily:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def search(self, query):
+        return {
+            "results": [
+                {"url": "https://acme.in/", "title": "Acme", "score": 0.9, "raw_content": PAGE},
+                {"url": "https://beta.example/", "title": "Beta", "score": 0.5, "content": "Beta"},
+            ]
+        }
+
+
+def test_search_result_records_are_small_frozen_and_slotted() -> None:
+    record = SearchResultRecord(url="https://acme.in/", title="Acme", score=0.9, content_key="0" * 64)
+
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        record.url = "https://other.example/"  # type: ignore[misc]
+    assert sys.getsizeof(record) < 100
+
+
+@pytest.mark.asyncio
+async def test_search_node_puts_keys_in_state_and_extraction_reads_them(tmp_path, monkeypatch) -> None:
+    import tavily
+
+    monkeypatch.setattr(tavily, "TavilyClient", _FakeTavily)
+    module = load_search_graph()
+    configurable = {"cache_dir": str(tmp_path), "results_per_query": 2}
+
+    update = await module.search_node({"query": "medical polymers"}, {"configurable": configurable})
+
+    records = update["search_results"]
+    assert [r.url for r in records] == ["https://acme.in/", "https://beta.example/"]
+    assert all(PAGE not in repr(r) for r in records)
+    configuration = Configuration(**configurable)
+    assert get_configured_blob_store(configuration).get(records[0].content_key) == PAGE
+
+    # Raw content from the search is sufficient, so the page is not fetched again
+    page = await fetch_page(records[0].url, configuration, search_content_key=records[0].content_key)
+    assert page.depth == "search" and page.content == PAGE and page.credits_used == 0
+
+
+class _StreamingPlanner:
+    """Streams a Queries tool call a few characters at a time, logging when it finishes."""
+
+    def __init__(self, queries, events):
+        self.args = json.dumps({"queries": queries})
+        self.events = events
+
+    def bind_tools(self, tools, tool_choice=None):
+        return self
+
+    async def astream(self, messages):
+        for i in range(0, len(self.args), 8):
+            chunk = {"name": "Queries" if i == 0 else None, "args": self.args[i : i + 8], "id": "c1" if i == 0 else None, "index": 0}
+            yield AIMessageChunk(content="", tool_call_chunks=[chunk])
+            await asyncio.sleep(0.005)
+        self.events.append("stream done")
+
+
+def _pipeline(monkeypatch, queries, events, failing=()):
+    module = load_search_graph()
+    monkeypatch.setattr(module, "init_model", lambda config, role=None: _StreamingPlanner(queries, events))
+
+    async def search_node(state, config):
+        events.append(f"search {state['query']}")
+        await asyncio.sleep(0.01)
+        return {
+            "search_results": [SearchResultRecord(url=f"https://{state['query']}.example/")],
+            "tavily_credits_used": 1,
+        }
+
+    async def crawl_and_extract(state, config):
+        url = state["search_result"].url
+        events.append(f"extract {url}")
+        if any(f in url for f in failing):
+            raise RuntimeError("connection reset")
+        supplier = Supplier(name=url, description="", standards_compliance="", certifications="")
+        return {"suppliers": [supplier], "tavily_credits_used": extract_cost(state["extract_depth"])}
+
+    monkeypatch.setattr(module, "search_node", search_node)
+    monkeypatch.setattr(module, "crawl_and_extract", crawl_and_extract)
+    return module
+
+
+def _state() -> State:
+    return State(
+        company_name="InnoMed Devices",
+        company_info="Medical device manufacturing",
+        procurement_requirement="Medical-grade polymers meeting ISO 13485",
+    )
+
+
+@pytest.mark.asyncio
+async def test_pipeline_searches_and_extracts_before_the_query_stream_ends(monkeypatch) -> None:
+    events = []
+    module = _pipeline(monkeypatch, ["alpha", "beta", "gamma", "delta"], events)
+
+    update = await module.pipelined_research(_state(), {"configurable": {}})
+
+    assert update["queries"] == ["alpha", "beta", "gamma", "delta"]
+    assert events.index("search alpha") < events.index("stream done")
+    assert events.index("extract https://alpha.example/") < events.index("stream done")
+    assert len(update["suppliers"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stops_dispatching_when_the_budget_runs_out(monkeypatch) -> None:
+    events = []
+    module = _pipeline(monkeypatch, [f"q{i}" for i in range(8)], events)
+
+    update = await module.pipelined_research(
+        _state(), {"configurable": {"budget": {"max_tavily_credits": 9}}}
+    )
+
+    assert 0 < len(update["queries"]) < 8
+    assert update["tavily_credits_used"] <= 9
+
+
+@pytest.mark.asyncio
+async def test_pipeline_survives_a_failing_extraction(monkeypatch) -> None:
+    events = []
+    module = _pipeline(monkeypatch, ["alpha", "beta", "gamma"], events, failing=("beta",))
+
+    update = await module.pipelined_research(_state(), {"configurable": {}})
+
+    assert sorted(s.name for s in update["suppliers"]) == ["https://alpha.example/", "https://gamma.example/"]
+    assert len(update["search_results"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_enrich_contacts_appends_each_supplier_to_the_jsonl_export_once(tmp_path, monkeypatch) -> None:
+    module = load_search_graph()
+
+    async def look_up(supplier, configuration, extract_depth):
+        # The email is not found and the supplier stays pending, as when the budget skips it
+        return supplier, 0, 0
+
+    monkeypatch.setattr(module, "_look_up_contacts", look_up)
+    path = tmp_path / "suppliers.jsonl"
+    config = {"configurable": {"export_jsonl_path": str(path), "field_cache_ttl_hours": 0}}
+
+    def supplier(name):
+        return Supplier(
+            name=name,
+            description="",
+            standards_compliance="",
+            certifications="",
+            source_url=f"https://{name}.example/",
+        )
+
+    state = dataclasses.replace(_state(), suppliers=[supplier("acme"), supplier("beta")])
+    first = await module.enrich_contacts(state, config)
+    state = dataclasses.replace(
+        state,
+        suppliers=state.suppliers + [supplier("gamma")],
+        exported_urls=state.exported_urls + first["exported_urls"],
+    )
+    second = await module.enrich_contacts(state, config)
+
+    rows = [json.loads(line)["name"] for line in path.read_text().splitlines()]
+    assert rows == ["acme", "beta", "gamma"]
+    assert second["exported_urls"] == ["https://gamma.example/"]
+
+
+@pytest.mark.asyncio
+async def test_search_graph_output_carries_the_ranked_suppliers(monkeypatch) -> None:
+    module = load_search_graph()
+    assert set(module.get_graph().get_output_jsonschema()["properties"]) == {
+        "suppliers",
+        "ranked_suppliers",
+        "tokens_used",
+        "tavily_credits_used",
+    }
+
+    events = []
+    module = _pipeline(monkeypatch, ["alpha", "beta"], events)
+    # Rebuild the graph so it picks up the stand-in nodes
+    workflow = module.StateGraph(
+        State, input_schema=module.InputState, output_schema=module.SearchOutputState
+    )
+    workflow.add_node("pipelined_research", module.pipelined_research)
+    workflow.add_node("rank_candidates", module.rank_candidates)
+    workflow.add_edge("__start__", "pipelined_research")
+    workflow.add_edge("pipelined_research", "rank_candidates")
+
+    output = await workflow.compile().ainvoke(dataclasses.asdict(_state()))
+
+    assert sorted(r.supplier["name"] for r in output["ranked_suppliers"]) == [
+        "https://alpha.example/",
+        "https://beta.example/",
+    ]
+    assert len(output["suppliers"]) == 2 and output["tavily_credits_used"] > 0
+    assert "messages" not in output
+
+
+@pytest.mark.asyncio
+async def test_a_round_with_only_extracted_urls_still_enriches_and_ranks() -> None:
+    module = load_search_graph()
+    record = SearchResultRecord(url="https://acme.in/")
+    state = dataclasses.replace(_state(), search_results=[record], extracted_urls=[record.url])
+
+    assert await module.continue_to_extract(state, {"configurable": {}}) == "enrich_contacts"
+    assert module.continue_to_search(dataclasses.replace(_state(), queries=[])) == "enrich_contacts"
+
+    fresh = dataclasses.replace(state, extracted_urls=[])
+    sends = await module.continue_to_extract(fresh, {"configurable": {}})
+    assert [s.node for s in sends] == ["crawl_and_extract"]
+
+
+@pytest.mark.asyncio
+async def test_extraction_dispatch_dedupes_by_canonical_url_and_falls_back_without_budget() -> None:
+    module = load_search_graph()
+    records = [
+        SearchResultRecord(url="https://acme.in/products"),
+        SearchResultRecord(url="http://www.acme.in/products/?utm_source=x"),
+        SearchResultRecord(url="https://beta.example/"),
+        SearchResultRecord(url="https://www.gamma.example"),
+    ]
+    state = dataclasses.replace(
+        _state(), search_results=records, extracted_urls=["https://gamma.example/"]
+    )
+
+    sends = await module.continue_to_extract(state, {"configurable": {}})
+    assert [s.arg["search_result"].url for s in sends] == [
+        "https://acme.in/products",
+        "https://beta.example/",
+    ]
+
+    spent = dataclasses.replace(state, tavily_credits_used=10)
+    config = {"configurable": {"budget": {"max_tavily_credits": 10}}}
+    assert await module.continue_to_extract(spent, config) == "enrich_contacts"
+
+
+@pytest.mark.asyncio
+async def test_contact_lookup_stays_on_a_directory_listing_and_ignores_its_address(monkeypatch) -> None:
+    from enrichment_agent.crawler import CrawlResult
+
+    module = load_search_graph()
+    crawls = []
+
+    async def find_contact_details(start_url, fetcher, *, max_pages, time_budget):
+        crawls.append((start_url, max_pages))
+        return CrawlResult(email="support@indiamart.com", phone="+91 20 1234 5678", source_url=start_url)
+
+    monkeypatch.setattr(module, "find_contact_details", find_contact_details)
+    listing = Supplier(
+        name="Acme Polymers",
+        description="",
+        standards_compliance="",
+        certifications="",
+        source_url="https://www.indiamart.com/acme-polymers/",
+    )
+
+    supplier, _, _ = await module._look_up_contacts(listing, Configuration(), "basic")
+
+    assert crawls == [("https://www.indiamart.com/acme-polymers/", 1)]
+    assert supplier.contact_details.email is None
+    assert supplier.contact_details.phone == "+91 20 1234 5678"
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph
+from langgraph.prebuilt import ToolNode
+
+from enrichment_agent import tools
+from enrichment_agent.budget import Budget
+from enrichment_agent.extraction import ExtractedPage
+from enrichment_agent.state import State, Supplier
+
+
+def _supplier(name: str) -> Supplier:
+    return Supplier(name=name, description="", standards_compliance="", certifications="")
+
+
+async def _fake_fetch_page(url, configuration, max_depth="advanced"):
+    return ExtractedPage(url, f"{url} makes medical-grade polymers.", max_depth, 2)
+
+
+async def _fake_extract_supplier(prompt, configuration, content=None):
+    return _supplier(content.split(" ")[0]), 100
+
+
+class _SlowFetcher:
+    """Serves each URL after its own delay and records how many fetches overlap."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, url, configuration, max_depth="advanced"):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays[url])
+        finally:
+            self.in_flight -= 1
+        return ExtractedPage(url, f"{url} makes medical-grade polymers. " * 100, max_depth, 1)
+
+
+def _run_tools_graph():
+    workflow = StateGraph(State)
+    workflow.add_node("tools", ToolNode([tools.scrape_websites]))
+    workflow.add_edge("__start__", "tools")
+    return workflow.compile()
+
+
+@pytest.mark.asyncio
+async def test_scrape_tool_call_consumes_budget(monkeypatch) -> None:
+    monkeypatch.setattr(tools, "fetch_page", _fake_fetch_page)
+    monkeypatch.setattr(tools, "extract_supplier", _fake_extract_supplier)
+    call = {
+        "name": "scrape_websites",
+        "args": {"urls": ["https://a.example", "https://b.example"]},
+        "id": "call1",
+    }
+
+    values = await _run_tools_graph().ainvoke(
+        {
+            "company_name": "InnoMed Devices",
+            "company_info": "Medical device manufacturing",
+            "procurement_requirement": "Medical-grade polymers",
+            "messages": [AIMessage(content="", tool_calls=[call])],
+            "tokens_used": 50,
+            "tavily_credits_used": 1,
+        }
+    )
+
+    assert values["tokens_used"] == 50 + 2 * 100
+    assert values["tavily_credits_used"] == 1 + 2 * 2
+    assert Budget(max_tavily_credits=5).exhausted(State(**values))
+    results = json.loads(values["messages"][-1].content)
+    assert [r["supplier"]["name"] for r in results] == ["https://a.example", "https://b.example"]
+
+
+def _state_with_call(urls):
+    call = {"name": "scrape_websites", "args": {"urls": urls}, "id": "call1"}
+    return {
+        "company_name": "InnoMed Devices",
+        "company_info": "Medical device manufacturing",
+        "procurement_requirement": "Medical-grade polymers",
+        "messages": [AIMessage(content="", tool_calls=[call])],
+    }
+
+
+@pytest.mark.asyncio
+async def test_scrape_runs_urls_concurrently_up_to_the_cap_and_keeps_input_order(monkeypatch) -> None:
+    # Earlier URLs finish last, so completion order is the reverse of input order
+    urls = [f"https://s{i}.example" for i in range(6)]
+    fetcher = _SlowFetcher({url: 0.1 - 0.015 * i for i, url in enumerate(urls)})
+    prompts = []
+
+    async def extract_supplier(prompt, configuration, content=None):
+        prompts.append((prompt, content))
+        return _supplier(content.split(" ")[0]), 10
+
+    monkeypatch.setattr(tools, "fetch_page", fetcher)
+    monkeypatch.setattr(tools, "extract_supplier", extract_supplier)
+
+    started = time.perf_counter()
+    values = await _run_tools_graph().ainvoke(
+        _state_with_call(urls),
+        {"configurable": {"scrape_concurrency": 3, "max_scrape_chars": 200}},
+    )
+    elapsed = time.perf_counter() - started
+
+    assert fetcher.max_in_flight == 3
+    # Two waves of three rather than six fetches one after another
+    assert elapsed < sum(fetcher.delays.values()) * 0.75
+    results = json.loads(values["messages"][-1].content)
+    assert [r["supplier"]["name"] for r in results] == urls
+    assert [r["supplier"]["source_url"] for r in results] == urls
+    # Each URL's page is cut to max_scrape_chars in its prompt
+    assert all(c[:200] in p and c[:201] not in p for p, c in prompts)
+
+
+@pytest.mark.asyncio
+async def test_scrape_reports_a_failing_url_in_place(monkeypatch) -> None:
+    urls = ["https://a.example", "https://down.example", "https://c.example"]
+    fetcher = _SlowFetcher({url: 0.01 for url in urls})
+
+    async def fetch_page(url, configuration, max_depth="advanced"):
+        if "down" in url:
+            raise ConnectionError("connection refused")
+        return await fetcher(url, configuration, max_depth)
+
+    monkeypatch.setattr(tools, "fetch_page", fetch_page)
+    monkeypatch.setattr(tools, "extract_supplier", _fake_extract_supplier)
+
+    values = await _run_tools_graph().ainvoke(_state_with_call(urls))
+
+    results = json.loads(values["messages"][-1].content)
+    assert [r["url"] for r in results] == urls
+    assert results[1] == {"url": "https://down.example", "error": "connection refused"}
+    assert values["tavily_credits_used"] == 2
@@ -0,0 +1,31 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from enrichment_agent.utils import canonical_url, compact_messages
+
+
+def test_compact_messages_digests_only_consumed_tool_results() -> None:
+    hits = [{"title": f"Supplier {i}", "url": f"https://s{i}.in", "content": "x" * 500} for i in range(5)]
+    call = {"name": "search", "args": {"query": "q"}, "id": "1"}
+    messages = [
+        HumanMessage(content="find suppliers"),
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content=json.dumps(hits), tool_call_id="1", name="search"),
+        AIMessage(content="", tool_calls=[{**call, "id": "2"}]),
+        ToolMessage(content=json.dumps(hits), tool_call_id="2", name="search"),
+    ]
+
+    compacted = compact_messages(messages, max_chars=300)
+
+    assert compacted[2].tool_call_id == "1"
+    assert "https://s4.in" in compacted[2].content
+    assert len(compacted[2].content) < len(messages[2].content)
+    assert compacted[4] is messages[4]
+
+
+def test_canonical_url_folds_trivial_differences() -> None:
+    assert canonical_url("HTTP://www.Acme.in:80/products/?utm_source=x&b=2&a=1#top") == (
+        "https://acme.in/products?a=1&b=2"
+    )
+    assert canonical_url("https://acme.in") == canonical_url("https://acme.in/")